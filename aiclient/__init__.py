@@ -1,12 +1,16 @@
 from .agent import Agent
 from .batch import BatchProcessor
+from .broadcast import StreamBroadcaster
 from .cache import SemanticCacheMiddleware
 from .client import Client
+from .context import RequestContext
 from .data_types import (
+    AgentEvent,
     AssistantMessage,
     Image,
     ModelResponse,
     StreamChunk,
+    StreamMetrics,
     SystemMessage,
     Text,
     ToolMessage,
@@ -20,9 +24,16 @@ from .exceptions import (
     NetworkError,
     ProviderError,
     RateLimitError,
+    SlowConsumerError,
+    StreamTimeoutError,
 )
 from .memory import ConversationMemory, SlidingWindowMemory
-from .middleware import CostTrackingMiddleware, LoggingMiddleware, Middleware
+from .middleware import (
+    CostTrackingMiddleware,
+    LoggingMiddleware,
+    Middleware,
+    StreamMiddleware,
+)
 from .observability import OpenTelemetryMiddleware, TracingMiddleware
 from .providers.ollama import OllamaProvider
 from .resilience import (
@@ -34,12 +45,15 @@ from .resilience import (
 )
 from .testing import MockProvider, MockTransport
 from .tools.base import Tool
+from .transport.base import StreamTimeouts
 
 __version__ = "1.0.0"
 
 __all__ = [
     "Client",
+    "RequestContext",
     "Agent",
+    "AgentEvent",
     "Tool",
     "UserMessage",
     "SystemMessage",
@@ -49,8 +63,10 @@ __all__ = [
     "Image",
     "ModelResponse",
     "StreamChunk",
+    "StreamMetrics",
     "Usage",
     "Middleware",
+    "StreamMiddleware",
     "CostTrackingMiddleware",
     "LoggingMiddleware",
     "CircuitBreaker",
@@ -72,5 +88,9 @@ __all__ = [
     "ProviderError",
     "InvalidRequestError",
     "NetworkError",
+    "StreamTimeoutError",
+    "SlowConsumerError",
+    "StreamBroadcaster",
+    "StreamTimeouts",
     "OllamaProvider",
 ]
@@ -1,7 +1,20 @@
 import asyncio
-from typing import Any, Dict, List, Optional
+import atexit
+import contextlib
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set
 
-from .data_types import AssistantMessage, ToolMessage, UserMessage
+from .cache.tools import ToolResultCache, tool_result_cache
+from .data_types import (
+    AgentEvent,
+    AssistantMessage,
+    BaseMessage,
+    ToolCall,
+    ToolMessage,
+    UserMessage,
+)
 from .memory import ConversationMemory, Memory
 from .models.chat import ChatModel
 from .tools.base import Tool
@@ -16,9 +29,53 @@ except ImportError:
     MCP_AVAILABLE = False
 
 
+def _input_schema(tool_def: Any) -> Optional[Dict[str, Any]]:
+    # mcp 1.x names the field inputSchema, 2.x input_schema
+    schema = getattr(tool_def, "inputSchema", None)
+    if schema is None:
+        schema = getattr(tool_def, "input_schema", None)
+    return schema
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _cpu_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for `cpu_bound` tools, shared by all agents. Started on first
+    use and shut down when the interpreter exits, whichever entry point
+    (`run`, `run_async`, `stream_async`) started it.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor()
+            atexit.register(_shutdown_cpu_pool)
+        return _process_pool
+
+
+def _shutdown_cpu_pool() -> None:
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 class Agent:
     """
     An agent that can use tools (local and MCP) to solve tasks.
+
+    Tool calls returned in the same step run concurrently, at most
+    `max_concurrent_tools` at a time. Sync tools are offloaded to a thread
+    pool (or a process pool for tools marked `cpu_bound`), and `tool_timeout`
+    is the default per-call timeout for tools that do not set their own.
+
+    Results of `cacheable` tools are reused from `tool_cache` (by default the
+    process-wide `tool_result_cache`) for identical arguments. MCP tools are
+    made cacheable per server with `"cacheable": True` (all of its tools) or
+    a list of tool names in the server's config.
     """
 
     def __init__(
@@ -28,10 +85,19 @@ class Agent:
         mcp_servers: Optional[Dict[str, Dict[str, Any]]] = None,
         max_steps: int = 10,
         memory: Optional[Memory] = None,
+        max_concurrent_tools: int = 8,
+        tool_timeout: Optional[float] = None,
+        tool_cache: Optional[ToolResultCache] = None,
     ):
         self.model = model
         self.max_steps = max_steps
         self.memory = memory or ConversationMemory()
+        self.max_concurrent_tools = max_concurrent_tools
+        self.tool_timeout = tool_timeout
+        self._mcp_tool_names: List[str] = []
+        self._mcp_tools_version: Any = None
+        self.tool_cache = tool_cache if tool_cache is not None else tool_result_cache
+        self._mcp_cacheable: Dict[str, Any] = {}
 
         # Local Tools
         self.tools = []
@@ -47,6 +113,11 @@ class Agent:
         # MCP Manager (optional - requires mcp extra)
         self.mcp_manager = None
         if mcp_servers:
+            self._mcp_cacheable = {
+                name: config["cacheable"]
+                for name, config in mcp_servers.items()
+                if config.get("cacheable")
+            }
             if not MCP_AVAILABLE:
                 raise ImportError(
                     "MCP support requires the 'mcp' package. "
@@ -56,15 +127,23 @@ class Agent:
             for name, config in mcp_servers.items():
                 self.mcp_manager.add_server(
                     name=name,
-                    command=config["command"],
+                    command=config.get("command"),
                     args=config.get("args", []),
                     env=config.get("env"),
+                    url=config.get("url"),
+                    transport=config.get("transport"),
+                    headers=config.get("headers"),
+                    lazy=config.get("lazy"),
+                    timeout=config.get("timeout"),
+                    tools=config.get("tools"),
+                    pool_size=config.get("pool_size", 1),
                 )
 
-        # self.history is now managed by self.memory if desired, or we just sync them?
-        # Ideally, we rely on memory.get_messages().
-        # But for backward compat/simplicity in this refactor,
-        # we can ensure memory is updated.
+    def _history(self) -> Sequence[BaseMessage]:
+        """Current conversation, as a copy-free view when the memory offers one."""
+        if hasattr(self.memory, "get_view"):
+            return self.memory.get_view()
+        return self.memory.get_messages()
 
     async def __aenter__(self):
         if self.mcp_manager:
@@ -75,34 +154,120 @@ class Agent:
         if self.mcp_manager:
             await self.mcp_manager.__aexit__(exc_type, exc_val, exc_tb)
 
-    async def run_async(self, prompt: str) -> str:
-        """Asynchronous run loop."""
-        # Add user prompt to memory
-        self.memory.add_message(UserMessage(content=prompt))
+    async def _call_tool(self, tool: Tool, arguments: Dict[str, Any]) -> Any:
+        """Run one tool without blocking the event loop."""
+        if asyncio.iscoroutinefunction(tool.fn):
+            return await tool.fn(**arguments)
 
-        # 1. Fetch MCP tools (if servers are active)
-        mcp_tools_schemas = []
-        if self.mcp_manager:
-            if self.mcp_manager.has_servers and not self.mcp_manager.is_active:
-                print(
-                    "WARNING: MCP servers configured but Agent not running in "
-                    "'async with' context. MCP tools will be unavailable."
-                )
-                # Simple run (no tools)
-                history = self.memory.get_messages()
-                response = await self.model.generate_async(history, tools=self.tools)
-                self.memory.add_message(AssistantMessage(content=response.text))
-                return response.text
+        call = functools.partial(tool.fn, **arguments)
+        if tool.cpu_bound:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_cpu_pool(), call)
+        return await asyncio.to_thread(call)
+
+    async def _execute_tool_call(self, tc: ToolCall) -> str:
+        """Execute a single tool call and return its result as text."""
+        if tc.error:
+            # Report undecodable arguments to the model instead of running the
+            # tool without them
+            return f"Error: {tc.error}"
+        tool = self._tool_map.get(tc.name)
+        if not tool:
+            # Tool not in local map - try MCP if available
+            if not self.mcp_manager:
+                return f"Error: Tool {tc.name} not found"
+            try:
+                return str(await self.mcp_manager.call_tool(tc.name, tc.arguments))
+            except Exception as e:
+                return f"Error: Tool {tc.name} not found or failed: {e}"
+
+        if tool.cacheable:
+            cached: Optional[str] = self.tool_cache.get(tc.name, tc.arguments)
+            if cached is not None:
+                return cached
+
+        timeout = tool.timeout if tool.timeout is not None else self.tool_timeout
+        try:
+            result = await asyncio.wait_for(
+                self._call_tool(tool, tc.arguments), timeout
+            )
+        except asyncio.TimeoutError:
+            # A sync tool keeps running in its worker; only the wait is abandoned
+            return f"Error: Tool {tc.name} timed out after {timeout}s"
+        except Exception as e:
+            return f"Error: {e}"
+
+        text = str(result)
+        # MCP reports tool failures in the result rather than raising
+        failed = getattr(result, "isError", False) is True
+        if tool.cacheable and not failed:
+            self.tool_cache.set(tc.name, tc.arguments, text, ttl=tool.cache_ttl)
+        return text
+
+    def _start_tool_call(
+        self, tc: ToolCall, semaphore: asyncio.Semaphore
+    ) -> asyncio.Task[str]:
+        async def run() -> str:
+            async with semaphore:
+                return await self._execute_tool_call(tc)
+
+        return asyncio.ensure_future(run())
+
+    def _start_tool_calls(self, tool_calls: List[ToolCall]) -> List[asyncio.Task[str]]:
+        """Schedule a step's tool calls, at most max_concurrent_tools at once."""
+        semaphore = asyncio.Semaphore(self.max_concurrent_tools)
+        return [self._start_tool_call(tc, semaphore) for tc in tool_calls]
 
-            mcp_tools_schemas = await self.mcp_manager.list_global_tools()
+    async def _execute_tool_calls(self, tool_calls: List[ToolCall]) -> List[str]:
+        """Run a step's tool calls concurrently; results keep the calls' order."""
+        return await asyncio.gather(*self._start_tool_calls(tool_calls))
 
-        # Convert MCP schemas to our Tool objects
-        for tool_def in mcp_tools_schemas:
+    def _add_tool_results(self, tool_calls: List[ToolCall], results: List[str]) -> None:
+        for tc, result in zip(tool_calls, results):
+            self.memory.add_message(
+                ToolMessage(tool_call_id=tc.id, name=tc.name, content=result)
+            )
+
+    def _is_mcp_cacheable(self, tool_name: str) -> bool:
+        if not self._mcp_cacheable or self.mcp_manager is None:
+            return False
+        server = self.mcp_manager._tool_server_map.get(tool_name)
+        if server is None:
+            return False
+        setting = self._mcp_cacheable.get(server)
+        if isinstance(setting, (list, tuple, set)):
+            return tool_name in setting
+        return bool(setting)
+
+    async def _sync_mcp_tools(self) -> None:
+        """
+        Wrap the manager's (cached) MCP tool list as Tool objects. They are
+        only rebuilt when the manager's tool list actually changed.
+        """
+        manager = self.mcp_manager
+        if manager is None:
+            return
+        tool_defs = await manager.list_global_tools()
+        version = getattr(manager, "tools_version", None)
+        if version is not None and version == self._mcp_tools_version:
+            return
+        self._mcp_tools_version = version
+
+        # Drop the previous listing; local tools are never replaced
+        stale = set(self._mcp_tool_names)
+        self.tools = [t for t in self.tools if t.name not in stale]
+        for name in stale:
+            self._tool_map.pop(name, None)
+        self._mcp_tool_names = []
+
+        for tool_def in tool_defs:
             name = tool_def.name
+            if name in self._tool_map:
+                continue
 
             # Create a localized runner for this tool
-            async def mcp_runner_wrapper(_name=name, **kwargs):
-                return await self.mcp_manager.call_tool(_name, kwargs)
+            async def mcp_runner_wrapper(_name: str = name, **kwargs: Any) -> Any:
+                return await manager.call_tool(_name, kwargs)
 
             mcp_runner_wrapper.__name__ = name
 
@@ -111,17 +276,45 @@ class Agent:
                 fn=mcp_runner_wrapper,
                 schema=None,  # No Pydantic schema
                 description=tool_def.description or "",
-                raw_schema=tool_def.inputSchema,
+                raw_schema=_input_schema(tool_def),
+                cacheable=self._is_mcp_cacheable(name),
             )
+            self.tools.append(tool_obj)
+            self._tool_map[name] = tool_obj
+            self._mcp_tool_names.append(name)
+
+    async def _prepare_tools(self) -> bool:
+        """
+        Refresh MCP tools. Returns False if MCP servers are configured but the
+        agent was not started with 'async with'.
+        """
+        if self.mcp_manager:
+            if self.mcp_manager.has_servers and not self.mcp_manager.is_active:
+                print(
+                    "WARNING: MCP servers configured but Agent not running in "
+                    "'async with' context. MCP tools will be unavailable."
+                )
+                return False
+            await self._sync_mcp_tools()
+        return True
 
-            if name not in self._tool_map:
-                self.tools.append(tool_obj)
-                self._tool_map[name] = tool_obj
+    async def run_async(self, prompt: str) -> str:
+        """Asynchronous run loop."""
+        # Add user prompt to memory
+        self.memory.add_message(UserMessage(content=prompt))
+
+        # 1. Fetch MCP tools (if servers are active)
+        if not await self._prepare_tools():
+            # Simple run (no tools)
+            history = self._history()
+            response = await self.model.generate_async(history, tools=self.tools)
+            self.memory.add_message(AssistantMessage(content=response.text))
+            return response.text
 
         all_tools = self.tools
 
         for _ in range(self.max_steps):
-            history = self.memory.get_messages()
+            history = self._history()
             response = await self.model.generate_async(history, tools=all_tools)
 
             assistant_msg = AssistantMessage(
@@ -132,36 +325,86 @@ class Agent:
             if not response.tool_calls:
                 return response.text
 
-            for tc in response.tool_calls:
-                tool = self._tool_map.get(tc.name)
-                result = None
-
-                if tool:
-                    try:
-                        if asyncio.iscoroutinefunction(tool.fn):
-                            result = await tool.fn(**tc.arguments)
-                        else:
-                            result = tool.fn(**tc.arguments)
-                    except Exception as e:
-                        result = f"Error: {e}"
-                else:
-                    # Tool not in local map - try MCP if available
-                    if self.mcp_manager:
-                        try:
-                            result = await self.mcp_manager.call_tool(
-                                tc.name, tc.arguments
-                            )
-                        except Exception as e:
-                            result = f"Error: Tool {tc.name} not found or failed: {e}"
-                    else:
-                        result = f"Error: Tool {tc.name} not found"
-
-                self.memory.add_message(
-                    ToolMessage(tool_call_id=tc.id, name=tc.name, content=str(result))
-                )
+            results = await self._execute_tool_calls(response.tool_calls)
+            self._add_tool_results(response.tool_calls, results)
 
         return "Max steps reached"
 
+    async def stream_async(self, prompt: str) -> AsyncIterator[AgentEvent]:
+        """
+        Run the agent, streaming its progress: `token` events as the model
+        writes, `tool_start`/`tool_end` around each tool call (ends arrive in
+        completion order) and a final `answer` event. A tool starts as soon as
+        its call has fully streamed, before the model finishes the response.
+        """
+        self.memory.add_message(UserMessage(content=prompt))
+        tools_ready = await self._prepare_tools()
+
+        for _ in range(self.max_steps):
+            text_parts: List[str] = []
+            tool_calls: List[ToolCall] = []
+            tasks: List[asyncio.Task[str]] = []
+            pending: Set[asyncio.Task[str]] = set()
+            semaphore = asyncio.Semaphore(self.max_concurrent_tools)
+
+            def finished() -> List[asyncio.Task[str]]:
+                done = [task for task in tasks if task in pending and task.done()]
+                pending.difference_update(done)
+                return done
+
+            try:
+                # Closed as soon as the consumer stops, dropping the upstream
+                stream = self.model.stream_chunks_async(
+                    self._history(), tools=self.tools
+                )
+                async with contextlib.aclosing(stream):
+                    async for chunk in stream:
+                        if chunk.text:
+                            text_parts.append(chunk.text)
+                            yield AgentEvent(type="token", text=chunk.text)
+                        # Each call starts as soon as it is complete, while the
+                        # model may still be writing the next one
+                        for tc in (chunk.tool_calls or []) if tools_ready else []:
+                            yield AgentEvent(type="tool_start", tool_call=tc)
+                            task = self._start_tool_call(tc, semaphore)
+                            tool_calls.append(tc)
+                            tasks.append(task)
+                            pending.add(task)
+                        for task in finished():
+                            yield self._tool_end_event(tool_calls, tasks, task)
+
+                while pending:
+                    await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished():
+                        yield self._tool_end_event(tool_calls, tasks, task)
+            finally:
+                # Consumer stopped early: don't leave tools running unobserved
+                for task in tasks:
+                    task.cancel()
+
+            text = "".join(text_parts)
+            self.memory.add_message(
+                AssistantMessage(content=text, tool_calls=tool_calls or None)
+            )
+            if not tool_calls:
+                yield AgentEvent(type="answer", text=text)
+                return
+            self._add_tool_results(tool_calls, [task.result() for task in tasks])
+
+        yield AgentEvent(type="answer", text="Max steps reached")
+
+    @staticmethod
+    def _tool_end_event(
+        tool_calls: List[ToolCall],
+        tasks: List[asyncio.Task[str]],
+        task: asyncio.Task[str],
+    ) -> AgentEvent:
+        return AgentEvent(
+            type="tool_end",
+            tool_call=tool_calls[tasks.index(task)],
+            result=task.result(),
+        )
+
     def run(self, prompt: str) -> str:
         """Synchronous run loop wrapper."""
         return asyncio.run(self.run_async(prompt))
@@ -0,0 +1,180 @@
+import asyncio
+from collections import deque
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Deque,
+    Generic,
+    List,
+    Literal,
+    Optional,
+    TypeVar,
+)
+
+from .exceptions import SlowConsumerError
+
+T = TypeVar("T")
+
+BackpressurePolicy = Literal["drop", "block", "disconnect"]
+
+
+class _Subscriber:
+    """Buffer and wake-up events of one subscriber."""
+
+    def __init__(self, buffer_size: int, policy: BackpressurePolicy):
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.buffer: Deque[Any] = deque()
+        self.readable = asyncio.Event()
+        self.writable = asyncio.Event()
+        self.writable.set()
+        self.error: Optional[Exception] = None
+        self.closed = False
+
+
+class StreamBroadcaster(Generic[T]):
+    """
+    Relays one async stream (e.g. `model.stream_async(prompt)`) to any
+    number of subscribers, so the upstream request is made once.
+
+    Each subscriber has a bounded buffer. When it is full, `policy` decides:
+    `"drop"` skips items for that subscriber (counted in `dropped`),
+    `"block"` holds the upstream until it catches up (slowing everyone), and
+    `"disconnect"` ends that subscriber with SlowConsumerError.
+
+    With `replay=True`, subscribers that join late first receive everything
+    already streamed. The upstream starts on the first `subscribe()` and an
+    upstream error is raised to every subscriber after its buffered items.
+    """
+
+    def __init__(
+        self,
+        source: AsyncIterable[T],
+        buffer_size: int = 256,
+        policy: BackpressurePolicy = "block",
+        replay: bool = True,
+    ):
+        self.source = source
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.replay = replay
+        self.dropped = 0
+        self._history: List[T] = []
+        self._subscribers: List[_Subscriber] = []
+        self._task: Optional[asyncio.Task[None]] = None
+        self._done = False
+        self._error: Optional[BaseException] = None
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def subscribe(
+        self,
+        buffer_size: Optional[int] = None,
+        policy: Optional[BackpressurePolicy] = None,
+    ) -> AsyncGenerator[T, None]:
+        """
+        A new consumer of the stream. `buffer_size` and `policy` override the
+        broadcaster defaults for this subscriber.
+        """
+        subscriber = _Subscriber(
+            self.buffer_size if buffer_size is None else buffer_size,
+            policy or self.policy,
+        )
+        # Registered together with the replay bound (no await in between), so
+        # every item is delivered exactly once: replayed or buffered
+        replay_until = len(self._history)
+        self._subscribers.append(subscriber)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._pump())
+        return self._iterate(subscriber, replay_until)
+
+    async def aclose(self) -> None:
+        """Stop the upstream stream; subscribers end after their buffered items."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._finish()
+
+    async def _pump(self) -> None:
+        try:
+            async for item in self.source:
+                if self.replay:
+                    self._history.append(item)
+                # Snapshot: a subscriber joining while we wait gets this
+                # item through replay
+                for subscriber in list(self._subscribers):
+                    await self._deliver(subscriber, item)
+        except Exception as e:
+            self._error = e
+        finally:
+            aclose = getattr(self.source, "aclose", None)
+            if aclose:
+                await aclose()
+            self._finish()
+
+    def _finish(self) -> None:
+        self._done = True
+        for subscriber in self._subscribers:
+            subscriber.readable.set()
+
+    async def _deliver(self, subscriber: _Subscriber, item: T) -> None:
+        while len(subscriber.buffer) >= subscriber.buffer_size:
+            if subscriber.closed:
+                return
+            if subscriber.policy == "drop":
+                self.dropped += 1
+                return
+            if subscriber.policy == "disconnect":
+                subscriber.error = SlowConsumerError(
+                    f"Subscriber fell {subscriber.buffer_size} items behind"
+                )
+                self._unsubscribe(subscriber)
+                subscriber.readable.set()
+                return
+            subscriber.writable.clear()
+            await subscriber.writable.wait()
+        if subscriber.closed:
+            return
+        subscriber.buffer.append(item)
+        subscriber.readable.set()
+
+    def _unsubscribe(self, subscriber: _Subscriber) -> None:
+        subscriber.closed = True
+        # Release the pump if it is blocked on this subscriber
+        subscriber.writable.set()
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    async def _iterate(
+        self, subscriber: _Subscriber, replay_until: int
+    ) -> AsyncGenerator[T, None]:
+        try:
+            for i in range(replay_until):
+                yield self._history[i]
+            while True:
+                if subscriber.buffer:
+                    item = subscriber.buffer.popleft()
+                    subscriber.writable.set()
+                    yield item
+                    continue
+                if subscriber.error is not None:
+                    raise subscriber.error
+                if self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                subscriber.readable.clear()
+                await subscriber.readable.wait()
+        finally:
+            # Also runs when the consumer stops early or is garbage-collected
+            self._unsubscribe(subscriber)
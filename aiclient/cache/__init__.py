@@ -4,10 +4,13 @@ from .semantic import (
     SemanticCacheMiddleware,
     VectorStore,
 )
+from .tools import ToolResultCache, tool_result_cache
 
 __all__ = [
     "SemanticCacheMiddleware",
     "InMemoryVectorStore",
     "EmbeddingProvider",
     "VectorStore",
+    "ToolResultCache",
+    "tool_result_cache",
 ]
@@ -1,7 +1,10 @@
-from typing import Any, List, Optional, Protocol
+import asyncio
+from collections.abc import Sequence
+from typing import Any, List, Optional, Protocol, Tuple
 
 import numpy as np
 
+from ..context import RequestContext
 from ..data_types import ModelResponse, UserMessage
 from ..middleware import Middleware
 
@@ -57,43 +60,98 @@ class SemanticCacheMiddleware(Middleware):
         self.embedder = embedder
         self.threshold = threshold
         self.store = backend or InMemoryVectorStore()
-        self._last_prompt_str = None
+        self._last_prompt_str: Optional[str] = None
 
-    def before_request(self, model: str, prompt: Any) -> Any:
-        # 1. Extract text from prompt (assume last user message or string)
-        text = ""
+    @staticmethod
+    def _prompt_text(prompt: Any) -> str:
+        # Extract text from prompt (assume last user message or string)
         if isinstance(prompt, str):
-            text = prompt
-        elif isinstance(prompt, list):
-            # Find last user message
+            return prompt
+        if isinstance(prompt, Sequence):
+            # Find last user message (lists and memory views alike)
             for m in reversed(prompt):
                 if isinstance(m, UserMessage):
-                    text = str(m.content)  # Simple string conversion
-                    break
-
+                    return str(m.content)  # Simple string conversion
+        return ""
+
+    def _remember(
+        self, context: Optional[RequestContext], text: str, vector: List[float]
+    ) -> None:
+        if context is not None:
+            # Per request, and saves embedding the prompt again on store
+            context.scratch["semantic_cache"] = (text, vector)
+        else:
+            self._last_prompt_str = text
+
+    def _recall(
+        self, context: Optional[RequestContext]
+    ) -> Tuple[Optional[str], Optional[List[float]]]:
+        """The prompt text of this request and its vector, if already known."""
+        if context is not None:
+            text, vector = context.scratch.pop("semantic_cache", (None, None))
+            return text, vector
+        return self._last_prompt_str, None
+
+    def before_request(
+        self, model: str, prompt: Any, context: Optional[RequestContext] = None
+    ) -> Any:
+        text = self._prompt_text(prompt)
         if not text:
             return prompt
 
-        self._last_prompt_str = text
-
-        # 2. Embed
+        # Embed and search
         vector = self.embedder.embed(text)
+        self._remember(context, text, vector)
+        cached_response = self.store.search(vector, self.threshold)
+        # Short-circuit by returning the cached ModelResponse
+        if isinstance(cached_response, ModelResponse):
+            return cached_response
 
-        # 3. Search
+        return prompt
+
+    async def before_request_async(
+        self, model: str, prompt: Any, context: Optional[RequestContext] = None
+    ) -> Any:
+        """
+        Async version of before_request: embedding (usually a network call)
+        does not block the event loop.
+        """
+        text = self._prompt_text(prompt)
+        if not text:
+            return prompt
+
+        vector = await self._embed_async(text)
+        self._remember(context, text, vector)
         cached_response = self.store.search(vector, self.threshold)
-        if cached_response:
-            # Short-circuit by returning response
-            # Note: cached_response is stored as ModelResponse
-            if isinstance(cached_response, ModelResponse):
-                # Update usage to indicate cache hit?
-                # Maybe set a flag
-                return cached_response
+        if isinstance(cached_response, ModelResponse):
+            return cached_response
 
         return prompt
 
-    def after_response(self, response: ModelResponse) -> ModelResponse:
-        # Cache the response for the last prompt
-        if self._last_prompt_str:
-            vector = self.embedder.embed(self._last_prompt_str)
+    def after_response(
+        self, response: ModelResponse, context: Optional[RequestContext] = None
+    ) -> ModelResponse:
+        # Cache the response for this request's prompt
+        text, vector = self._recall(context)
+        if text:
+            if vector is None:
+                vector = self.embedder.embed(text)
+            self.store.add(vector, response)
+        return response
+
+    async def after_response_async(
+        self, response: ModelResponse, context: Optional[RequestContext] = None
+    ) -> ModelResponse:
+        text, vector = self._recall(context)
+        if text:
+            if vector is None:
+                vector = await self._embed_async(text)
             self.store.add(vector, response)
         return response
+
+    async def _embed_async(self, text: str) -> List[float]:
+        embed_async = getattr(self.embedder, "embed_async", None)
+        if embed_async is not None:
+            vector: List[float] = await embed_async(text)
+            return vector
+        return await asyncio.to_thread(self.embedder.embed, text)
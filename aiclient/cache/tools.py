@@ -0,0 +1,98 @@
+"""
+Result caching for idempotent tools.
+
+Agents often call the same lookup tool with the same arguments, within a run
+and across runs. Tools marked `cacheable` have their results stored by
+`(tool name, canonical arguments)` in a `ToolResultCache`; by default every
+`Agent` in the process shares `tool_result_cache`.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def tool_cache_key(name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+    """Key for a call: argument order and whitespace do not matter."""
+    return name, json.dumps(
+        arguments, sort_keys=True, separators=(",", ":"), default=str
+    )
+
+
+class ToolResultCache:
+    """
+    Thread-safe LRU of tool results with an optional per-entry TTL.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (expires at or None, result)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Optional[float], Any]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, name: str, arguments: Dict[str, Any], default: Any = None) -> Any:
+        key = tool_cache_key(name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and entry[0] is not None
+                and entry[0] <= time.monotonic()
+            ):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        result: Any,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Store a result; `ttl` overrides the cache default for this entry."""
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        key = tool_cache_key(name, arguments)
+        with self._lock:
+            self._entries[key] = (expires, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop all cached results, or only those of one tool."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == name]:
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+# Shared by every Agent unless one is given its own cache
+tool_result_cache = ToolResultCache()
@@ -2,15 +2,20 @@ import logging
 import os
 from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
 
+import httpx
 from dotenv import load_dotenv
 
+from .data_types import StreamMetrics
+from .images import ImageOptimizer
 from .middleware import Middleware
 from .models.chat import ChatModel
+from .models.singleflight import SingleFlight
 from .providers.anthropic import AnthropicProvider
 from .providers.base import Provider
 from .providers.google import GoogleProvider
 from .providers.ollama import OllamaProvider
 from .providers.openai import OpenAIProvider
+from .transport.base import StreamTimeouts
 from .transport.http import HTTPTransport
 
 load_dotenv()
@@ -149,6 +154,11 @@ class Client:
         timeout: float = 60.0,
         google_api_version: str = "v1beta",
         debug: bool = False,
+        image_optimizer: Optional[ImageOptimizer] = None,
+        metrics_sink: Optional[Callable[[StreamMetrics], None]] = None,
+        resume_streams: bool = False,
+        stream_timeouts: Optional[StreamTimeouts] = None,
+        single_flight: bool = False,
     ):
         self.keys = {
             "openai": openai_api_key or os.getenv("OPENAI_API_KEY"),
@@ -162,7 +172,19 @@ class Client:
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.timeout = timeout
+        # Optional ImageOptimizer applied to outgoing images
+        self.image_optimizer = image_optimizer
+        # Optional callable receiving the StreamMetrics of every stream
+        self.metrics_sink = metrics_sink
+        # Resume streams that drop mid-way (providers supporting a prefill)
+        self.resume_streams = resume_streams
+        # Connect/first-byte/idle limits for streams, below the overall timeout
+        self.stream_timeouts = stream_timeouts
+        # Coalesce identical concurrent async requests across all models
+        self.single_flight = SingleFlight() if single_flight else None
         self._middlewares: List[Middleware] = []
+        # Image download client shared by the HTTP transports of all models
+        self._media_client: Optional[httpx.AsyncClient] = None
 
         if debug:
             logging.basicConfig(
@@ -228,8 +250,19 @@ class Client:
 
     def chat(self, model_name: str) -> ChatModel:
         provider, real_model_name = self._get_provider(model_name)
+        provider.image_optimizer = self.image_optimizer
+        transport_kwargs: Dict[str, Any] = {}
+        if self.stream_timeouts is not None:
+            transport_kwargs["stream_timeouts"] = self.stream_timeouts
+        if isinstance(self.transport_factory, type) and issubclass(
+            self.transport_factory, HTTPTransport
+        ):
+            transport_kwargs["media_client"] = self._shared_media_client()
         transport = self.transport_factory(
-            base_url=provider.base_url, headers=provider.headers, timeout=self.timeout
+            base_url=provider.base_url,
+            headers=provider.headers,
+            timeout=self.timeout,
+            **transport_kwargs,
         )
         return ChatModel(
             real_model_name,
@@ -238,6 +271,10 @@ class Client:
             self._middlewares,
             max_retries=self.max_retries,
             retry_delay=self.retry_delay,
+            metrics_sink=self.metrics_sink,
+            resume_streams=self.resume_streams,
+            stream_timeouts=self.stream_timeouts,
+            single_flight=self.single_flight,
         )
 
     async def embed(
@@ -303,11 +340,18 @@ class Client:
         """Async context manager exit - close any open connections."""
         await self.close()
 
-    async def close(self):
-        """Close all open HTTP connections."""
-        # Note: Individual transports are created per-request currently
-        # This is here for future connection pooling support
-        pass
+    def _shared_media_client(self) -> httpx.AsyncClient:
+        if self._media_client is None:
+            self._media_client = httpx.AsyncClient(
+                timeout=self.timeout, follow_redirects=True
+            )
+        return self._media_client
+
+    async def close(self) -> None:
+        """Close the image download client shared by this client's models."""
+        client, self._media_client = self._media_client, None
+        if client is not None:
+            await client.aclose()
 
     def list_models(self, provider: str = None) -> Dict[str, List[str]]:
         """
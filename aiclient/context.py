@@ -0,0 +1,99 @@
+"""
+Per-request state.
+
+`ChatModel` creates a `RequestContext` for every call and passes it to each
+middleware hook that declares a `context` parameter (or `**kwargs`), and to
+transports whose methods accept one. Middleware keeps per-request state in
+`scratch` instead of on itself or in context variables, so concurrent
+requests through shared middleware stay apart.
+"""
+
+import functools
+import inspect
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from .data_types import BaseMessage, Text, Usage
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text; a cheap upper-bound guess
+    return (len(text) + 3) // 4
+
+
+def estimate_tokens(messages: Union[str, List[BaseMessage]]) -> int:
+    """Rough input token count of a prompt (text only, no tokenizer)."""
+    if isinstance(messages, str):
+        return _estimate_tokens(messages)
+    total = 0
+    for message in messages:
+        content = getattr(message, "content", None)
+        if isinstance(content, str):
+            total += _estimate_tokens(content)
+        elif isinstance(content, list):
+            total += sum(
+                _estimate_tokens(part.text)
+                for part in content
+                if isinstance(part, Text)
+            )
+    return total
+
+
+class RequestContext(BaseModel):
+    """
+    One `ChatModel` call: identity, timing, retry attempt and token
+    estimates. Moments (`started`, `sent`, `first_byte`, `finished`) are
+    `time.perf_counter()` readings; `created_at` is wall-clock time.
+    """
+
+    request_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    model: str
+    provider: Optional[str] = None
+    stream: bool = False
+    # Retry attempt currently running (0 for the first)
+    attempt: int = 0
+    created_at: float = Field(default_factory=time.time)
+    started: float = Field(default_factory=time.perf_counter)
+    sent: Optional[float] = None
+    first_byte: Optional[float] = None
+    finished: Optional[float] = None
+    input_tokens_estimate: Optional[int] = None
+    # The requested max_tokens, if any: an upper bound on output tokens
+    max_output_tokens: Optional[int] = None
+    # Reported by the provider once the response is complete
+    usage: Optional[Usage] = None
+    # Free-form per-request storage for middleware and transports
+    scratch: Dict[str, Any] = Field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the call started (until it finished, if it has)."""
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def time_to_first_byte(self) -> Optional[float]:
+        """Seconds from sending the request to the first response byte."""
+        if self.sent is None or self.first_byte is None:
+            return None
+        return self.first_byte - self.sent
+
+
+@functools.lru_cache(maxsize=512)
+def _function_accepts_context(fn: Callable[..., Any]) -> bool:
+    try:
+        parameters = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(
+        p.name == "context" or p.kind is inspect.Parameter.VAR_KEYWORD
+        for p in parameters
+    )
+
+
+def accepts_context(fn: Callable[..., Any]) -> bool:
+    """Whether `fn` can be called with a `context=` keyword argument."""
+    # Cached per function, not per bound method
+    return _function_accepts_context(getattr(fn, "__func__", fn))
@@ -1,9 +1,13 @@
 import base64
+import mimetypes
+import mmap
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
 
 import httpx
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from .images import image_cache, load_image_async, path_source_key, url_source_key
 
 
 class Text(BaseModel):
@@ -15,31 +19,75 @@ class Image(BaseModel):
     url: Optional[str] = None
     media_type: str = "image/jpeg"
     base64_data: Optional[str] = None
+    # Raw image bytes (bytes, bytearray, memoryview or mmap). Sent without an
+    # intermediate base64 copy; not included in model_dump().
+    data: Optional[Any] = Field(default=None, exclude=True, repr=False)
+    # OpenAI vision detail level; None sends "auto"
+    detail: Optional[Literal["auto", "low", "high"]] = None
 
     def to_base64(self) -> str:
         """
         Returns the base64 encoded string of the image.
         Resolves path or url if base64_data is not already set.
+        Loaded images are kept in the shared `aiclient.images.image_cache`.
         """
         if self.base64_data:
             return self.base64_data
 
+        if self.data is not None:
+            return base64.b64encode(self.data).decode("utf-8")
+
         if self.path:
             p = Path(self.path)
             if not p.exists():
                 raise FileNotFoundError(f"Image not found at {self.path}")
+            source = path_source_key(self.path)
+            cached = image_cache.get(source)
+            if cached is not None:
+                return cached
             with open(p, "rb") as f:
-                return base64.b64encode(f.read()).decode("utf-8")
+                return image_cache.put(source, f.read())
 
         if self.url:
-            # Synchronous fetch for simplicity in this helper,
-            # or we assume the user provides base64 for perf.
-            # Using httpx for convenience.
+            # Synchronous fetch; async callers should use to_base64_async()
+            # (ChatModel does this automatically before building the request).
+            source = url_source_key(self.url)
+            cached = image_cache.get(source)
+            if cached is not None:
+                return cached
             resp = httpx.get(self.url)
             resp.raise_for_status()
-            return base64.b64encode(resp.content).decode("utf-8")
+            return image_cache.put(source, resp.content)
 
-        raise ValueError("Image must have path, url, or base64_data")
+        raise ValueError("Image must have path, url, base64_data or data")
+
+    @classmethod
+    def from_file(cls, path: str, media_type: Optional[str] = None) -> "Image":
+        """
+        Memory-map a local image file. The bytes stay in the OS page cache and
+        are streamed into the request body instead of being copied into memory.
+        """
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        media_type = media_type or mimetypes.guess_type(path)[0] or "image/jpeg"
+        return cls(data=data, media_type=media_type)
+
+    async def to_base64_async(self, client: Optional[httpx.AsyncClient] = None) -> str:
+        """
+        Async version of to_base64(). Reads files off the event loop and
+        downloads URLs with `client` when one is provided.
+        """
+        return await load_image_async(self, client)
+
+    def optimize(self, provider: str = "openai", **kwargs: Any) -> Tuple["Image", Any]:
+        """
+        Downscale and re-encode this image for `provider`. Requires Pillow.
+        kwargs are passed to `ImageOptimizer`.
+        Returns (optimized_image, ImageOptimizationReport).
+        """
+        from .images import ImageOptimizer
+
+        return ImageOptimizer(**kwargs).optimize(self, provider)
 
 
 class BaseMessage(BaseModel):
@@ -67,6 +115,8 @@ class ToolCall(BaseModel):
     id: str
     name: str
     arguments: Dict[str, Any]
+    # Set when the arguments could not be decoded; the tool is not run
+    error: Optional[str] = None
 
 
 class AssistantMessage(BaseMessage):
@@ -82,6 +132,29 @@ class Usage(BaseModel):
     cache_read_input_tokens: Optional[int] = 0
 
 
+class StreamMetrics(BaseModel):
+    """
+    Latency summary of one streamed response. Times are in seconds from
+    when the request was sent; inter-chunk percentiles cover the gaps
+    between content chunks after the first one.
+    """
+
+    model: Optional[str] = None
+    provider: Optional[str] = None
+    connect_time: Optional[float] = None
+    time_to_first_token: Optional[float] = None
+    total_time: float = 0.0
+    chunks: int = 0
+    inter_chunk_p50: Optional[float] = None
+    inter_chunk_p90: Optional[float] = None
+    inter_chunk_p99: Optional[float] = None
+    inter_chunk_max: Optional[float] = None
+    # From the provider's usage when reported, else the number of chunks
+    output_tokens: int = 0
+    # Generation throughput: output tokens over the time after the first token
+    tokens_per_second: Optional[float] = None
+
+
 class ModelResponse(BaseModel):
     """Standardized response from any AI provider."""
 
@@ -90,6 +163,34 @@ class ModelResponse(BaseModel):
     usage: Optional[Usage] = None
     provider: Optional[str] = None
     tool_calls: Optional[List[ToolCall]] = None
+    # Set on the aggregated response of a stream
+    metrics: Optional[StreamMetrics] = None
+
+
+class ToolCallDelta(BaseModel):
+    """
+    A fragment of a tool call in a stream. Fragments with the same `index`
+    belong to one call; `arguments` holds the next piece of its JSON. `done`
+    marks the call's last fragment when the provider signals it.
+    """
+
+    index: int
+    id: Optional[str] = None
+    name: Optional[str] = None
+    arguments: str = ""
+    done: bool = False
+
+
+class AgentEvent(BaseModel):
+    """
+    Progress of a streaming agent run: `token` (text delta), `tool_start`,
+    `tool_end` (with the tool's `result`) and the final `answer`.
+    """
+
+    type: Literal["token", "tool_start", "tool_end", "answer"]
+    text: Optional[str] = None
+    tool_call: Optional[ToolCall] = None
+    result: Optional[str] = None
 
 
 class StreamChunk(BaseModel):
@@ -97,3 +198,9 @@ class StreamChunk(BaseModel):
 
     text: str
     delta: str
+    tool_call_deltas: Optional[List[ToolCallDelta]] = None
+    # Tool calls completed by this chunk (filled in by ChatModel streams)
+    tool_calls: Optional[List[ToolCall]] = None
+    finish_reason: Optional[str] = None
+    # Token usage reported by the provider's stream events, when it sends any
+    usage: Optional[Usage] = None
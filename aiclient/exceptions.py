@@ -32,3 +32,15 @@ class NetworkError(AIClientError):
     """Raised when network connection fails."""
 
     pass
+
+
+class StreamTimeoutError(NetworkError):
+    """Raised when a stream stalls: no first byte or next chunk in time."""
+
+    pass
+
+
+class SlowConsumerError(AIClientError):
+    """Raised to a stream subscriber disconnected for falling too far behind."""
+
+    pass
@@ -0,0 +1,482 @@
+"""
+Image loading and caching.
+
+Resolving an `Image` (reading a file or downloading a URL) is done once and
+the encoded result is kept in a process-wide, content-addressed LRU so that
+repeated requests reuse it. The async helpers fetch URLs concurrently over a
+pooled client and read files in a worker thread, keeping the event loop free.
+
+`ImageOptimizer` (optional, needs Pillow) shrinks images to what each provider
+actually uses before upload, cutting payload size and vision token cost.
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple, TypeGuard
+
+import httpx
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from .data_types import BaseMessage, Image
+
+
+class ImageCache:
+    """
+    Thread-safe LRU of base64-encoded images.
+
+    Blobs are stored by SHA-256 of their raw bytes, so the same picture loaded
+    from two sources is kept once. A separate index maps each source (URL, or
+    file path plus modification time) to its blob.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._blobs: "OrderedDict[str, str]" = OrderedDict()
+        self._sources: Dict[str, str] = {}
+        self._sources_by_digest: Dict[str, Set[str]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    @property
+    def size(self) -> int:
+        """Total size of cached base64 data, in bytes."""
+        return self._size
+
+    def get(self, source: Optional[str]) -> Optional[str]:
+        if source is None:
+            return None
+        with self._lock:
+            digest = self._sources.get(source)
+            if digest is None:
+                self.misses += 1
+                return None
+            self._blobs.move_to_end(digest)
+            self.hits += 1
+            return self._blobs[digest]
+
+    def put(self, source: Optional[str], data: bytes) -> str:
+        """Store raw image bytes and return their base64 encoding."""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            encoded = self._blobs.get(digest)
+            if encoded is None:
+                encoded = base64.b64encode(data).decode("utf-8")
+                if len(encoded) > self.max_bytes:
+                    # Too large to cache; hand it back without storing
+                    return encoded
+                self._blobs[digest] = encoded
+                self._size += len(encoded)
+            else:
+                self._blobs.move_to_end(digest)
+
+            if source is not None:
+                self._sources[source] = digest
+                self._sources_by_digest.setdefault(digest, set()).add(source)
+
+            while self._size > self.max_bytes:
+                self._evict_oldest()
+        return encoded
+
+    def _evict_oldest(self) -> None:
+        digest, encoded = self._blobs.popitem(last=False)
+        self._size -= len(encoded)
+        for source in self._sources_by_digest.pop(digest, ()):
+            self._sources.pop(source, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blobs.clear()
+            self._sources.clear()
+            self._sources_by_digest.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+
+image_cache = ImageCache()
+
+
+def path_source_key(path: str) -> Optional[str]:
+    """
+    Cache key for a file, or None if it cannot be stat'ed.
+    Includes the modification time so edited files are reloaded.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"path:{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def url_source_key(url: str) -> str:
+    return f"url:{url}"
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def load_image_async(
+    image: "Image", client: Optional[httpx.AsyncClient] = None
+) -> str:
+    """
+    Async counterpart of `Image.to_base64()`.
+    Files are read in a worker thread; URLs are fetched with `client` if given.
+    """
+    if image.base64_data:
+        return image.base64_data
+
+    if image.data is not None:
+        return base64.b64encode(image.data).decode("utf-8")
+
+    if image.path:
+        source = await asyncio.to_thread(path_source_key, image.path)
+        cached = image_cache.get(source)
+        if cached is not None:
+            return cached
+        if source is None and not os.path.exists(image.path):
+            raise FileNotFoundError(f"Image not found at {image.path}")
+        data = await asyncio.to_thread(_read_file, image.path)
+        return image_cache.put(source, data)
+
+    if image.url:
+        source = url_source_key(image.url)
+        cached = image_cache.get(source)
+        if cached is not None:
+            return cached
+        if client is None:
+            async with httpx.AsyncClient() as tmp_client:
+                resp = await tmp_client.get(image.url)
+        else:
+            resp = await client.get(image.url)
+        resp.raise_for_status()
+        return image_cache.put(source, resp.content)
+
+    raise ValueError("Image must have path, url, base64_data or data")
+
+
+def _pending_images(
+    messages: Sequence["BaseMessage"], include_urls: bool
+) -> List["Image"]:
+    """Collect images that still need loading, de-duplicated by source."""
+    from .data_types import Image
+
+    pending: Dict[str, "Image"] = {}
+    for msg in messages:
+        content = getattr(msg, "content", None)
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            if not isinstance(part, Image) or part.base64_data:
+                continue
+            if part.data is not None:
+                continue
+            if part.path:
+                key = f"path:{part.path}"
+            elif part.url and include_urls:
+                key = url_source_key(part.url)
+            else:
+                continue
+            pending.setdefault(key, part)
+    return list(pending.values())
+
+
+async def resolve_images(
+    messages: Sequence["BaseMessage"],
+    client: Optional[httpx.AsyncClient] = None,
+    include_urls: bool = True,
+    concurrency: int = 8,
+) -> None:
+    """
+    Load every image referenced by `messages` into the shared cache, concurrently.
+
+    After this returns, `Image.to_base64()` is served from memory, so the
+    synchronous `prepare_request()` does no I/O on the event loop.
+
+    Args:
+        messages: Conversation to scan.
+        client: Pooled async client used for URL downloads.
+        include_urls: Set to False for providers that pass URLs by reference.
+        concurrency: Max simultaneous loads.
+    """
+    images = _pending_images(messages, include_urls)
+    if not images:
+        return
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(image: "Image", http: Optional[httpx.AsyncClient]) -> None:
+        async with semaphore:
+            await load_image_async(image, http)
+
+    if client is None and any(img.url and not img.path for img in images):
+        async with httpx.AsyncClient() as tmp_client:
+            await asyncio.gather(*(load(img, tmp_client) for img in images))
+    else:
+        await asyncio.gather(*(load(img, client) for img in images))
+
+
+# Server-side limits each provider applies before counting image tokens.
+# "max_edge" is the longest side the model actually sees; anything larger is
+# wasted upload.
+PROVIDER_IMAGE_LIMITS = {
+    "openai": {"max_edge": 2048, "short_edge": 768, "low_edge": 512},
+    "anthropic": {"max_edge": 1568},
+    "google": {"max_edge": 3072},
+}
+
+
+def _fit(width: int, height: int, max_edge: int) -> Tuple[int, int]:
+    """Scale (width, height) down so the longest side is at most max_edge."""
+    longest = max(width, height)
+    if longest <= max_edge:
+        return width, height
+    scale = max_edge / longest
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _openai_high_dims(width: int, height: int) -> Tuple[int, int]:
+    limits = PROVIDER_IMAGE_LIMITS["openai"]
+    width, height = _fit(width, height, limits["max_edge"])
+    shortest = min(width, height)
+    if shortest > limits["short_edge"]:
+        scale = limits["short_edge"] / shortest
+        width, height = max(1, round(width * scale)), max(1, round(height * scale))
+    return width, height
+
+
+def estimate_image_tokens(
+    provider: str, width: int, height: int, detail: Optional[str] = None
+) -> int:
+    """
+    Approximate input tokens an image costs, after the provider's own resizing.
+
+    Args:
+        provider: 'openai', 'anthropic' or 'google' (xAI/Ollama count as openai).
+        width: Image width in pixels.
+        height: Image height in pixels.
+        detail: OpenAI detail level; 'auto' is costed as 'high'.
+    """
+    if provider == "openai":
+        if detail == "low":
+            return 85
+        w, h = _openai_high_dims(width, height)
+        tiles = math.ceil(w / 512) * math.ceil(h / 512)
+        return 85 + 170 * tiles
+
+    if provider == "anthropic":
+        w, h = _fit(width, height, PROVIDER_IMAGE_LIMITS["anthropic"]["max_edge"])
+        return max(1, round(w * h / 750))
+
+    if provider == "google":
+        w, h = _fit(width, height, PROVIDER_IMAGE_LIMITS["google"]["max_edge"])
+        if w <= 384 and h <= 384:
+            return 258
+        return math.ceil(w / 768) * math.ceil(h / 768) * 258
+
+    raise ValueError(f"Unknown provider for image token estimate: {provider}")
+
+
+def _image_tokens(provider: str, width: int, height: int, detail: Optional[str]) -> int:
+    if provider not in PROVIDER_IMAGE_LIMITS:
+        return 0
+    return estimate_image_tokens(provider, width, height, detail=detail)
+
+
+class ImageOptimizationReport(BaseModel):
+    """Outcome of optimizing a single image."""
+
+    original_bytes: int
+    optimized_bytes: int
+    original_tokens: int
+    optimized_tokens: int
+    width: int
+    height: int
+    detail: Optional[str] = None
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.optimized_bytes
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.optimized_tokens
+
+
+class ImageOptimizer:
+    """
+    Downscales and re-encodes images before upload. Requires `Pillow`.
+
+    Images are resized to the largest resolution the target provider actually
+    uses (or `max_edge`, if smaller) and re-encoded as JPEG or WebP. With a
+    `token_budget`, OpenAI images whose high-detail cost exceeds the budget are
+    sent with `detail="low"` instead. Running totals of bytes and tokens saved
+    are kept on the instance.
+    """
+
+    def __init__(
+        self,
+        format: str = "JPEG",
+        quality: int = 85,
+        max_edge: Optional[int] = None,
+        token_budget: Optional[int] = None,
+    ):
+        try:
+            import PIL.Image  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "Image optimization requires Pillow. "
+                "Install with: pip install aiclient-llm[vision]"
+            )
+        format = format.upper()
+        if format not in ("JPEG", "WEBP"):
+            raise ValueError("format must be 'JPEG' or 'WEBP'")
+        self.format = format
+        self.quality = quality
+        self.max_edge = max_edge
+        self.token_budget = token_budget
+
+        self.images_processed = 0
+        self.total_bytes_saved = 0
+        self.total_tokens_saved = 0
+        self._lock = threading.Lock()
+
+        from .providers.base import MessageFormatCache
+
+        # Optimized copy of each message, so history is optimized only once
+        self._messages = MessageFormatCache()
+
+    def _target_dims(
+        self, provider: str, width: int, height: int, detail: Optional[str]
+    ) -> Tuple[int, int]:
+        if provider == "openai":
+            if detail == "low":
+                edge = PROVIDER_IMAGE_LIMITS["openai"]["low_edge"]
+                w, h = _fit(width, height, edge)
+            else:
+                w, h = _openai_high_dims(width, height)
+        elif provider in PROVIDER_IMAGE_LIMITS:
+            w, h = _fit(width, height, PROVIDER_IMAGE_LIMITS[provider]["max_edge"])
+        else:
+            # Limits unknown: only max_edge applies
+            w, h = width, height
+        if self.max_edge:
+            w, h = _fit(w, h, self.max_edge)
+        return w, h
+
+    def optimize(
+        self, image: "Image", provider: str = "openai"
+    ) -> Tuple["Image", ImageOptimizationReport]:
+        """
+        Return an optimized copy of `image` for `provider`, plus a report.
+        The original is returned unchanged if re-encoding would not shrink it.
+        Providers missing from PROVIDER_IMAGE_LIMITS (e.g. custom ones) are
+        resized only to `max_edge`, and their token counts are reported as 0.
+        """
+        import PIL.Image
+
+        from .data_types import Image
+
+        raw = base64.b64decode(image.to_base64())
+        with PIL.Image.open(io.BytesIO(raw)) as src:
+            src.load()
+            width, height = src.size
+
+            detail = image.detail
+            original_tokens = _image_tokens(provider, width, height, detail)
+            if provider == "openai" and self.token_budget is not None:
+                high_cost = estimate_image_tokens(provider, width, height, "high")
+                detail = "low" if high_cost > self.token_budget else "high"
+
+            target_w, target_h = self._target_dims(provider, width, height, detail)
+            resized: PIL.Image.Image = src
+            if (target_w, target_h) != (width, height):
+                resized = src.resize((target_w, target_h), PIL.Image.Resampling.LANCZOS)
+            if self.format == "JPEG" and resized.mode not in ("RGB", "L"):
+                resized = resized.convert("RGB")
+
+            out = io.BytesIO()
+            resized.save(out, format=self.format, quality=self.quality)
+            encoded = out.getvalue()
+
+        optimized_tokens = _image_tokens(provider, target_w, target_h, detail)
+        full_size_tokens = _image_tokens(provider, width, height, detail)
+        if len(encoded) >= len(raw) and optimized_tokens >= full_size_tokens:
+            # Re-encoding gained nothing; keep the original bytes
+            optimized = image.model_copy(update={"detail": detail})
+            target_w, target_h, encoded = width, height, raw
+            optimized_tokens = full_size_tokens
+        else:
+            optimized = Image(
+                base64_data=base64.b64encode(encoded).decode("utf-8"),
+                media_type=f"image/{self.format.lower()}",
+                detail=detail,
+            )
+
+        report = ImageOptimizationReport(
+            original_bytes=len(raw),
+            optimized_bytes=len(encoded),
+            original_tokens=original_tokens,
+            optimized_tokens=optimized_tokens,
+            width=target_w,
+            height=target_h,
+            detail=detail,
+        )
+        with self._lock:
+            self.images_processed += 1
+            self.total_bytes_saved += report.bytes_saved
+            self.total_tokens_saved += report.tokens_saved
+        return optimized, report
+
+    def optimize_messages(
+        self,
+        messages: Sequence["BaseMessage"],
+        provider: str = "openai",
+        include_urls: bool = True,
+    ) -> List["BaseMessage"]:
+        """
+        Return `messages` with every image replaced by its optimized copy.
+
+        CPU-bound (decode, resize, re-encode): async callers should run it in a
+        worker thread. Each message is optimized once; later calls reuse the
+        same copy. Messages without images are returned unchanged.
+
+        Args:
+            messages: Conversation to optimize.
+            provider: Target provider, as for `optimize()`.
+            include_urls: Set to False for providers that pass URLs by reference.
+        """
+        from .data_types import Image
+
+        def wanted(part: object) -> TypeGuard[Image]:
+            return isinstance(part, Image) and (include_urls or not part.url)
+
+        def optimize_message(message: "BaseMessage") -> "BaseMessage":
+            parts = [
+                self.optimize(part, provider)[0] if wanted(part) else part
+                for part in message.content
+            ]
+            return message.model_copy(update={"content": parts})
+
+        optimized = []
+        for message in messages:
+            content = getattr(message, "content", None)
+            if isinstance(content, list) and any(wanted(p) for p in content):
+                message = self._messages.get_or_format(
+                    message, optimize_message, (provider, include_urls)
+                )
+            optimized.append(message)
+        return optimized
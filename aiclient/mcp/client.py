@@ -1,38 +1,144 @@
+import asyncio
 import contextlib
-from typing import Any, Dict, List, Optional
+import weakref
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+)
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.types import ToolListChangedNotification
+
+TransportName = Literal["stdio", "sse", "streamable_http"]
+
+# Keep-alive HTTP clients shared by every MCPClient on the same event loop,
+# one per distinct set of headers: [client, sessions using it]
+_http_clients: "weakref.WeakKeyDictionary[Any, Dict[Tuple[Any, ...], List[Any]]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _create_http_client(headers: Optional[Dict[str, str]]) -> Any:
+    from mcp.client.streamable_http import (  # type: ignore[attr-defined]
+        create_mcp_http_client,
+    )
+
+    return create_mcp_http_client(headers=headers)
+
+
+@contextlib.asynccontextmanager
+async def shared_http_client(
+    headers: Optional[Dict[str, str]] = None,
+) -> AsyncIterator[Any]:
+    """
+    The pooled HTTP client for these headers on the running event loop.
+    It is closed when the last session using it exits.
+    """
+    clients = _http_clients.setdefault(asyncio.get_running_loop(), {})
+    key = tuple(sorted((headers or {}).items()))
+    entry = clients.get(key)
+    if entry is None or entry[0].is_closed:
+        entry = clients[key] = [_create_http_client(headers), 0]
+    entry[1] += 1
+    try:
+        yield entry[0]
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            if clients.get(key) is entry:
+                del clients[key]
+            await entry[0].aclose()
 
 
 class MCPClient:
     """
     A wrapper around the Model Context Protocol (MCP) client.
     Manages connections to MCP servers and provides tool discovery.
+
+    Connects to a local server over stdio (`command`) or to a remote one by
+    `url`, over streamable HTTP or, for URLs ending in `/sse` (or with
+    `transport="sse"`), the legacy SSE transport. Streamable HTTP sessions
+    share pooled keep-alive connections across clients in the process.
     """
 
     def __init__(
-        self, command: str, args: List[str], env: Optional[Dict[str, str]] = None
+        self,
+        command: Optional[str] = None,
+        args: Optional[List[str]] = None,
+        env: Optional[Dict[str, str]] = None,
+        url: Optional[str] = None,
+        transport: Optional[TransportName] = None,
+        headers: Optional[Dict[str, str]] = None,
     ):
-        self.params = StdioServerParameters(command=command, args=args, env=env)
+        self.url = url
+        self.headers = headers
+        self.params: Optional[StdioServerParameters] = None
+        if url is not None:
+            self.transport = transport or (
+                "sse" if url.rstrip("/").endswith("/sse") else "streamable_http"
+            )
+        elif command is not None:
+            self.transport = "stdio"
+            self.params = StdioServerParameters(
+                command=command, args=args or [], env=env
+            )
+        else:
+            raise ValueError("MCPClient needs either a command or a url")
         self.session: Optional[ClientSession] = None
         self._exit_stack = contextlib.AsyncExitStack()
+        # Called when the server reports that its tool list changed
+        self.on_tools_changed: Optional[Callable[[], None]] = None
+
+    def _transport_context(self) -> Any:
+        if self.params is not None:
+            return stdio_client(self.params)
+        url = self.url
+        if url is None:
+            raise ValueError("MCPClient needs either a command or a url")
+        if self.transport == "sse":
+            from mcp.client.sse import sse_client
+
+            return sse_client(url, headers=self.headers)
+
+        return self._streamable_http(url)
 
-    async def __aenter__(self):
+    @contextlib.asynccontextmanager
+    async def _streamable_http(self, url: str) -> AsyncIterator[Any]:
+        from mcp.client.streamable_http import streamable_http_client
+
+        async with shared_http_client(self.headers) as http_client:
+            async with streamable_http_client(url, http_client=http_client) as streams:
+                yield streams
+
+    async def __aenter__(self) -> "MCPClient":
         # Establish connection
-        read, write = await self._exit_stack.enter_async_context(
-            stdio_client(self.params)
-        )
+        streams = await self._exit_stack.enter_async_context(self._transport_context())
+        # Streamable HTTP may also yield a session-id getter
+        read, write = streams[0], streams[1]
         self.session = await self._exit_stack.enter_async_context(
-            ClientSession(read, write)
+            ClientSession(read, write, message_handler=self._handle_message)
         )
         await self.session.initialize()
         return self
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
         await self._exit_stack.aclose()
         self.session = None
 
+    async def _handle_message(self, message: Any) -> None:
+        # Notifications may arrive wrapped in a ServerNotification root model
+        notification = getattr(message, "root", message)
+        if isinstance(notification, ToolListChangedNotification):
+            if self.on_tools_changed:
+                self.on_tools_changed()
+
     async def list_tools(self) -> List[Any]:
         if not self.session:
             raise RuntimeError("MCP Client not connected. Use 'async with client:'.")
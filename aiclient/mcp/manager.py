@@ -1,19 +1,67 @@
-import contextlib
-from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from .client import MCPClient
+from mcp.types import Tool as MCPTool
+
+from .client import MCPClient, TransportName
+
+logger = logging.getLogger("aiclient.mcp")
 
 
 class MCPServerManager:
     """
     Manages the lifecycle of MCP servers.
+
+    Discovered tools are cached per server and only fetched again when the
+    server sends `notifications/tools/list_changed`, when `tools_ttl` seconds
+    have passed (if set), or on `list_global_tools(refresh=True)`.
+
+    Servers start concurrently, each bounded by `startup_timeout` seconds. A
+    server that fails to start is logged and recorded in `failed_servers`;
+    the others stay usable. Lazy servers are not started with the manager but
+    on first use. If they declare their `tools`, that is the first call to one
+    of those tools; otherwise it is the first tool discovery.
+
+    A server registered with `pool_size > 1` runs that many connections (for
+    stdio servers: processes), and each call goes to the least busy one, so
+    concurrent tool calls do not queue behind a single session.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        tools_ttl: Optional[float] = None,
+        startup_timeout: Optional[float] = 30.0,
+        lazy: bool = False,
+    ):
+        self.tools_ttl = tools_ttl
+        self.startup_timeout = startup_timeout
+        self.lazy = lazy
+        self.failed_servers: Dict[str, Exception] = {}
         self._tool_server_map: Dict[str, str] = {}
+        # server name -> primary client; _pools holds all of a server's clients
         self._clients: Dict[str, MCPClient] = {}
-        self._exit_stack = contextlib.AsyncExitStack()
+        self._pools: Dict[str, List[MCPClient]] = {}
+        self._in_flight: Dict[int, int] = {}
+        self._options: Dict[str, Dict[str, Any]] = {}
+        # server name -> (tasks owning the connections, their "ready"
+        # futures, the "all connected" future)
+        self._connections: Dict[
+            str,
+            Tuple[
+                List[asyncio.Task[None]],
+                List[asyncio.Future[None]],
+                asyncio.Future[Any],
+            ],
+        ] = {}
+        self._stop: Optional[asyncio.Event] = None
         self._is_active = False
+        # server name -> (fetched at, tools)
+        self._tools_cache: Dict[str, Tuple[float, List[Any]]] = {}
+        self._all_tools: List[Any] = []
+        self._tools_version = 0
+        self._discovery_lock = asyncio.Lock()
 
     @property
     def is_active(self) -> bool:
@@ -23,79 +71,256 @@ class MCPServerManager:
     def has_servers(self) -> bool:
         return bool(self._clients)
 
+    @property
+    def tools_version(self) -> int:
+        """Incremented whenever the aggregated tool list is rebuilt."""
+        return self._tools_version
+
     def add_server(
         self,
         name: str,
-        command: str,
-        args: List[str],
+        command: Optional[str] = None,
+        args: Optional[List[str]] = None,
         env: Optional[Dict[str, str]] = None,
+        url: Optional[str] = None,
+        transport: Optional[TransportName] = None,
+        headers: Optional[Dict[str, str]] = None,
+        lazy: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        tools: Optional[List[Union[MCPTool, Dict[str, Any]]]] = None,
+        pool_size: int = 1,
     ):
         """
         Register a server config. Does not connect yet.
+
+        Local servers are launched from `command`/`args`; remote ones are
+        reached by `url` (see MCPClient for the transports).
+
+        `lazy` and `timeout` override the manager defaults for this server.
+        `tools` declares the server's tool definitions up front so a lazy
+        server does not have to be started just to list them.
         """
-        self._clients[name] = MCPClient(command, args, env)
+        pool = []
+        for _ in range(max(1, pool_size)):
+            client = MCPClient(
+                command, args, env, url=url, transport=transport, headers=headers
+            )
+            client.on_tools_changed = lambda: self.invalidate_tools(name)
+            pool.append(client)
+        self._pools[name] = pool
+        self._clients[name] = pool[0]
+        self._options[name] = {
+            "lazy": self.lazy if lazy is None else lazy,
+            "timeout": self.startup_timeout if timeout is None else timeout,
+            "tools": [
+                t if isinstance(t, MCPTool) else MCPTool.model_validate(t)
+                for t in tools or []
+            ],
+        }
+
+    def invalidate_tools(self, name: Optional[str] = None) -> None:
+        """Drop cached tools for one server (or all) so they are fetched again."""
+        if name is None:
+            self._tools_cache.clear()
+        else:
+            self._tools_cache.pop(name, None)
 
     async def __aenter__(self):
         """
-        Start all registered servers.
+        Start all registered (non-lazy) servers concurrently.
         """
-        for name, client in self._clients.items():
-            try:
-                await self._exit_stack.enter_async_context(client)
-            except Exception as e:
-                # TODO: Log error, maybe skip this server or fail hard?
-                print(f"Failed to start MCP server {name}: {e}")
-                # For now, let's re-raise to be safe, or continue?
-                # Re-raising is safer for consistency.
-                raise e
+        self._stop = asyncio.Event()
+        self.failed_servers.clear()
+        eager = [name for name in self._clients if not self._options[name]["lazy"]]
+        await asyncio.gather(
+            *(self.connect(name) for name in eager), return_exceptions=True
+        )
         self._is_active = True
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         self._is_active = False
-        await self._exit_stack.aclose()
+        self._tools_cache.clear()
+        if self._stop:
+            self._stop.set()
+            self._stop = None
+        tasks = [task for tasks, _, _ in self._connections.values() for task in tasks]
+        self._connections.clear()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def is_connected(self, name: str) -> bool:
+        connection = self._connections.get(name)
+        if connection is None:
+            return False
+        ready = connection[2]
+        return ready.done() and not ready.cancelled() and ready.exception() is None
+
+    async def _serve(
+        self,
+        name: str,
+        client: MCPClient,
+        ready: asyncio.Future[None],
+        stop: asyncio.Event,
+    ) -> None:
+        """
+        Own one connection for the manager's lifetime. The stdio and session
+        contexts must be entered and exited in the same task.
+        """
+        try:
+            async with client:
+                ready.set_result(None)
+                await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning("MCP server %s stopped: %s", name, e)
+
+    async def connect(self, name: str) -> MCPClient:
+        """
+        Start a server if needed and wait (up to its timeout) until it is
+        ready. Concurrent callers share one startup.
+        """
+        if self._stop is None:
+            raise RuntimeError("MCP servers not started. Use 'async with manager:'.")
+        if name in self.failed_servers:
+            raise RuntimeError(
+                f"MCP server {name} failed to start: {self.failed_servers[name]}"
+            )
+
+        connection = self._connections.get(name)
+        if connection is None:
+            loop = asyncio.get_running_loop()
+            tasks: List[asyncio.Task[None]] = []
+            readies: List[asyncio.Future[None]] = []
+            for client in self._pools[name]:
+                member_ready: asyncio.Future[None] = loop.create_future()
+                readies.append(member_ready)
+                tasks.append(
+                    asyncio.create_task(
+                        self._serve(name, client, member_ready, self._stop)
+                    )
+                )
+            ready = asyncio.gather(*readies)
+            connection = self._connections[name] = (tasks, readies, ready)
+
+        tasks, readies, ready = connection
+        try:
+            # Shielded so a caller's timeout does not cancel the shared
+            # future. The first caller to fail stops the startup and fails
+            # the other waiters with the same error.
+            await asyncio.wait_for(
+                asyncio.shield(ready), self._options[name]["timeout"]
+            )
+        except Exception as e:
+            if self._connections.get(name) is connection:
+                del self._connections[name]
+                if isinstance(e, asyncio.TimeoutError):
+                    e = TimeoutError(
+                        f"timed out after {self._options[name]['timeout']}s"
+                    )
+                # Cancelled _serve tasks leave their futures unresolved
+                for member_ready in readies:
+                    if not member_ready.done():
+                        member_ready.set_exception(e)
+                for task in tasks:
+                    task.cancel()
+                self.failed_servers[name] = e
+                logger.warning("Failed to start MCP server %s: %s", name, e)
+            raise
+        return self._clients[name]
+
+    async def _client_for(self, name: str) -> MCPClient:
+        """
+        The least busy client for a server, starting the server first if it
+        is lazy.
+        """
+        if self._options[name]["lazy"] and not self.is_connected(name):
+            await self.connect(name)
+        return min(self._pools[name], key=lambda c: self._in_flight.get(id(c), 0))
 
     async def get_client(self, name: str) -> MCPClient:
         return self._clients[name]
 
-    async def list_global_tools(self) -> List[Dict[str, Any]]:
+    def _is_fresh(self, name: str) -> bool:
+        entry = self._tools_cache.get(name)
+        if entry is None:
+            return False
+        return self.tools_ttl is None or time.monotonic() - entry[0] < self.tools_ttl
+
+    async def list_global_tools(self, refresh: bool = False) -> List[Any]:
         """
         Aggregate tools from all connected servers.
+        Served from the cache unless a server's tools are stale or missing.
         """
-        all_tools = []
-        # Clear map to rebuild
-        self._tool_server_map.clear()
+        if refresh:
+            self.invalidate_tools()
+
+        if self._is_current():
+            return self._all_tools
+
+        # Concurrent callers share one refresh
+        async with self._discovery_lock:
+            if self._is_current():
+                return self._all_tools
+            return await self._refresh_tools()
+
+    def _is_current(self) -> bool:
+        # Servers that failed to start have nothing to list
+        return bool(self._tools_version) and all(
+            self._is_fresh(name) or name in self.failed_servers
+            for name in self._clients
+        )
 
-        for name, client in self._clients.items():
+    async def _refresh_tools(self) -> List[Any]:
+        stale = [name for name in self._clients if not self._is_fresh(name)]
+
+        async def fetch(name: str) -> None:
+            options = self._options[name]
+            if options["lazy"] and options["tools"] and not self.is_connected(name):
+                # Declared tools stand in until the server is actually started
+                self._tools_cache[name] = (time.monotonic(), options["tools"])
+                return
+            if name in self.failed_servers:
+                return
             try:
+                client = await self._client_for(name)
                 tools = await client.list_tools()
-                for t in tools:
-                    all_tools.append(t)
-                    self._tool_server_map[t.name] = name
             except Exception:
-                # Log error
-                pass
+                # Server unavailable: leave it uncached so the next call retries
+                self._tools_cache.pop(name, None)
+                return
+            self._tools_cache[name] = (time.monotonic(), tools)
+
+        await asyncio.gather(*(fetch(name) for name in stale))
+
+        all_tools = []
+        self._tool_server_map.clear()
+        for name in self._clients:
+            entry = self._tools_cache.get(name)
+            if entry is None:
+                continue
+            for t in entry[1]:
+                all_tools.append(t)
+                self._tool_server_map[t.name] = name
+        self._all_tools = all_tools
+        self._tools_version += 1
         return all_tools
 
     async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
         server_name = self._tool_server_map.get(name)
-        if server_name:
-            client = self._clients.get(server_name)
-            if client:
-                return await client.call_tool(name, arguments)
-
-        # Fallback: Inefficient search (useful if map stale or not inited)
-        # Or we can just raise error if we enforce list_tools called first.
-        # Let's keep fallback for robustness in v0.3 dev.
-        for client in self._clients.values():
-            try:
-                tools = await client.list_tools()
-                for tool in tools:
-                    if tool.name == name:
-                        # Found it! Update map for next time?
-                        # We don't know the server name inside this loop easily
-                        # unless iterating items.
-                        return await client.call_tool(name, arguments)
-            except Exception:
-                continue
-        raise ValueError(f"Tool {name} not found on any server")
+        if server_name is None:
+            # Index not built yet or stale; discovery is cached, so this only
+            # queries servers whose tool list is missing or expired
+            await self.list_global_tools()
+            server_name = self._tool_server_map.get(name)
+            if server_name is None:
+                raise ValueError(f"Tool {name} not found on any server")
+
+        client = await self._client_for(server_name)
+        key = id(client)
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        try:
+            return await client.call_tool(name, arguments)
+        finally:
+            self._in_flight[key] -= 1
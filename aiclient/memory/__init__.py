@@ -1,4 +1,4 @@
-from .base import Memory
+from .base import Memory, MessageView
 from .simple import ConversationMemory, SlidingWindowMemory
 
-__all__ = ["Memory", "ConversationMemory", "SlidingWindowMemory"]
+__all__ = ["Memory", "MessageView", "ConversationMemory", "SlidingWindowMemory"]
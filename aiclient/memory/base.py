@@ -1,8 +1,72 @@
-from typing import Any, Dict, List, Protocol
+from collections.abc import Sequence
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Union,
+    overload,
+)
 
 from ..data_types import BaseMessage
 
 
+class MessageView(Sequence[BaseMessage]):
+    """
+    Read-only, versioned view over a memory's message list.
+
+    The view shares the underlying list with the memory instead of copying it.
+    Memories only ever append to that list or replace it wholesale, so a view
+    pinned to a length keeps seeing the same messages even as new ones arrive.
+    """
+
+    __slots__ = ("_items", "_length", "version")
+
+    def __init__(
+        self, items: List[BaseMessage], version: int, length: Optional[int] = None
+    ) -> None:
+        self._items = items
+        self._length = len(items) if length is None else length
+        self.version = version
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> BaseMessage: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[BaseMessage]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[BaseMessage, List[BaseMessage]]:
+        if isinstance(index, slice):
+            return self._items[slice(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("MessageView index out of range")
+        return self._items[index]
+
+    def __iter__(self) -> Iterator[BaseMessage]:
+        items = self._items
+        for i in range(self._length):
+            yield items[i]
+
+    def __add__(self, other: Iterable[BaseMessage]) -> List[BaseMessage]:
+        return [*self, *other]
+
+    def __radd__(self, other: Iterable[BaseMessage]) -> List[BaseMessage]:
+        return [*other, *self]
+
+    def __repr__(self) -> str:
+        return f"MessageView(version={self.version}, messages={self._length})"
+
+
 class Memory(Protocol):
     """
     Protocol for conversation memory systems.
@@ -16,6 +80,14 @@ class Memory(Protocol):
         """Retrieve stored messages."""
         ...
 
+    def get_view(self) -> MessageView:
+        """Return a read-only view of the stored messages without copying."""
+        ...
+
+    def messages_since(self, version: int) -> List[BaseMessage]:
+        """Return the messages added after the given view version."""
+        ...
+
     def clear(self) -> None:
         """Clear all messages."""
         ...
@@ -1,3 +1,4 @@
+import bisect
 from typing import Any, Dict, List
 
 from ..data_types import (
@@ -7,25 +8,46 @@ from ..data_types import (
     ToolMessage,
     UserMessage,
 )
-from .base import Memory
+from .base import Memory, MessageView
 
 
 class ConversationMemory(Memory):
     """
     Simple memory that stores all messages in a list.
+
+    The list is append-only: anything that drops messages (clear, load,
+    truncation) swaps in a new list, so views handed out earlier stay valid.
     """
 
     def __init__(self):
         self._messages: List[BaseMessage] = []
+        # Version at which each message was added, parallel to _messages
+        self._stamps: List[int] = []
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """Monotonic counter bumped on every added message."""
+        return self._version
 
     def add_message(self, message: BaseMessage) -> None:
+        self._version += 1
         self._messages.append(message)
+        self._stamps.append(self._version)
 
     def get_messages(self) -> List[BaseMessage]:
         return list(self._messages)
 
+    def get_view(self) -> MessageView:
+        return MessageView(self._messages, self._version)
+
+    def messages_since(self, version: int) -> List[BaseMessage]:
+        # Stamps only grow along the list, so the new messages are a suffix
+        return self._messages[bisect.bisect_right(self._stamps, version) :]
+
     def clear(self) -> None:
         self._messages = []
+        self._stamps = []
 
     def save(self) -> Dict[str, Any]:
         # Serialize messages
@@ -39,6 +61,7 @@ class ConversationMemory(Memory):
     def load(self, data: Dict[str, Any]) -> None:
         raw_msgs = data.get("messages", [])
         self._messages = []
+        self._stamps = []
         # Rudimentary deserialization - ideal would be pydantic adapter
         for m in raw_msgs:
             role = m.get("role")
@@ -59,6 +82,10 @@ class ConversationMemory(Memory):
                         content=str(content),
                     )
                 )
+        self._stamps = list(
+            range(self._version + 1, self._version + len(self._messages) + 1)
+        )
+        self._version += len(self._messages)
 
 
 class SlidingWindowMemory(ConversationMemory):
@@ -75,12 +102,19 @@ class SlidingWindowMemory(ConversationMemory):
         super().add_message(message)
         self._truncate()
 
+    def messages_since(self, version: int) -> List[BaseMessage]:
+        # Preserved system messages keep their old stamps at the front
+        return [m for m, s in zip(self._messages, self._stamps) if s > version]
+
     def _truncate(self):
         if len(self._messages) <= self.max_messages:
             return
 
+        # Messages paired with their stamps so both lists stay aligned
+        stamped = list(zip(self._messages, self._stamps))
+
         # Identify System Messages to keep
-        system_msgs = [m for m in self._messages if isinstance(m, SystemMessage)]
+        system_msgs = [p for p in stamped if isinstance(p[0], SystemMessage)]
 
         # We want to keep (System Messages) + (Last K messages)
         # But total count must be <= max_messages
@@ -88,11 +122,12 @@ class SlidingWindowMemory(ConversationMemory):
         remaining_slots = self.max_messages - len(system_msgs)
         if remaining_slots < 0:
             # Degenerate case: more system messages than max allowed. Keep max allowed.
-            self._messages = self._messages[-self.max_messages :]
-            return
-
-        # Keep system messages + last remaining_slots
-        others = [m for m in self._messages if not isinstance(m, SystemMessage)]
-        keep_others = others[-remaining_slots:] if remaining_slots > 0 else []
-
-        self._messages = system_msgs + keep_others
+            kept = stamped[-self.max_messages :]
+        else:
+            # Keep system messages + last remaining_slots
+            others = [p for p in stamped if not isinstance(p[0], SystemMessage)]
+            keep_others = others[-remaining_slots:] if remaining_slots > 0 else []
+            kept = system_msgs + keep_others
+
+        self._messages = [m for m, _ in kept]
+        self._stamps = [s for _, s in kept]
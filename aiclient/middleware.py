@@ -1,16 +1,35 @@
+import contextvars
 import logging
 import re
-from typing import Any, List, Protocol, Union
+from typing import Any, Callable, List, Optional, Protocol, TypeVar, Union
 
-import contextvars
+from .context import RequestContext
+from .data_types import BaseMessage, ModelResponse, StreamChunk, Usage
 
-from .data_types import BaseMessage, ModelResponse
+# Model of a request whose hooks are called directly, without a RequestContext
+_request_model_context: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "request_model", default=None
+)
 
-# ContextVar to store request-scoped model name
-_request_model_context = contextvars.ContextVar("request_model", default=None)
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def passthrough(hook: F) -> F:
+    """
+    Mark a hook that does nothing (returns its input unchanged), so the
+    compiled middleware pipeline leaves it out.
+    """
+    hook.passthrough = True  # type: ignore[attr-defined]
+    return hook
 
 
 class Middleware(Protocol):
+    """
+    Request/response hooks. Any hook may also declare a keyword parameter
+    `context: RequestContext` to receive the per-call context (request ID,
+    model, timings, attempt, scratch space for per-request state).
+    """
+
     def before_request(
         self, model: str, prompt: Union[str, List[BaseMessage]]
     ) -> Union[str, List[BaseMessage], ModelResponse]:
@@ -19,6 +38,7 @@ class Middleware(Protocol):
         Returns the modified prompt (or messages).
         If a ModelResponse is returned, the provider call is skipped and this response
         is returned immediately (short-circuit).
+        May be `async def`; or add a `before_request_async` used by async calls.
         """
         ...
 
@@ -26,6 +46,7 @@ class Middleware(Protocol):
         """
         Intercept and modify the response after it is received from the provider.
         Returns the modified response.
+        May be `async def`; or add an `after_response_async` used by async calls.
         """
         ...
 
@@ -37,6 +58,27 @@ class Middleware(Protocol):
         ...
 
 
+class StreamMiddleware(Protocol):
+    """
+    Optional hooks for streamed responses. Middleware without `on_stream_end`
+    gets `after_response` with the aggregated response instead.
+    """
+
+    def on_chunk(self, chunk: StreamChunk) -> None:
+        """
+        Called for every chunk as it arrives. Runs on the hot path of the
+        stream, so keep it cheap.
+        """
+        ...
+
+    def on_stream_end(self, response: ModelResponse, usage: Optional[Usage]) -> None:
+        """
+        Called once the stream completes, with the aggregated response and
+        the token usage the provider reported (None if it reported none).
+        """
+        ...
+
+
 class CostTrackingMiddleware:
     """
     Middleware to track total usage/cost across requests.
@@ -90,33 +132,26 @@ class CostTrackingMiddleware:
         self.total_cost_usd = 0.0
 
     def before_request(
-        self, model: str, prompt: Union[str, List[BaseMessage]]
+        self,
+        model: str,
+        prompt: Union[str, List[BaseMessage]],
+        context: Optional[RequestContext] = None,
     ) -> Union[str, List[BaseMessage]]:
-        # Store model context if needed, but we can usually get it from response or
-        # just assume for now we rely on the provider returning usage.
-        # Issue: ModelResponse doesn't always contain the requested model name if
-        # provider doesn't echo it.
-        # But CostTracker is a stateful object, we can't easily map request->response
-        # without a request ID.
-        # For v0.1 simplicty, let's assume we can match loosely or we might need the
-        # model name passed to after_response?
-        # The Middleware protocol for `after_response` only takes response.
-        # We might need to store the last requested model on the middleware instance?
-        # NOT thread safe, but acceptable for this simple synchronous client.
-        # Use contextvars for thread-safe/async-safe context storage
-        _request_model_context.set(model)
+        if context is None:
+            _request_model_context.set(model)
         return prompt
 
-    def after_response(self, response: ModelResponse) -> ModelResponse:
+    def after_response(
+        self, response: ModelResponse, context: Optional[RequestContext] = None
+    ) -> ModelResponse:
         if response.usage:
             in_tok = response.usage.input_tokens
             out_tok = response.usage.output_tokens
             self.total_input_tokens += in_tok
             self.total_output_tokens += out_tok
 
-            # pricing lookup
-            # Retrieve model from context var
-            model_name = _request_model_context.get()
+            # pricing lookup, by the model this request was sent to
+            model_name = context.model if context else _request_model_context.get()
             model_key = self._find_model_key(model_name)
             if model_key:
                 rates = self.PRICING[model_key]
@@ -127,10 +162,11 @@ class CostTrackingMiddleware:
 
         return response
 
+    @passthrough
     def on_error(self, error: Exception, model: str, **kwargs: Any) -> None:
         pass
 
-    def _find_model_key(self, model_name: str) -> Union[str, None]:
+    def _find_model_key(self, model_name: Optional[str]) -> Union[str, None]:
         if not model_name:
             return None
         # Sort keys by length descending to match the most specific model first
@@ -204,11 +240,19 @@ class LoggingMiddleware:
             return text
         return text[:max_length] + "..."
 
+    @staticmethod
+    def _request_id(context: Optional[RequestContext]) -> str:
+        return f"id={context.request_id} " if context else ""
+
     def before_request(
-        self, model: str, prompt: Union[str, List[BaseMessage]]
+        self,
+        model: str,
+        prompt: Union[str, List[BaseMessage]],
+        context: Optional[RequestContext] = None,
     ) -> Union[str, List[BaseMessage]]:
         """Log the request before sending."""
-        _request_model_context.set(model)
+        if context is None:
+            _request_model_context.set(model)
 
         if self.log_prompts:
             if isinstance(prompt, str):
@@ -225,15 +269,21 @@ class LoggingMiddleware:
             prompt_text = self._redact(prompt_text)
 
             self.logger.log(
-                self.log_level, f"[REQUEST] model={model} prompt={prompt_text}"
+                self.log_level,
+                f"[REQUEST] {self._request_id(context)}model={model} "
+                f"prompt={prompt_text}",
             )
 
         return prompt
 
-    def after_response(self, response: ModelResponse) -> ModelResponse:
+    def after_response(
+        self, response: ModelResponse, context: Optional[RequestContext] = None
+    ) -> ModelResponse:
         """Log the response after receiving."""
-        model_name = _request_model_context.get()
-        log_parts = [f"[RESPONSE] model={model_name}"]
+        model_name = context.model if context else _request_model_context.get()
+        log_parts = [f"[RESPONSE] {self._request_id(context)}model={model_name}"]
+        if context:
+            log_parts.append(f"elapsed={context.elapsed:.3f}s")
 
         if self.log_responses:
             response_text = self._truncate(response.text, self.max_response_length)
@@ -253,4 +303,7 @@ class LoggingMiddleware:
     def on_error(self, error: Exception, model: str, **kwargs: Any) -> None:
         """Log errors."""
         attempt = kwargs.get("attempt", 0)
-        self.logger.error(f"[ERROR] model={model} attempt={attempt} error={error}")
+        request_id = self._request_id(kwargs.get("context"))
+        self.logger.error(
+            f"[ERROR] {request_id}model={model} attempt={attempt} error={error}"
+        )
@@ -1,14 +1,45 @@
 import asyncio
-import json
-from typing import Any, Dict, Iterator, List, Type, TypeVar, Union
+import contextlib
+import functools
+import time
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from pydantic import BaseModel
 
-from ..data_types import BaseMessage, ModelResponse, UserMessage
+from ..context import RequestContext, accepts_context, estimate_tokens
+from ..data_types import (
+    AssistantMessage,
+    BaseMessage,
+    ModelResponse,
+    StreamChunk,
+    StreamMetrics,
+    UserMessage,
+)
+from ..exceptions import StreamTimeoutError
+from ..images import ImageOptimizer, resolve_images
 from ..middleware import Middleware
 from ..providers.base import Provider
-from ..transport.base import Transport
+from ..transport.base import StreamTimeouts, Transport
+from ..transport.encoding import materialize_payload
 from ..utils import should_retry
+from .pipeline import MiddlewarePipeline
+from .singleflight import SingleFlight, request_key
+from .streaming import StopWhen, StreamState
+from .structured import PartialJSONParser, StructuredOutput
 
 T = TypeVar("T", bound=BaseModel)
 
@@ -21,9 +52,13 @@ class ChatModel:
         model_name: str,
         provider: Provider,
         transport: Transport,
-        middlewares: List[Middleware] = None,
+        middlewares: Optional[List[Middleware]] = None,
         max_retries: int = 3,
         retry_delay: float = 1.0,
+        metrics_sink: Optional[Callable[[StreamMetrics], None]] = None,
+        resume_streams: bool = False,
+        stream_timeouts: Optional[StreamTimeouts] = None,
+        single_flight: Optional[SingleFlight] = None,
     ):
         self.model_name = model_name
         self.provider = provider
@@ -31,18 +66,111 @@ class ChatModel:
         self.middlewares = middlewares or []
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        # Receives the StreamMetrics of every completed stream
+        self.metrics_sink = metrics_sink
+        # Continue streams that fail mid-way from the text received so far
+        self.resume_streams = resume_streams
+        # first_byte/idle are enforced on async streams (connect: transport)
+        self.stream_timeouts = stream_timeouts
+        # Whether a StreamTimeoutError is retried on this model
+        self.retry_stalls = stream_timeouts.retry if stream_timeouts else True
+        # Identical concurrent async requests share one upstream call
+        self.single_flight = single_flight
+
+    @property
+    def middlewares(self) -> List[Middleware]:
+        return self._middlewares
+
+    @middlewares.setter
+    def middlewares(self, middlewares: List[Middleware]) -> None:
+        self._middlewares = middlewares
+        self._pipeline: Optional[MiddlewarePipeline] = None
+
+    @property
+    def pipeline(self) -> MiddlewarePipeline:
+        """
+        The middleware compiled into per-phase hook lists. Recompiled when
+        the (possibly Client-shared) list changes: middleware added, removed
+        or replaced in place.
+        """
+        pipeline = self._pipeline
+        if pipeline is None or not pipeline.compiled_from(self._middlewares):
+            pipeline = self._pipeline = MiddlewarePipeline(self._middlewares)
+        return pipeline
+
+    def _image_optimizer(self) -> Optional[ImageOptimizer]:
+        optimizer = getattr(self.provider, "image_optimizer", None)
+        return optimizer if isinstance(optimizer, ImageOptimizer) else None
+
+    def _optimize_images(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Apply the provider's image optimizer, if any, before the payload build."""
+        optimizer = self._image_optimizer()
+        if optimizer is None:
+            return messages
+        return optimizer.optimize_messages(
+            messages,
+            getattr(self.provider, "name", "openai"),
+            include_urls=getattr(self.provider, "fetches_image_urls", True),
+        )
+
+    async def _resolve_images(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Prefetch images concurrently over the transport's pooled media client,
+        then optimize them in a worker thread (decoding and resizing is CPU-bound).
+        """
+        await resolve_images(
+            messages,
+            client=getattr(self.transport, "media_client", None),
+            include_urls=getattr(self.provider, "fetches_image_urls", True),
+        )
+        if self._image_optimizer() is None or not any(
+            isinstance(getattr(m, "content", None), list) for m in messages
+        ):
+            return messages
+        return await asyncio.to_thread(self._optimize_images, messages)
+
+    def _build_request(
+        self, messages: List[BaseMessage], **kwargs: Any
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Build the provider payload in a form the transport can send."""
+        endpoint, data = self.provider.prepare_request(
+            self.model_name, messages, **kwargs
+        )
+        if not getattr(self.transport, "supports_binary_payloads", False):
+            data = materialize_payload(data)
+        return endpoint, data
+
+    def _new_context(
+        self, stream: bool = False, max_tokens: Optional[int] = None
+    ) -> RequestContext:
+        name = getattr(self.provider, "name", None)
+        return RequestContext(
+            model=self.model_name,
+            provider=name if isinstance(name, str) else None,
+            stream=stream,
+            max_output_tokens=max_tokens,
+        )
+
+    def _transport_method(
+        self, name: str, context: RequestContext
+    ) -> Callable[..., Any]:
+        """A transport method, given the context if it takes one."""
+        method: Callable[..., Any] = getattr(self.transport, name)
+        if accepts_context(method):
+            return functools.partial(method, context=context)
+        return method
 
     def generate(
         self,
-        prompt: Union[str, List[BaseMessage]],
-        response_model: Type[T] = None,
+        prompt: Union[str, Sequence[BaseMessage]],
+        response_model: Optional[Type[T]] = None,
         strict: bool = False,
-        tools: List[Any] = None,
-        temperature: float = None,
-        max_tokens: int = None,
-        top_p: float = None,
-        top_k: int = None,
-        stop: Union[str, List[str]] = None,
+        tools: Optional[List[Any]] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        stop: Optional[Union[str, List[str]]] = None,
     ) -> Union[ModelResponse, T]:
         """
         Generate a response synchronously.
@@ -50,42 +178,30 @@ class ChatModel:
         Otherwise returns ModelResponse.
         """
         # 1. Prepare Messages
-        messages = prompt
-        if isinstance(prompt, str):
-            messages = [UserMessage(content=prompt)]
+        messages = self._to_messages(prompt)
 
         # 2. Middleware Hook: before_request
-        # 2. Middleware Hook: before_request
-        for mw in self.middlewares:
-            result = mw.before_request(self.model_name, messages)
-            if isinstance(result, ModelResponse):
-                # Short-circuit: return cached/mocked response immediately
-                return result
-            messages = result
+        pipeline = self.pipeline
+        context = self._new_context(max_tokens=max_tokens)
+        messages = pipeline.before_request(self.model_name, messages, context)
+        if isinstance(messages, ModelResponse):
+            # Short-circuit: return cached/mocked response immediately
+            return messages
 
         # 3. Handling Structured Output
         response_schema = None
         if response_model:
-            response_schema = response_model.model_json_schema()
+            structured = StructuredOutput.for_model(response_model)
+            response_schema = structured.schema
 
             # If NOT strict, fallback to legacy prompt injection
             if not strict:
-                instruction = (
-                    "\n\nRestricted Output Mode: You must response strictly with a "
-                    "valid JSON object that matches the following JSON Schema.\n"
-                    "Do not return the schema itself. Return the data instance.\n"
-                    f"Schema:\n{json.dumps(response_schema, indent=2)}"
-                )
-                if messages and isinstance(messages[-1], UserMessage):
-                    last_msg = messages[-1]
-                    new_content = last_msg.content + instruction
-                    messages[-1] = UserMessage(content=new_content)
-                else:
-                    messages.append(UserMessage(content=instruction))
+                messages = structured.inject_instruction(messages)
+        context.input_tokens_estimate = estimate_tokens(messages)
+        messages = self._optimize_images(messages)
 
         # 4. Execute Request
-        endpoint, data = self.provider.prepare_request(
-            self.model_name,
+        endpoint, data = self._build_request(
             messages,
             tools=tools,
             response_schema=response_schema if strict else None,
@@ -97,15 +213,17 @@ class ChatModel:
             stop=stop,
         )
 
-        response_data = None
+        send = self._transport_method("send", context)
+        response_data: Dict[str, Any] = {}
         for attempt in range(self.max_retries + 1):
+            context.attempt = attempt
+            context.sent = time.perf_counter()
             try:
-                response_data = self.transport.send(endpoint, data)
+                response_data = send(endpoint, data)
                 break
             except Exception as e:
                 # Notify middleware of error
-                for mw in self.middlewares:
-                    mw.on_error(e, self.model_name, attempt=attempt)
+                pipeline.on_error(e, self.model_name, context)
 
                 # We assume transport raises exceptions that should_retry can inspect
                 # Specifically HTTPTransport raises httpx.HTTPStatusError for 4xx/5xx if
@@ -116,81 +234,59 @@ class ChatModel:
                     raise e
 
         model_response = self.provider.parse_response(response_data)
+        self._finish_context(context, model_response)
 
         # 5. Middleware Hook: after_response
-        for mw in self.middlewares:
-            model_response = mw.after_response(model_response)
+        model_response = pipeline.after_response(model_response, context)
 
         # 6. Parse Structured Output
         if response_model:
-            try:
-                # Basic cleanup
-                text = model_response.text.strip()
-                if text.startswith("```"):
-                    text = text.split("\n", 1)[1]
-                    if text.endswith("```"):
-                        text = text.rsplit("\n", 1)[0]
-
-                parsed = json.loads(text)
-                return response_model.model_validate(parsed)
-            except (json.JSONDecodeError, ValueError) as e:
-                raise ValueError(
-                    f"Failed to parse structured output: {e}. "
-                    f"Raw: {model_response.text}"
-                )
+            parsed: T = structured.parse(model_response.text)
+            return parsed
 
         return model_response
 
     async def generate_async(
         self,
-        prompt: Union[str, List[BaseMessage]],
-        response_model: Type[T] = None,
+        prompt: Union[str, Sequence[BaseMessage]],
+        response_model: Optional[Type[T]] = None,
         strict: bool = False,
-        tools: List[Any] = None,
-        temperature: float = None,
-        max_tokens: int = None,
-        top_p: float = None,
-        top_k: int = None,
-        stop: Union[str, List[str]] = None,
+        tools: Optional[List[Any]] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        stop: Optional[Union[str, List[str]]] = None,
     ) -> Union[ModelResponse, T]:
         """
         Generate a response asynchronously.
         """
         # 1. Prepare Messages
-        messages = prompt
-        if isinstance(prompt, str):
-            messages = [UserMessage(content=prompt)]
+        messages = self._to_messages(prompt)
 
         # 2. Middleware Hook: before_request
-        # 2. Middleware Hook: before_request
-        for mw in self.middlewares:
-            result = mw.before_request(self.model_name, messages)
-            if isinstance(result, ModelResponse):
-                return result
-            messages = result
+        context = self._new_context(max_tokens=max_tokens)
+        messages = await self.pipeline.before_request_async(
+            self.model_name, messages, context
+        )
+        if isinstance(messages, ModelResponse):
+            return messages
 
         # 3. Handling Structured Output
         response_schema = None
         if response_model:
-            response_schema = response_model.model_json_schema()
+            structured = StructuredOutput.for_model(response_model)
+            response_schema = structured.schema
 
             if not strict:
-                instruction = (
-                    "\n\nRestricted Output Mode: You must response strictly with a "
-                    "valid JSON object that matches the following JSON Schema.\n"
-                    "Do not return the schema itself. Return the data instance.\n"
-                    f"Schema:\n{json.dumps(response_schema, indent=2)}"
-                )
-                if messages and isinstance(messages[-1], UserMessage):
-                    last_msg = messages[-1]
-                    new_content = last_msg.content + instruction
-                    messages[-1] = UserMessage(content=new_content)
-                else:
-                    messages.append(UserMessage(content=instruction))
+                messages = structured.inject_instruction(messages)
+        context.input_tokens_estimate = estimate_tokens(messages)
 
-        # 4. Execute Request
-        endpoint, data = self.provider.prepare_request(
-            self.model_name,
+        # 4. Load and optimize images off the event loop before the payload build
+        messages = await self._resolve_images(messages)
+
+        # 5. Execute Request
+        endpoint, data = self._build_request(
             messages,
             tools=tools,
             response_schema=response_schema if strict else None,
@@ -201,21 +297,49 @@ class ChatModel:
             top_k=top_k,
             stop=stop,
         )
+        if self.single_flight is not None:
+            # Only the upstream call is shared: each caller finishes its own
+            # context and runs after_response on its own copy
+            try:
+                model_response = await self.single_flight.do(
+                    request_key(endpoint, data),
+                    functools.partial(self._send_async, endpoint, data, context),
+                )
+            except Exception as e:
+                if context.sent is None:
+                    # Failed while waiting on another caller's request
+                    await self.pipeline.on_error_async(e, self.model_name, context)
+                raise
+            model_response = model_response.model_copy()
+        else:
+            model_response = await self._send_async(endpoint, data, context)
+        self._finish_context(context, model_response)
+
+        # 6. Middleware Hook: after_response
+        model_response = await self.pipeline.after_response_async(
+            model_response, context
+        )
+
+        # 7. Structured Output Parsing
+        if response_model:
+            parsed: T = structured.parse(model_response.text)
+            return parsed
 
-        response_data = None
+        return model_response
+
+    async def _send_async(
+        self, endpoint: str, data: Dict[str, Any], context: RequestContext
+    ) -> ModelResponse:
+        send_async = self._transport_method("send_async", context)
+        response_data: Dict[str, Any] = {}
         for attempt in range(self.max_retries + 1):
+            context.attempt = attempt
+            context.sent = time.perf_counter()
             try:
-                response_data = await self.transport.send_async(endpoint, data)
+                response_data = await send_async(endpoint, data)
                 break
             except Exception as e:
-                # Notify middleware of error
-                for mw in self.middlewares:
-                    if hasattr(mw, "on_error_async"):
-                        await mw.on_error_async(e, self.model_name, attempt=attempt)
-                    elif asyncio.iscoroutinefunction(mw.on_error):
-                        await mw.on_error(e, self.model_name, attempt=attempt)
-                    else:
-                        mw.on_error(e, self.model_name, attempt=attempt)
+                await self.pipeline.on_error_async(e, self.model_name, context)
 
                 if attempt == self.max_retries or not should_retry(e):
                     raise e
@@ -223,105 +347,496 @@ class ChatModel:
                     wait_time = self.retry_delay * (2**attempt)
                     await asyncio.sleep(wait_time)
 
-        model_response = self.provider.parse_response(response_data)
+        return self.provider.parse_response(response_data)
 
-        # 5. Middleware Hook: after_response
-        for mw in self.middlewares:
-            model_response = mw.after_response(model_response)
+    @staticmethod
+    def _finish_context(context: RequestContext, response: ModelResponse) -> None:
+        context.finished = time.perf_counter()
+        if context.first_byte is None:
+            # Transport did not record it: the whole response has arrived
+            context.first_byte = context.finished
+        context.usage = response.usage
 
-        # 6. Structured Output Parsing
-        if response_model:
-            try:
-                text = model_response.text.strip()
-                if text.startswith("```"):
-                    text = text.split("\n", 1)[1]
-                    if text.endswith("```"):
-                        text = text.rsplit("\n", 1)[0]
-                parsed = json.loads(text)
-                return response_model.model_validate(parsed)
-            except (json.JSONDecodeError, ValueError) as e:
-                raise ValueError(
-                    f"Failed to parse structured output: {e}. "
-                    f"Raw: {model_response.text}"
-                )
+    def _prepare_stream_messages(
+        self,
+        messages: Union[List[BaseMessage], ModelResponse],
+        structured: Optional[StructuredOutput],
+        strict: bool,
+    ) -> Union[List[BaseMessage], ModelResponse]:
+        """
+        Messages after before_request. A ModelResponse there is a
+        short-circuit (e.g. a cache hit), streamed as a single chunk.
+        """
+        if isinstance(messages, ModelResponse):
+            return messages
+        # Structured output without native support: inject the schema
+        if structured and not strict:
+            messages = structured.inject_instruction(messages)
+        return messages
+
+    @staticmethod
+    def _to_messages(prompt: Union[str, Sequence[BaseMessage]]) -> List[BaseMessage]:
+        if isinstance(prompt, str):
+            return [UserMessage(content=prompt)]
+        if not isinstance(prompt, list):
+            # Memory views and other sequences: hooks and providers get a
+            # real list (a shallow copy, so edits never reach the memory)
+            return list(prompt)
+        return prompt
+
+    @staticmethod
+    def _short_circuit_chunk(response: ModelResponse) -> StreamChunk:
+        return StreamChunk(
+            text=response.text,
+            delta=response.text,
+            tool_calls=response.tool_calls,
+            usage=response.usage,
+        )
 
-        return model_response
+    def _stream_response(
+        self, state: StreamState, context: RequestContext
+    ) -> ModelResponse:
+        """
+        Summarize the completed stream's latency and hand it to the metrics
+        sink; returns the aggregated response for middleware (see
+        StreamMiddleware).
+        """
+        accumulator = state.accumulator
+        response = accumulator.response()
+        response.metrics = state.timer.metrics(
+            self.model_name, accumulator.provider, accumulator.usage
+        )
+        if self.metrics_sink:
+            self.metrics_sink(response.metrics)
+        if context.first_byte is None:
+            context.first_byte = state.timer.connected
+        return response
 
-    async def stream_async(
+    def _new_stream_state(
         self,
-        prompt: Union[str, List[BaseMessage]],
-        temperature: float = None,
-        top_p: float = None,
-        top_k: int = None,
-        stop: Union[str, List[str]] = None,
-    ) -> Iterator[str]:
-        """Stream a response asynchronously."""
-        # 1. Prepare Messages
-        messages = prompt
-        if isinstance(prompt, str):
-            messages = [UserMessage(content=prompt)]
+        context: Optional[RequestContext],
+        stop_when: Optional[StopWhen] = None,
+    ) -> StreamState:
+        hooks = self.pipeline.chunk_hooks(context) if context is not None else []
+        return StreamState(self.provider, hooks, stop_when)
+
+    def _can_retry_stream(
+        self, state: StreamState, error: Exception, attempt: int
+    ) -> bool:
+        """
+        Streams are retried freely until the caller has seen a chunk. After
+        that only with `resume_streams`, on providers that take a prefill.
+        """
+        if attempt >= self.max_retries or not should_retry(error):
+            return False
+        if isinstance(error, StreamTimeoutError) and not self.retry_stalls:
+            return False
+        if not state.yielded:
+            return True
+        return (
+            self.resume_streams
+            and getattr(self.provider, "supports_prefill", False)
+            and state.resumable
+        )
 
-        # 2. Middleware Hook: before_request
-        for mw in self.middlewares:
-            messages = mw.before_request(self.model_name, messages)
+    def _retry_stream_messages(
+        self, messages: List[BaseMessage], state: StreamState
+    ) -> List[BaseMessage]:
+        if not state.yielded:
+            return messages
+        # Continue where the failed stream stopped instead of starting over
+        prefill = state.resume()
+        if not prefill:
+            return messages
+        return list(messages) + [AssistantMessage(content=prefill)]
+
+    async def _stream_async(
+        self,
+        prompt: Union[str, Sequence[BaseMessage]],
+        structured: Optional[StructuredOutput] = None,
+        strict: bool = False,
+        stop_when: Optional[StopWhen] = None,
+        **request_kwargs: Any,
+    ) -> AsyncGenerator[StreamChunk, None]:
+        context = self._new_context(stream=True)
+        messages = await self.pipeline.before_request_async(
+            self.model_name, self._to_messages(prompt), context
+        )
+        messages = self._prepare_stream_messages(messages, structured, strict)
+        if isinstance(messages, ModelResponse):
+            yield self._short_circuit_chunk(messages)
+            return
+        context.input_tokens_estimate = estimate_tokens(messages)
 
-        # 3. Execute Request
-        endpoint, data = self.provider.prepare_request(
-            self.model_name,
+        # 3. Load and optimize images off the event loop before the payload build
+        messages = await self._resolve_images(messages)
+
+        # 4. Execute Request
+        request_kwargs.update(
+            stream=True,
+            response_schema=structured.schema if structured and strict else None,
+            strict=strict,
+        )
+        endpoint, data = self._build_request(messages, **request_kwargs)
+        run = functools.partial(
+            self._run_stream_async,
             messages,
+            endpoint,
+            data,
+            request_kwargs,
+            context,
+            stop_when,
+        )
+        if self.single_flight is None or stop_when is not None:
+            stream = run()
+            shared = False
+        else:
+            # Identical concurrent streams share one upstream request
+            stream = self.single_flight.stream(request_key(endpoint, data), run)
+            shared = True
+        # The upstream yields its chunks, then the aggregated response. Chunk
+        # hooks and stream_end run here, once per caller, with its context
+        chunk_hooks = self.pipeline.chunk_hooks_async(context)
+        response = None
+        try:
+            async with contextlib.aclosing(stream):
+                async for item in stream:
+                    if shared:
+                        if context.sent is None and context.first_byte is None:
+                            # A follower: its first byte is the first relayed item
+                            context.first_byte = time.perf_counter()
+                        item = item.model_copy()
+                    if isinstance(item, ModelResponse):
+                        response = item
+                        continue
+                    for hook, awaitable in chunk_hooks:
+                        result = hook(item)
+                        if awaitable:
+                            await result
+                    yield item
+        except Exception as e:
+            if context.sent is None:
+                # Failed while subscribed to another caller's stream
+                await self.pipeline.on_error_async(e, self.model_name, context)
+            raise
+        if response is not None:
+            self._finish_context(context, response)
+            await self.pipeline.stream_end_async(response, context)
+
+    async def _run_stream_async(
+        self,
+        messages: List[BaseMessage],
+        endpoint: str,
+        data: Dict[str, Any],
+        request_kwargs: Dict[str, Any],
+        context: RequestContext,
+        stop_when: Optional[StopWhen] = None,
+    ) -> AsyncGenerator[Union[StreamChunk, ModelResponse], None]:
+        """
+        The upstream request of `_stream_async`, shareable between callers:
+        its chunks, then the aggregated response. Retries report to
+        `context`, the context of the caller that started it.
+        """
+        state = self._new_stream_state(None, stop_when)
+        stream_async = self._transport_method("stream_async", context)
+        attempt = 0
+        while True:
+            context.attempt = attempt
+            context.sent = time.perf_counter()
+            try:
+                # Closed as soon as this generator stops, whether the stream
+                # ended, hit the stop condition or the caller stopped reading:
+                # the connection is dropped and the provider stops generating
+                upstream = self._watch_stalls(stream_async(endpoint, data))
+                async with contextlib.aclosing(upstream):
+                    async for chunk_data in upstream:
+                        chunk = state.process(chunk_data)
+                        if chunk:
+                            yield chunk
+                            if state.stopped:
+                                break
+                break
+            except Exception as e:
+                await self.pipeline.on_error_async(e, self.model_name, context)
+                if not self._can_retry_stream(state, e, attempt):
+                    raise e
+                endpoint, data = self._build_request(
+                    self._retry_stream_messages(messages, state), **request_kwargs
+                )
+                await asyncio.sleep(self.retry_delay * (2**attempt))
+                attempt += 1
+        chunk = state.finish()
+        if chunk:
+            yield chunk
+        yield self._stream_response(state, context)
+
+    async def _watch_stalls(
+        self, upstream: AsyncIterator[Dict[str, Any]]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Relay the transport stream under the first-byte and idle timeouts,
+        and close it when done. On a stall the pending read is cancelled,
+        which closes the upstream connection, and StreamTimeoutError is
+        raised (retryable, and FallbackChain fails over).
+        """
+        timeouts = self.stream_timeouts or StreamTimeouts()
+        timeout, waiting_for = timeouts.first_byte, "first byte"
+        try:
+            if timeouts.first_byte is None and timeouts.idle is None:
+                async for chunk_data in upstream:
+                    yield chunk_data
+                return
+            while True:
+                try:
+                    chunk_data = await asyncio.wait_for(upstream.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise StreamTimeoutError(
+                        f"Stream stalled: no {waiting_for} within {timeout}s"
+                    ) from None
+                yield chunk_data
+                timeout, waiting_for = timeouts.idle, "chunk"
+        finally:
+            aclose = getattr(upstream, "aclose", None)
+            if aclose:
+                await aclose()
+
+    def _stream(
+        self,
+        prompt: Union[str, Sequence[BaseMessage]],
+        structured: Optional[StructuredOutput] = None,
+        strict: bool = False,
+        stop_when: Optional[StopWhen] = None,
+        **request_kwargs: Any,
+    ) -> Generator[StreamChunk, None, None]:
+        context = self._new_context(stream=True)
+        messages = self.pipeline.before_request(
+            self.model_name, self._to_messages(prompt), context
+        )
+        messages = self._prepare_stream_messages(messages, structured, strict)
+        if isinstance(messages, ModelResponse):
+            yield self._short_circuit_chunk(messages)
+            return
+        context.input_tokens_estimate = estimate_tokens(messages)
+        messages = self._optimize_images(messages)
+
+        # 3. Execute Request
+        request_kwargs.update(
             stream=True,
+            response_schema=structured.schema if structured and strict else None,
+            strict=strict,
+        )
+        endpoint, data = self._build_request(messages, **request_kwargs)
+        state = self._new_stream_state(context, stop_when)
+        stream = self._transport_method("stream", context)
+        attempt = 0
+        while True:
+            context.attempt = attempt
+            context.sent = time.perf_counter()
+            try:
+                upstream = stream(endpoint, data)
+                try:
+                    for chunk_data in upstream:
+                        chunk = state.process(chunk_data)
+                        if chunk:
+                            yield chunk
+                            if state.stopped:
+                                break
+                finally:
+                    # Drop the connection as soon as this generator stops
+                    close = getattr(upstream, "close", None)
+                    if close:
+                        close()
+                break
+            except Exception as e:
+                self.pipeline.on_error(e, self.model_name, context)
+                if not self._can_retry_stream(state, e, attempt):
+                    raise e
+                endpoint, data = self._build_request(
+                    self._retry_stream_messages(messages, state), **request_kwargs
+                )
+                time.sleep(self.retry_delay * (2**attempt))
+                attempt += 1
+        chunk = state.finish()
+        if chunk:
+            yield chunk
+        response = self._stream_response(state, context)
+        self._finish_context(context, response)
+        self.pipeline.stream_end(response, context)
+
+    async def stream_async(
+        self,
+        prompt: Union[str, Sequence[BaseMessage]],
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        stop: Optional[Union[str, List[str]]] = None,
+        stop_when: Optional[StopWhen] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream a response asynchronously.
+
+        `stop_when` (a regex or a callable on the text so far) ends the
+        stream client-side after the chunk that satisfies it. Ending early,
+        by `stop_when` or by closing the generator (`contextlib.aclosing`),
+        closes the upstream connection so the provider stops generating.
+        """
+        stream = self._stream_async(
+            prompt,
+            stop_when=stop_when,
             temperature=temperature,
             top_p=top_p,
             top_k=top_k,
             stop=stop,
         )
-        try:
-            async for chunk_data in self.transport.stream_async(endpoint, data):
-                chunk = self.provider.parse_stream_chunk(chunk_data)
-                if chunk:
+        async with contextlib.aclosing(stream):
+            async for chunk in stream:
+                if chunk.text:
                     yield chunk.text
-        except Exception as e:
-            for mw in self.middlewares:
-                mw.on_error(e, self.model_name)
-            raise e
 
     def stream(
         self,
-        prompt: Union[str, List[BaseMessage]],
-        temperature: float = None,
-        top_p: float = None,
-        top_k: int = None,
-        stop: Union[str, List[str]] = None,
-    ) -> Iterator[str]:
-        """Stream a response synchronously."""
-        # 1. Prepare Messages
-        messages = prompt
-        if isinstance(prompt, str):
-            messages = [UserMessage(content=prompt)]
+        prompt: Union[str, Sequence[BaseMessage]],
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        stop: Optional[Union[str, List[str]]] = None,
+        stop_when: Optional[StopWhen] = None,
+    ) -> Generator[str, None, None]:
+        """Stream a response synchronously. See stream_async for `stop_when`."""
+        stream = self._stream(
+            prompt,
+            stop_when=stop_when,
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k,
+            stop=stop,
+        )
+        with contextlib.closing(stream):
+            for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
 
-        # 2. Middleware Hook: before_request
-        for mw in self.middlewares:
-            messages = mw.before_request(self.model_name, messages)
+    async def stream_chunks_async(
+        self,
+        prompt: Union[str, Sequence[BaseMessage]],
+        tools: Optional[List[Any]] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        stop: Optional[Union[str, List[str]]] = None,
+        stop_when: Optional[StopWhen] = None,
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """
+        Stream raw `StreamChunk`s asynchronously. When tools are given, each
+        tool call is delivered in `tool_calls` on the chunk that completes it,
+        while the rest of the response is still streaming.
+        """
+        stream = self._stream_async(
+            prompt,
+            stop_when=stop_when,
+            tools=tools,
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k,
+            stop=stop,
+        )
+        async with contextlib.aclosing(stream):
+            async for chunk in stream:
+                yield chunk
 
-        # 3. Execute Request
-        endpoint, data = self.provider.prepare_request(
-            self.model_name,
-            messages,
-            stream=True,
+    def stream_chunks(
+        self,
+        prompt: Union[str, Sequence[BaseMessage]],
+        tools: Optional[List[Any]] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        stop: Optional[Union[str, List[str]]] = None,
+        stop_when: Optional[StopWhen] = None,
+    ) -> Generator[StreamChunk, None, None]:
+        """Synchronous version of stream_chunks_async."""
+        stream = self._stream(
+            prompt,
+            stop_when=stop_when,
+            tools=tools,
             temperature=temperature,
             top_p=top_p,
             top_k=top_k,
             stop=stop,
         )
-        try:
-            for chunk_data in self.transport.stream(endpoint, data):
-                chunk = self.provider.parse_stream_chunk(chunk_data)
-                if chunk:
-                    yield chunk.text
-        except Exception as e:
-            for mw in self.middlewares:
-                mw.on_error(e, self.model_name)
-            raise e
+        with contextlib.closing(stream):
+            yield from stream
+
+    async def stream_structured_async(
+        self,
+        prompt: Union[str, Sequence[BaseMessage]],
+        response_model: Type[T],
+        strict: bool = False,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        stop: Optional[Union[str, List[str]]] = None,
+    ) -> AsyncGenerator[T, None]:
+        """
+        Stream structured output, yielding progressively filled partial
+        instances (built with `model_construct`, so unvalidated) as JSON
+        arrives. The last item is the fully validated instance.
+
+        Raises ValueError, and closes the upstream stream, as soon as the
+        output can no longer match the schema.
+        """
+        structured = StructuredOutput.for_model(response_model)
+        parser = PartialJSONParser()
+        stream = self._stream_async(
+            prompt,
+            structured=structured,
+            strict=strict,
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k,
+            stop=stop,
+        )
+        async with contextlib.aclosing(stream):
+            async for chunk in stream:
+                partial = structured.feed_partial(parser, chunk.text)
+                if partial is not None:
+                    yield partial
+                if parser.done:
+                    break
+        yield structured.parse(parser.json_text)
+
+    def stream_structured(
+        self,
+        prompt: Union[str, Sequence[BaseMessage]],
+        response_model: Type[T],
+        strict: bool = False,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        top_k: Optional[int] = None,
+        stop: Optional[Union[str, List[str]]] = None,
+    ) -> Generator[T, None, None]:
+        """Synchronous version of stream_structured_async."""
+        structured = StructuredOutput.for_model(response_model)
+        parser = PartialJSONParser()
+        stream = self._stream(
+            prompt,
+            structured=structured,
+            strict=strict,
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k,
+            stop=stop,
+        )
+        with contextlib.closing(stream):
+            for chunk in stream:
+                partial = structured.feed_partial(parser, chunk.text)
+                if partial is not None:
+                    yield partial
+                if parser.done:
+                    break
+        yield structured.parse(parser.json_text)
 
 
 class SimpleResponse:
@@ -0,0 +1,207 @@
+import asyncio
+import functools
+from typing import Any, Callable, List, Optional, Tuple
+
+from ..context import RequestContext, accepts_context
+from ..data_types import ModelResponse
+from ..middleware import Middleware, StreamMiddleware
+
+# Bodies of the protocol declarations: inherited by middleware subclassing
+# the protocol without overriding the hook, and doing nothing
+_STUBS = {
+    getattr(protocol, name)
+    for protocol, names in (
+        (Middleware, ("before_request", "after_response", "on_error")),
+        (StreamMiddleware, ("on_chunk", "on_stream_end")),
+    )
+    for name in names
+}
+
+
+def _hook(middleware: Any, name: str) -> Optional[Callable[..., Any]]:
+    """The bound hook, or None when it is missing or does nothing."""
+    hook: Optional[Callable[..., Any]] = getattr(middleware, name, None)
+    if hook is None or getattr(hook, "passthrough", False):
+        return None
+    if getattr(type(middleware), name, None) in _STUBS:
+        return None
+    return hook
+
+
+def _with_context(hook: Callable[..., Any]) -> Callable[..., Any]:
+    """Adapt a hook without a `context` parameter to be called with one."""
+    if accepts_context(hook):
+        return hook
+
+    def call(
+        *args: Any, context: Optional[RequestContext] = None, **kwargs: Any
+    ) -> Any:
+        return hook(*args, **kwargs)
+
+    return call
+
+
+def _async_only(middleware: Any, name: str) -> Callable[..., Any]:
+    def hook(*args: Any, **kwargs: Any) -> Any:
+        raise TypeError(
+            f"{type(middleware).__name__}.{name} is async; "
+            "use the async methods of ChatModel"
+        )
+
+    return hook
+
+
+class _Phase:
+    """
+    The hooks of one phase, in middleware order: `sync` for the sync path
+    and `async_` as (hook, awaitable) pairs, preferring `<name>_async`.
+    All are called with a `context` keyword argument.
+    """
+
+    def __init__(self, middlewares: List[Any], name: str):
+        self.sync: List[Callable[..., Any]] = []
+        self.async_: List[Tuple[Callable[..., Any], bool]] = []
+        for middleware in middlewares:
+            hook = _hook(middleware, name)
+            async_hook = _hook(middleware, name + "_async")
+            if hook is not None and asyncio.iscoroutinefunction(hook):
+                hook, async_hook = None, async_hook or hook
+            if hook is None and async_hook is None:
+                continue
+            self.sync.append(_with_context(hook or _async_only(middleware, name)))
+            self.async_.append(
+                (_with_context(async_hook), True)
+                if async_hook
+                else (self.sync[-1], False)
+            )
+
+    def __bool__(self) -> bool:
+        return bool(self.sync)
+
+
+class MiddlewarePipeline:
+    """
+    A middleware list compiled into per-phase hook lists, once per
+    `ChatModel`. Missing hooks, protocol stubs and hooks marked
+    `passthrough` are left out, so a call only runs hooks that do something.
+
+    Hooks may be async: a coroutine `before_request`/`after_response`/
+    `on_error`, or an extra `<hook>_async` method used on the async path
+    next to a sync version for the sync path. Hooks that declare a
+    `context` parameter (or `**kwargs`) get the call's RequestContext.
+    """
+
+    def __init__(self, middlewares: List[Middleware]):
+        self.middlewares = list(middlewares)
+        self._before_request = _Phase(self.middlewares, "before_request")
+        self._after_response = _Phase(self.middlewares, "after_response")
+        self._on_error = _Phase(self.middlewares, "on_error")
+        self._on_chunk = _Phase(self.middlewares, "on_chunk")
+        # Stream middleware gets on_stream_end, the rest after_response
+        self._stream_end_sync: List[Tuple[Callable[..., Any], bool]] = []
+        self._stream_end: List[Tuple[Callable[..., Any], bool, bool]] = []
+        for middleware in self.middlewares:
+            on_end = _Phase([middleware], "on_stream_end")
+            phase = on_end or _Phase([middleware], "after_response")
+            ends = bool(on_end)
+            self._stream_end_sync += [(hook, ends) for hook in phase.sync]
+            self._stream_end += [(hook, aw, ends) for hook, aw in phase.async_]
+
+    def compiled_from(self, middlewares: List[Middleware]) -> bool:
+        """Whether `middlewares` still holds the same objects, in order."""
+        return len(middlewares) == len(self.middlewares) and all(
+            a is b for a, b in zip(middlewares, self.middlewares)
+        )
+
+    def chunk_hooks(self, context: RequestContext) -> List[Callable[..., Any]]:
+        """The on_chunk hooks of one sync stream, bound to its context."""
+        return [
+            functools.partial(hook, context=context)
+            for hook in self._on_chunk.sync
+        ]
+
+    def chunk_hooks_async(
+        self, context: RequestContext
+    ) -> List[Tuple[Callable[..., Any], bool]]:
+        """
+        The on_chunk hooks of one async stream, bound to its context, as
+        (hook, awaitable) pairs: `async def on_chunk` hooks are awaited.
+        """
+        return [
+            (functools.partial(hook, context=context), awaitable)
+            for hook, awaitable in self._on_chunk.async_
+        ]
+
+    def before_request(
+        self, model: str, messages: Any, context: RequestContext
+    ) -> Any:
+        """Run before_request hooks; stops at a short-circuit ModelResponse."""
+        for hook in self._before_request.sync:
+            messages = hook(model, messages, context=context)
+            if isinstance(messages, ModelResponse):
+                break
+        return messages
+
+    async def before_request_async(
+        self, model: str, messages: Any, context: RequestContext
+    ) -> Any:
+        for hook, awaitable in self._before_request.async_:
+            messages = hook(model, messages, context=context)
+            if awaitable:
+                messages = await messages
+            if isinstance(messages, ModelResponse):
+                break
+        return messages
+
+    def after_response(
+        self, response: ModelResponse, context: RequestContext
+    ) -> ModelResponse:
+        for hook in self._after_response.sync:
+            response = hook(response, context=context)
+        return response
+
+    async def after_response_async(
+        self, response: ModelResponse, context: RequestContext
+    ) -> ModelResponse:
+        for hook, awaitable in self._after_response.async_:
+            result = hook(response, context=context)
+            response = await result if awaitable else result
+        return response
+
+    def on_error(
+        self, error: Exception, model: str, context: RequestContext
+    ) -> None:
+        for hook in self._on_error.sync:
+            hook(error, model, attempt=context.attempt, context=context)
+
+    async def on_error_async(
+        self, error: Exception, model: str, context: RequestContext
+    ) -> None:
+        for hook, awaitable in self._on_error.async_:
+            result = hook(error, model, attempt=context.attempt, context=context)
+            if awaitable:
+                await result
+
+    def stream_end(
+        self, response: ModelResponse, context: RequestContext
+    ) -> ModelResponse:
+        for hook, on_end in self._stream_end_sync:
+            if on_end:
+                hook(response, response.usage, context=context)
+            else:
+                response = hook(response, context=context)
+        return response
+
+    async def stream_end_async(
+        self, response: ModelResponse, context: RequestContext
+    ) -> ModelResponse:
+        for hook, awaitable, on_end in self._stream_end:
+            if on_end:
+                result = hook(response, response.usage, context=context)
+            else:
+                result = hook(response, context=context)
+            if awaitable:
+                result = await result
+            if not on_end:
+                response = result
+        return response
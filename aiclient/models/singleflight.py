@@ -0,0 +1,122 @@
+"""
+Coalescing of identical concurrent requests.
+
+When the same prompt arrives from many callers at once, only the first
+(the leader) goes upstream; the others wait for its result, or subscribe to
+its stream. Requests are identified by `request_key`, a hash of the final
+provider payload, so they match only if the provider would see the same
+request. Entries live only while the call is in flight: this covers the
+window before a response cache has anything to return.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional, Tuple
+
+from ..broadcast import StreamBroadcaster
+from ..transport.encoding import Base64Payload
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, Base64Payload):
+        # Hash the bytes instead of base64-encoding the whole image
+        digest = hashlib.sha256(memoryview(value.data).cast("B")).hexdigest()
+        return f"{value.prefix}sha256:{digest}"
+    return str(value)
+
+
+def request_key(endpoint: str, data: Dict[str, Any]) -> str:
+    """Canonical hash of a request: key order and whitespace do not matter."""
+    canonical = json.dumps(
+        [endpoint, data], sort_keys=True, separators=(",", ":"), default=_encode
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    In-flight registry shared by the `ChatModel`s of a `Client`.
+
+    `coalesced` counts callers served by another caller's request.
+    """
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        # key -> (task, number of callers waiting on it)
+        self._calls: Dict[str, Tuple[asyncio.Task[Any], int]] = {}
+        self._streams: Dict[str, StreamBroadcaster[Any]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn`, or wait for the identical call already running."""
+        if key in self._calls:
+            task, waiters = self._calls[key]
+            self._calls[key] = (task, waiters + 1)
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = (task, 1)
+            task.add_done_callback(lambda _: self._forget(key, task))
+        try:
+            # Shielded: one caller cancelling must not fail the others
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            entry = self._calls.get(key)
+            if entry and entry[0] is task:
+                waiters = entry[1] - 1
+                self._calls[key] = (task, waiters)
+                if waiters == 0:
+                    # Nobody wants the result any more
+                    task.cancel()
+            raise
+
+    def _forget(self, key: str, task: asyncio.Task[Any]) -> None:
+        entry = self._calls.get(key)
+        if entry and entry[0] is task:
+            del self._calls[key]
+
+    async def stream(
+        self, key: str, fn: Callable[[], AsyncGenerator[Any, None]]
+    ) -> AsyncGenerator[Any, None]:
+        """
+        Items of the stream `fn` returns, shared with identical concurrent
+        streams. Callers joining late get the items already sent replayed.
+        """
+        broadcaster = self._streams.get(key)
+        if broadcaster is None:
+
+            async def upstream() -> AsyncGenerator[Any, None]:
+                source = fn()
+                try:
+                    async with contextlib.aclosing(source):
+                        async for item in source:
+                            yield item
+                finally:
+                    # Callers arriving after the last item start a new request
+                    self._forget_stream(key, broadcaster)
+
+            broadcaster = self._streams[key] = StreamBroadcaster(upstream())
+        else:
+            self.coalesced += 1
+        subscription = broadcaster.subscribe()
+        try:
+            async with contextlib.aclosing(subscription):
+                async for item in subscription:
+                    yield item
+        finally:
+            # The last caller to leave cancels the upstream request.
+            # Unregistered first, so nobody joins a stream being closed
+            if not broadcaster.subscribers and not broadcaster.done:
+                self._forget_stream(key, broadcaster)
+                await broadcaster.aclose()
+
+    def _forget_stream(
+        self, key: str, broadcaster: Optional[StreamBroadcaster[Any]]
+    ) -> None:
+        if self._streams.get(key) is broadcaster:
+            del self._streams[key]
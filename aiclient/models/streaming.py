@@ -0,0 +1,262 @@
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Pattern, Union
+
+from ..data_types import ModelResponse, StreamChunk, StreamMetrics, ToolCall, Usage
+from ..providers.base import Provider, ToolCallAssembler
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, round(q * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class StreamTimer:
+    """
+    Records the latency of one stream: connect time, time to first token
+    and the gaps between content chunks. Per-chunk cost is one clock read
+    and one append; percentiles are computed once, in `metrics`.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.connected: Optional[float] = None
+        self.first_token: Optional[float] = None
+        self.last: Optional[float] = None
+        self.gaps: List[float] = []
+
+    def raw(self, chunk_data: Dict[str, Any]) -> None:
+        """First raw chunk from the transport, which may note when it connected."""
+        self.connected = chunk_data.get("connected_at") or time.perf_counter()
+
+    def chunk(self, chunk: StreamChunk) -> None:
+        if not chunk.text and not chunk.tool_call_deltas:
+            return
+        now = time.perf_counter()
+        if self.last is None:
+            self.first_token = now
+        else:
+            self.gaps.append(now - self.last)
+        self.last = now
+
+    def metrics(
+        self,
+        model: Optional[str] = None,
+        provider: Optional[str] = None,
+        usage: Optional[Usage] = None,
+    ) -> StreamMetrics:
+        end = time.perf_counter()
+        gaps = sorted(self.gaps)
+        chunks = len(gaps) + 1 if self.first_token is not None else 0
+        output_tokens = usage.output_tokens if usage and usage.output_tokens else chunks
+        generating = end - self.first_token if self.first_token is not None else 0
+        return StreamMetrics(
+            model=model,
+            provider=provider,
+            connect_time=self._since_start(self.connected),
+            time_to_first_token=self._since_start(self.first_token),
+            total_time=end - self.started,
+            chunks=chunks,
+            inter_chunk_p50=_percentile(gaps, 0.5),
+            inter_chunk_p90=_percentile(gaps, 0.9),
+            inter_chunk_p99=_percentile(gaps, 0.99),
+            inter_chunk_max=gaps[-1] if gaps else None,
+            output_tokens=output_tokens,
+            tokens_per_second=output_tokens / generating if generating > 0 else None,
+        )
+
+    def _since_start(self, moment: Optional[float]) -> Optional[float]:
+        return None if moment is None else moment - self.started
+
+
+class StreamAccumulator:
+    """
+    Builds the final `ModelResponse` of a stream from its chunks.
+
+    `add` does constant work per chunk (text pieces are joined once, in
+    `response`), so it can run on every chunk of long streams.
+    """
+
+    def __init__(self, provider: Optional[str] = None):
+        self.provider = provider
+        self.tool_calls: List[ToolCall] = []
+        self.finish_reason: Optional[str] = None
+        self._text: List[str] = []
+        self._usage: Optional[Usage] = None
+        # Usage of earlier requests, when a stream was resumed
+        self._settled: Optional[Usage] = None
+
+    def add(self, chunk: StreamChunk) -> None:
+        if chunk.text:
+            self._text.append(chunk.text)
+        if chunk.tool_calls:
+            self.tool_calls.extend(chunk.tool_calls)
+        if chunk.finish_reason:
+            self.finish_reason = chunk.finish_reason
+        if chunk.usage:
+            self._merge_usage(chunk.usage)
+
+    def _merge_usage(self, update: Usage) -> None:
+        # Providers report running totals, possibly split across events
+        # (Anthropic: input tokens at message start, output at message delta)
+        usage = self._usage or Usage()
+        for field in (
+            "input_tokens",
+            "output_tokens",
+            "cache_creation_input_tokens",
+            "cache_read_input_tokens",
+        ):
+            value = getattr(update, field)
+            if value:
+                setattr(usage, field, value)
+        # A partial event's total only counts its own fields
+        usage.total_tokens = max(
+            update.total_tokens, usage.input_tokens + usage.output_tokens
+        )
+        self._usage = usage
+
+    def restart(self) -> None:
+        """Keep the text so far but count usage of a new request from zero."""
+        self._settled = self.usage
+        self._usage = None
+
+    @property
+    def usage(self) -> Optional[Usage]:
+        if self._settled is None or self._usage is None:
+            return self._usage or self._settled
+        return Usage(
+            **{
+                field: (getattr(self._settled, field) or 0)
+                + (getattr(self._usage, field) or 0)
+                for field in Usage.model_fields
+            }
+        )
+
+    @property
+    def text(self) -> str:
+        return "".join(self._text)
+
+    def response(self) -> ModelResponse:
+        return ModelResponse(
+            text=self.text,
+            raw={"finish_reason": self.finish_reason},
+            usage=self.usage,
+            provider=self.provider,
+            tool_calls=self.tool_calls or None,
+        )
+
+
+StopWhen = Union[str, Pattern[str], Callable[[str], bool]]
+
+
+class StopCondition:
+    """
+    Client-side stop check on the accumulated text of one stream: a regex
+    (searched only near the new text, `lookback` characters back) or a
+    callable given the whole text so far. For a regex only a bounded tail
+    of the text is kept, so each chunk costs O(lookback + len(chunk)).
+    """
+
+    def __init__(self, condition: StopWhen, lookback: int = 1024):
+        self._fn: Optional[Callable[[str], bool]] = None
+        self._pattern: Optional[Pattern[str]] = None
+        if callable(condition):
+            self._fn = condition
+        else:
+            self._pattern = re.compile(condition)
+        self.lookback = lookback
+        # The whole text for a callable; for a regex the last lookback + 1
+        # characters, one more than is searched so `^`, `\b` and the like
+        # see the character before the window
+        self._text = ""
+
+    def feed(self, text: str) -> bool:
+        """Add newly streamed text; True once the condition is met."""
+        if self._fn is not None:
+            self._text += text
+            return bool(self._fn(self._text))
+        start = max(0, len(self._text) - self.lookback)
+        window = self._text + text
+        self._text = window[-(self.lookback + 1) :]
+        pattern = self._pattern
+        return pattern is not None and pattern.search(window, start) is not None
+
+
+class StreamState:
+    """
+    Per-stream bookkeeping shared by the sync and async stream loops:
+    parsing, tool-call assembly, aggregation, timing and `on_chunk` hooks.
+    """
+
+    def __init__(
+        self,
+        provider: Provider,
+        chunk_hooks: List[Callable[..., Any]],
+        stop_when: Optional[StopWhen] = None,
+    ) -> None:
+        self.provider = provider
+        self.chunk_hooks = chunk_hooks
+        self.stop_condition = StopCondition(stop_when) if stop_when else None
+        # Set when the stop condition matched: the caller ends the stream
+        self.stopped = False
+        self.assembler = ToolCallAssembler()
+        self.accumulator = StreamAccumulator(getattr(provider, "name", None))
+        self.timer = StreamTimer()
+        # Whether the caller has been given any content yet
+        self.yielded = False
+        # After a resume, drop whitespace the model repeats after the prefill
+        self._trim_leading = False
+
+    def process(self, chunk_data: Dict[str, Any]) -> Optional[StreamChunk]:
+        """Handle one raw transport chunk; returns the chunk to yield, if any."""
+        if self.timer.connected is None:
+            self.timer.raw(chunk_data)
+        chunk = self.provider.parse_stream_chunk(chunk_data)
+        if not chunk:
+            return None
+        if self._trim_leading and chunk.text:
+            chunk.text = chunk.delta = chunk.text.lstrip()
+            self._trim_leading = not chunk.text
+        self.timer.chunk(chunk)
+        if chunk.tool_call_deltas or chunk.finish_reason:
+            chunk.tool_calls = self.assembler.feed(chunk) or None
+        if self.stop_condition and chunk.text and self.stop_condition.feed(chunk.text):
+            self.stopped = True
+            chunk.finish_reason = chunk.finish_reason or "stop_condition"
+        return self._emit(chunk)
+
+    def finish(self) -> Optional[StreamChunk]:
+        """A final chunk for tool calls still open when the stream ended."""
+        remaining = self.assembler.finish()
+        if not remaining:
+            return None
+        return self._emit(StreamChunk(text="", delta="", tool_calls=remaining))
+
+    def _emit(self, chunk: StreamChunk) -> StreamChunk:
+        self.accumulator.add(chunk)
+        for hook in self.chunk_hooks:
+            hook(chunk)
+        if chunk.text or chunk.tool_call_deltas or chunk.tool_calls:
+            # Usage-only chunks (e.g. Anthropic's message_start) are not
+            # content: a stream that fails after them can still start over
+            self.yielded = True
+        return chunk
+
+    @property
+    def resumable(self) -> bool:
+        """Only text can be continued from a prefill, not tool calls."""
+        return not self.accumulator.tool_calls and not self.assembler.pending
+
+    def resume(self) -> str:
+        """
+        Prepare to continue in a new request; returns the assistant prefill.
+        Providers reject prefills ending in whitespace, so it is trimmed.
+        """
+        text = self.accumulator.text
+        prefill = text.rstrip()
+        self._trim_leading = len(prefill) < len(text)
+        self.accumulator.restart()
+        return prefill
@@ -0,0 +1,410 @@
+import json
+import re
+import weakref
+from typing import (
+    Annotated,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from ..data_types import BaseMessage, UserMessage
+
+_UNSET = object()
+# Key of the item validator for list documents
+_ITEM = object()
+
+
+class StructuredOutput:
+    """
+    Everything needed to request and parse structured output for one
+    response model: its JSON schema, the prompt instruction used in non-strict
+    mode and a compiled validator.
+
+    Built once per class via `StructuredOutput.for_model()` and reused.
+    """
+
+    _cache: "weakref.WeakKeyDictionary[type, StructuredOutput]" = (
+        weakref.WeakKeyDictionary()
+    )
+
+    def __init__(self, response_model: Type[Any]):
+        self.response_model = response_model
+        self.adapter = TypeAdapter(response_model)
+        self.schema: Dict[str, Any] = self.adapter.json_schema()
+        self._part_adapters: Optional[Dict[Any, TypeAdapter[Any]]] = None
+        self.instruction = (
+            "\n\nRestricted Output Mode: You must response strictly with a "
+            "valid JSON object that matches the following JSON Schema.\n"
+            "Do not return the schema itself. Return the data instance.\n"
+            f"Schema:\n{json.dumps(self.schema, indent=2)}"
+        )
+
+    @classmethod
+    def for_model(cls, response_model: Type[Any]) -> "StructuredOutput":
+        spec = cls._cache.get(response_model)
+        if spec is None:
+            spec = cls(response_model)
+            cls._cache[response_model] = spec
+        return spec
+
+    def inject_instruction(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Return messages with the schema instruction appended to the last user
+        message (non-strict mode). Builds a new list: messages may be a
+        read-only memory view.
+        """
+        last = messages[-1] if messages else None
+        if isinstance(last, UserMessage) and isinstance(last.content, str):
+            new_content = last.content + self.instruction
+            return [*messages[:-1], UserMessage(content=new_content)]
+        return [*messages, UserMessage(content=self.instruction)]
+
+    def parse(self, text: str) -> Any:
+        """Validate model output (optionally wrapped in a code fence)."""
+        raw = text
+        text = text.strip()
+        if text.startswith("```"):
+            text = text.split("\n", 1)[1]
+            if text.endswith("```"):
+                text = text.rsplit("\n", 1)[0]
+        try:
+            return self.adapter.validate_json(text)
+        except ValueError as e:
+            raise ValueError(f"Failed to parse structured output: {e}. Raw: {raw}")
+
+    def _settled_adapter(self, key: Any) -> Optional[TypeAdapter[Any]]:
+        """Validator for one top-level value of the document, if known."""
+        adapters = self._part_adapters
+        if adapters is None:
+            adapters = self._part_adapters = _part_adapters(self.response_model)
+        return adapters.get(key, adapters.get(_ITEM))
+
+    def check_partial(self, settled: List[Tuple[Any, Any]]) -> None:
+        """
+        Validate top-level values of a streaming document as each one completes
+        (see `PartialJSONParser.take_settled`). Every value is checked once, on
+        its own, so a stream costs a single validation pass. A failure means the
+        output can no longer match the schema.
+        """
+        for key, value in settled:
+            adapter = self._settled_adapter(key)
+            if adapter is None:
+                continue
+            raw = json.dumps(value)
+            try:
+                adapter.validate_json(raw)
+            except ValidationError as e:
+                error = e.errors()[0]
+                loc = ".".join(str(p) for p in (key, *error["loc"]))
+                raise ValueError(
+                    f"Streamed structured output does not match schema at "
+                    f"{loc}: {error['msg']}. Raw: {raw}"
+                )
+
+    def partial(self, value: Any) -> Any:
+        """
+        Build an unvalidated instance from a partial value. Fields that have
+        not arrived yet are None; nested models stay plain dicts until the end.
+        """
+        model = self.response_model
+        if (
+            isinstance(value, dict)
+            and isinstance(model, type)
+            and issubclass(model, BaseModel)
+        ):
+            missing = {
+                name: None
+                for name, field in model.model_fields.items()
+                if field.is_required() and name not in value
+            }
+            return model.model_construct(**missing, **value)
+        return value
+
+    def feed_partial(self, parser: "PartialJSONParser", text: str) -> Any:
+        """
+        Feed a streamed chunk to `parser`, check what it completed against the
+        schema and return a new partial instance, or None if nothing changed.
+        """
+        value = parser.feed(text)
+        if parser.done:
+            # The caller validates the finished document with parse()
+            return None
+        settled = parser.take_settled()
+        if settled:
+            self.check_partial(settled)
+        if value is None:
+            return None
+        return self.partial(value)
+
+
+def _part_adapters(model: Any) -> Dict[Any, TypeAdapter[Any]]:
+    """
+    Validators for the top-level values of `model`: one per field (keyed by
+    its JSON name) for a pydantic model, one per item for a list.
+    """
+    if isinstance(model, type) and issubclass(model, BaseModel):
+        adapters: Dict[Any, TypeAdapter[Any]] = {}
+        for name, field in model.model_fields.items():
+            annotation: Any = field.annotation
+            if field.metadata:
+                # Keep constraints such as min_length
+                annotation = Annotated[(annotation, *field.metadata)]
+            adapters[field.alias or name] = TypeAdapter(annotation)
+        return adapters
+    if get_origin(model) in (list, List):
+        (item,) = get_args(model) or (Any,)
+        return {_ITEM: TypeAdapter(item)}
+    return {}
+
+
+class PartialJSONParser:
+    """
+    Incremental parser for a JSON object or array arriving in chunks.
+
+    Text before the first `{` or `[` (such as a code fence) is skipped. The
+    document is built up as it arrives: each value is decoded once, when it
+    completes, and string contents are decoded as they stream, so no text is
+    parsed twice. A partial value copies only the containers still open and
+    the value being written; completed values are shared.
+
+    Raises ValueError as soon as a number or literal can no longer become
+    valid JSON.
+    """
+
+    def __init__(self) -> None:
+        self._raw: List[str] = []
+        self._doc: List[str] = []
+        self._started = False
+        self._root: Any = None
+        # Open containers: [container, current key, expecting a key]
+        self._stack: List[List[Any]] = []
+        # Token being read: None, "string" or "scalar"
+        self._mode: Optional[str] = None
+        self._is_key = False
+        self._scalar = ""
+        self._str_parts: List[str] = []
+        self._str_raw = ""
+        self._escape_at = -1
+        self._hex = 0
+        self._settled: List[Tuple[Any, Any]] = []
+        self._changed = False
+        self.done = False
+
+    @property
+    def json_text(self) -> str:
+        """The finished document, or all text received if it never closed."""
+        if self.done:
+            return "".join(self._doc)
+        return "".join(self._raw)
+
+    def feed(self, text: str) -> Any:
+        """Consume a chunk. Returns the current value if it changed, else None."""
+        if self.done:
+            return None
+        self._raw.append(text)
+        self._scan(text)
+        if not self._changed:
+            return None
+        self._changed = False
+        return self._root if self.done else self._snapshot()
+
+    def take_settled(self) -> List[Tuple[Any, Any]]:
+        """
+        Top-level values (key or index, value) that completed since the last
+        call. Each value is reported once.
+        """
+        settled, self._settled = self._settled, []
+        return settled
+
+    def _scan(self, chunk: str) -> None:
+        i, n = 0, len(chunk)
+        if not self._started:
+            starts = [p for p in (chunk.find("{"), chunk.find("[")) if p >= 0]
+            if not starts:
+                return
+            i = min(starts)
+            self._started = True
+        begin = i
+
+        while i < n:
+            if self._mode == "string":
+                i = self._scan_string(chunk, i)
+                continue
+            c = chunk[i]
+            if c in " \t\r\n":
+                self._end_scalar()
+            elif c == '"':
+                self._end_scalar()
+                frame = self._stack[-1]
+                self._mode = "string"
+                self._is_key = frame[2]
+            elif c == "{" or c == "[":
+                container: Any = {} if c == "{" else []
+                if self._stack:
+                    self._add(container, settled=False)
+                else:
+                    self._root = container
+                    self._changed = True
+                self._stack.append([container, None, c == "{"])
+            elif c == "}" or c == "]":
+                self._end_scalar()
+                container = self._stack.pop()[0]
+                if not self._stack:
+                    self.done = True
+                    self._doc.append(chunk[begin : i + 1])
+                    return
+                if len(self._stack) == 1:
+                    self._settle(container)
+            elif c == ",":
+                self._end_scalar()
+                frame = self._stack[-1]
+                frame[2] = isinstance(frame[0], dict)
+            elif c == ":":
+                self._stack[-1][2] = False
+            else:
+                if self._mode != "scalar" and self._stack[-1][2]:
+                    raise ValueError(f"Invalid JSON: expected a key, got {c!r}")
+                self._mode = "scalar"
+                self._scalar += c
+                self._changed = True
+            i += 1
+        self._doc.append(chunk[begin:])
+        if self._mode == "scalar" and not _SCALAR_PREFIX.fullmatch(self._scalar):
+            raise ValueError(f"Invalid JSON value {self._scalar!r}")
+
+    def _scan_string(self, chunk: str, i: int) -> int:
+        """Consume string contents from chunk[i:]; returns the next index."""
+        if self._hex:
+            digits = chunk[i : i + self._hex]
+            self._str_raw += digits
+            self._hex -= len(digits)
+            if not self._hex:
+                self._escape_at = -1
+            return i + len(digits)
+        if self._escape_at >= 0:
+            c = chunk[i]
+            self._str_raw += c
+            if c == "u":
+                self._hex = 4
+            else:
+                self._escape_at = -1
+            return i + 1
+        match = _STRING_SPECIAL.search(chunk, i)
+        end = match.start() if match else len(chunk)
+        if end > i:
+            self._str_raw += chunk[i:end]
+            self._changed = self._changed or not self._is_key
+        if match is None:
+            return end
+        if chunk[end] == "\\":
+            self._escape_at = len(self._str_raw)
+            self._str_raw += "\\"
+        else:
+            self._mode = None
+            value = self._string_value(final=True)
+            if self._is_key:
+                self._stack[-1][1] = value
+            else:
+                self._add(value)
+        return end + 1
+
+    def _string_value(self, final: bool = False) -> str:
+        """Decode the string read so far, keeping any unfinished escape."""
+        raw = self._str_raw
+        cut = len(raw) if final or self._escape_at < 0 else self._escape_at
+        if not final:
+            tail = _HIGH_SURROGATE_TAIL.search(raw, 0, cut)
+            if tail and len(tail.group(1)) % 2:
+                # Half of a surrogate pair: wait for the other half
+                cut = tail.end(1) - 1
+        if cut:
+            self._str_parts.append(_STRING_DECODER.decode('"' + raw[:cut] + '"'))
+            self._str_raw = raw[cut:]
+            if self._escape_at >= 0:
+                self._escape_at -= cut
+        value = "".join(self._str_parts)
+        if final:
+            self._str_parts = []
+            self._str_raw = ""
+            self._escape_at = -1
+        elif len(self._str_parts) > 1:
+            self._str_parts = [value]
+        return value
+
+    def _end_scalar(self) -> None:
+        if self._mode != "scalar":
+            return
+        self._mode = None
+        if not _SCALAR.fullmatch(self._scalar):
+            raise ValueError(f"Invalid JSON value {self._scalar!r}")
+        value = json.loads(self._scalar)
+        self._scalar = ""
+        self._add(value)
+
+    def _add(self, value: Any, settled: bool = True) -> None:
+        """Place a value in the innermost open container."""
+        container, key, _ = self._stack[-1]
+        if isinstance(container, dict):
+            container[key] = value
+        else:
+            container.append(value)
+        self._changed = True
+        if settled and len(self._stack) == 1:
+            self._settle(value)
+
+    def _settle(self, value: Any) -> None:
+        container, key, _ = self._stack[0]
+        if isinstance(container, list):
+            key = len(container) - 1
+        self._settled.append((key, value))
+
+    def _snapshot(self) -> Any:
+        """Copy of the open containers, with the value being read filled in."""
+        child: Any = _UNSET
+        if self._mode == "string" and not self._is_key:
+            child = self._string_value()
+        elif self._mode == "scalar":
+            child = _decode(self._scalar)
+
+        # A token is not in its container yet; open containers already are
+        # (as the newest entry of their parent)
+        is_token = True
+        for container, key, _ in reversed(self._stack):
+            copy = dict(container) if isinstance(container, dict) else list(container)
+            if child is not _UNSET:
+                if isinstance(copy, dict):
+                    copy[key] = child
+                elif is_token:
+                    copy.append(child)
+                else:
+                    copy[-1] = child
+            child = copy
+            is_token = False
+        return child
+
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+# The beginnings of the above: a token that does not match can never be valid
+_SCALAR_PREFIX = re.compile(
+    r"-?(?:(?:0|[1-9]\d*)(?:\.\d*)?(?:(?<=\d)[eE][+-]?\d*)?)?"
+    r"|t(?:r(?:ue?)?)?|f(?:a(?:l(?:se?)?)?)?|n(?:u(?:ll?)?)?"
+)
+# A \uD800-\uDBFF escape at the end, with the backslashes before it
+_HIGH_SURROGATE_TAIL = re.compile(r"(\\+)u[dD][89abAB][0-9a-fA-F]{2}$")
+_STRING_DECODER = json.JSONDecoder(strict=False)
+
+
+def _decode(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return _UNSET
@@ -1,7 +1,7 @@
 import logging
-import uuid
 from typing import Any, Dict, List, Optional, Union
 
+from .context import RequestContext
 from .data_types import BaseMessage, ModelResponse
 from .middleware import Middleware
 
@@ -12,49 +12,40 @@ class TracingMiddleware(Middleware):
     def __init__(self, trace_exporter: Optional[Any] = None):
         """
         Simple tracing middleware that logs traces to logger or optional exporter.
+        Start, end and errors of a request are logged under its request ID.
         """
         self.traces: Dict[str, Dict[str, Any]] = {}
         self.exporter = trace_exporter
 
+    @staticmethod
+    def _trace_id(context: Optional[RequestContext]) -> str:
+        return context.request_id if context else "..."
+
     def before_request(
-        self, model: str, prompt: Union[str, List[BaseMessage]]
+        self,
+        model: str,
+        prompt: Union[str, List[BaseMessage]],
+        context: Optional[RequestContext] = None,
     ) -> Union[str, List[BaseMessage]]:
-        # We need a request ID to correlate.
-        # Middleware is stateful per request ONLY if fresh instance used,
-        # BUT ChatModel reuses middleware list.
-        # This is concurrency unsafe if we store state on `self`.
-        # However, `before_request` returns modified prompt.
-        # We can't inject ID into prompt easily without polluting it.
-        # Ideally, we rely on context var or similar.
-        # For simplicity in v0.4, we assume synchronous single-threaded usage OR we
-        # just log start/end independently if we lack ID.
-        # BUT, to match start/end, we really need context.
-        # Hack: Use current thread ID or similar if sync?
-        # Or, just log "Request Started" and return.
-
-        # Real tracing needs passing context.
-        # Let's just log "Request to {model}" with a random ID,
-        # and hope strict ordering or simple usage allows correlation for now.
-        # Better: Implementation Plan said "Span-based tracing".
-
-        rid = str(uuid.uuid4())
-        # We can't pass RID to after_response easily without modifying protocol.
-        # But we can assume this is a limitation for v0.4 simple middleware.
-        # Let's just log.
-        logger.info(f"Trace[{rid}]: Request to {model}")
+        logger.info(f"Trace[{self._trace_id(context)}]: Request to {model}")
         return prompt
 
-    def after_response(self, response: ModelResponse) -> ModelResponse:
-        # We don't have rid here.
-        # Just log completion.
+    def after_response(
+        self, response: ModelResponse, context: Optional[RequestContext] = None
+    ) -> ModelResponse:
+        tokens = response.usage.total_tokens if response.usage else None
+        elapsed = f" in {context.elapsed:.3f}s" if context else ""
         logger.info(
-            f"Trace[...]: Response from {response.provider} - "
-            f"Tokens: {response.usage.total_tokens}"
+            f"Trace[{self._trace_id(context)}]: Response from {response.provider}"
+            f"{elapsed} - Tokens: {tokens}"
         )
         return response
 
     def on_error(self, error: Exception, model: str, **kwargs) -> None:
-        print(f"[TRACE] Error in {model}: {error}")
+        logger.warning(
+            f"Trace[{self._trace_id(kwargs.get('context'))}]: "
+            f"Error in {model} (attempt {kwargs.get('attempt', 0)}): {error}"
+        )
 
 
 class OpenTelemetryMiddleware(Middleware):
@@ -71,23 +62,39 @@ class OpenTelemetryMiddleware(Middleware):
         except ImportError:
             pass
 
-        # ContextVar for thread-safe/async-safe span storage
+        # Span of a request called without a RequestContext
         import contextvars
 
-        self._span_ctx = contextvars.ContextVar("current_span", default=None)
+        self._span_ctx: contextvars.ContextVar[Any] = contextvars.ContextVar(
+            "current_span", default=None
+        )
+
+    def _pop_span(self, context: Optional[RequestContext]) -> Any:
+        if context is not None:
+            return context.scratch.pop("otel_span", None)
+        return self._span_ctx.get()
 
     def before_request(
-        self, model: str, prompt: Union[str, List[BaseMessage]]
+        self,
+        model: str,
+        prompt: Union[str, List[BaseMessage]],
+        context: Optional[RequestContext] = None,
     ) -> Union[str, List[BaseMessage]]:
         if self.tracer:
             span = self.tracer.start_span("llm.generate")
             span.set_attribute("llm.model", model)
-            # Store span in context
-            self._span_ctx.set(span)
+            if context is not None:
+                span.set_attribute("llm.request_id", context.request_id)
+                # Per-request storage: concurrent requests keep their own span
+                context.scratch["otel_span"] = span
+            else:
+                self._span_ctx.set(span)
         return prompt
 
-    def after_response(self, response: ModelResponse) -> ModelResponse:
-        span = self._span_ctx.get()
+    def after_response(
+        self, response: ModelResponse, context: Optional[RequestContext] = None
+    ) -> ModelResponse:
+        span = self._pop_span(context)
         if span:
             span.set_attribute("llm.provider", response.provider)
             if response.usage:
@@ -101,15 +108,11 @@ class OpenTelemetryMiddleware(Middleware):
                     "llm.usage.output_tokens", response.usage.output_tokens
                 )
             span.end()
-            # Reset context? Not strictly necessary if token is managed, but good
-            # practice.
-            # self._span_ctx.set(None)
         return response
 
     def on_error(self, error: Exception, model: str, **kwargs) -> None:
-        span = self._span_ctx.get()
+        span = self._pop_span(kwargs.get("context"))
         if span:
-            # Ideally we'd capture exception in span if we had context
             span.record_exception(error)
             # OTel status mapping is involved
             # Simpler:
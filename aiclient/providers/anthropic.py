@@ -2,21 +2,30 @@ import json
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from ..data_types import (
+    AssistantMessage,
     BaseMessage,
     Image,
     ModelResponse,
     StreamChunk,
     Text,
+    ToolCallDelta,
     ToolMessage,
     Usage,
 )
-from .base import Provider
+from ..transport.encoding import Base64Payload
+from .base import MessageFormatCache, Provider
 
 
 class AnthropicProvider(Provider):
+    name = "anthropic"
+    # A trailing assistant message is continued by the model
+    supports_prefill = True
+
     def __init__(self, api_key: str, base_url: str = "https://api.anthropic.com/v1"):
         self.api_key = api_key
         self._base_url = base_url.rstrip("/")
+        self._message_cache = MessageFormatCache()
+        self.image_optimizer = None
 
     @property
     def base_url(self) -> str:
@@ -46,109 +55,25 @@ class AnthropicProvider(Provider):
     ) -> Tuple[str, Dict[str, Any]]:
         system_prompt = None
         formatted_messages = []
-
-        formatted_messages = []
-        current_tool_results = []
+        current_tool_results: List[Any] = []
 
         for msg in messages:
-            # Check if we need to flush tool results before processing a non-tool
-            # message
-            if not isinstance(msg, ToolMessage) and current_tool_results:
+            kind, block = self._message_cache.get_or_format(msg, self._format_message)
+
+            # Tool results are batched into a single user turn; flush them
+            # before processing a non-tool message
+            if kind != "tool_result" and current_tool_results:
                 formatted_messages.append(
                     {"role": "user", "content": current_tool_results}
                 )
                 current_tool_results = []
 
-            if isinstance(msg, ToolMessage):
-                current_tool_results.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": msg.tool_call_id,
-                        "content": msg.content,
-                    }
-                )
-                continue
-
-            if msg.role == "system":
-                if msg.cache_control:
-                    system_prompt = [
-                        {
-                            "type": "text",
-                            "text": msg.content,
-                            "cache_control": {"type": msg.cache_control},
-                        }
-                    ]
-                else:
-                    system_prompt = msg.content
-            elif msg.role == "assistant" and getattr(msg, "tool_calls", None):
-                # Assistant with tool use
-                content_parts = []
-                # Add text content if exists
-                if msg.content:
-                    content_parts.append({"type": "text", "text": msg.content})
-
-                for tc in msg.tool_calls:
-                    content_parts.append(
-                        {
-                            "type": "tool_use",
-                            "id": tc.id,
-                            "name": tc.name,
-                            "input": tc.arguments,
-                        }
-                    )
-                formatted_messages.append(
-                    {"role": "assistant", "content": content_parts}
-                )
-            else:
-                if isinstance(msg.content, str):
-                    content_block = {"type": "text", "text": msg.content}
-                    if msg.cache_control:
-                        content_block["cache_control"] = {"type": msg.cache_control}
-                    formatted_messages.append(
-                        {"role": msg.role, "content": [content_block]}
-                    )
-                elif isinstance(msg.content, list):
-                    content_parts = []
-                    for i, part in enumerate(msg.content):
-                        if isinstance(part, str):
-                            block = {"type": "text", "text": part}
-                        elif isinstance(part, Text):
-                            block = {"type": "text", "text": part.text}
-                        elif isinstance(part, Image):
-                            # Anthropic prefers base64 even for URLs usually, or check
-                            # docs.
-                            # For consistency with v0.2 logic, we enforce base64.
-                            # If it has a URL, we fetch it via to_base64() if we want
-                            # consistency, OR we just support base64/path here.
-                            # The Image.to_base64() helper handles path/url/base64
-                            # unified.
-
-                            b64 = part.to_base64()
-                            media_type = part.media_type
-
-                            block = {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": media_type,
-                                    "data": b64,
-                                },
-                            }
-
-                        # Apply cache_control to the LAST block if set on message level?
-                        # Or should we support per-block caching in types?
-                        # For now, let's apply to the LAST block if msg.cache_control is
-                        # set, as Anthropic usually caches up to a point.
-                        # However, for fine-grained control, we might need it on
-                        # Text/Image types later.
-                        # V0.4 MVP: Apply to last block of the message.
-                        if msg.cache_control and i == len(msg.content) - 1:
-                            block["cache_control"] = {"type": msg.cache_control}
-
-                        content_parts.append(block)
-                    formatted_messages.append(
-                        {"role": msg.role, "content": content_parts}
-                    )
+            if kind == "tool_result":
+                current_tool_results.append(block)
+            elif kind == "system":
+                system_prompt = block
+            elif block is not None:
+                formatted_messages.append(block)
 
         # Flush remaining tool results
         if current_tool_results:
@@ -179,18 +104,108 @@ class AnthropicProvider(Provider):
             anthropic_tools = []
             for tool in tools:
                 if hasattr(tool, "fn") and hasattr(tool, "schema"):
-                    anthropic_tools.append(
-                        {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "input_schema": tool.args_schema.model_json_schema(),
-                        }
-                    )
+                    anthropic_tools.append(tool.declaration("anthropic"))
             if anthropic_tools:
                 payload["tools"] = anthropic_tools
 
         return f"{self.base_url}/messages", payload
 
+    def _format_message(self, msg: BaseMessage) -> Tuple[str, Any]:
+        """
+        Format a single message into its Anthropic payload.
+        Returns (kind, block) where kind is "tool_result", "system" or "message",
+        since tool results and system prompts are placed outside the message list.
+        """
+        if isinstance(msg, ToolMessage):
+            return "tool_result", {
+                "type": "tool_result",
+                "tool_use_id": msg.tool_call_id,
+                "content": msg.content,
+            }
+
+        if msg.role == "system":
+            if msg.cache_control:
+                return "system", [
+                    {
+                        "type": "text",
+                        "text": msg.content,
+                        "cache_control": {"type": msg.cache_control},
+                    }
+                ]
+            return "system", msg.content
+
+        if isinstance(msg, AssistantMessage) and msg.tool_calls:
+            # Assistant with tool use
+            content_parts: List[Dict[str, Any]] = []
+            # Add text content if exists
+            if msg.content:
+                content_parts.append({"type": "text", "text": msg.content})
+
+            for tc in msg.tool_calls:
+                content_parts.append(
+                    {
+                        "type": "tool_use",
+                        "id": tc.id,
+                        "name": tc.name,
+                        "input": tc.arguments,
+                    }
+                )
+            return "message", {"role": "assistant", "content": content_parts}
+
+        if isinstance(msg.content, str):
+            content_block: Dict[str, Any] = {"type": "text", "text": msg.content}
+            if msg.cache_control:
+                content_block["cache_control"] = {"type": msg.cache_control}
+            return "message", {"role": msg.role, "content": [content_block]}
+
+        if isinstance(msg.content, list):
+            content_parts = []
+            for i, part in enumerate(msg.content):
+                block: Dict[str, Any]
+                if isinstance(part, str):
+                    block = {"type": "text", "text": part}
+                elif isinstance(part, Text):
+                    block = {"type": "text", "text": part.text}
+                elif isinstance(part, Image):
+                    # Anthropic prefers base64 even for URLs usually, or check
+                    # docs.
+                    # For consistency with v0.2 logic, we enforce base64.
+                    # If it has a URL, we fetch it via to_base64() if we want
+                    # consistency, OR we just support base64/path here.
+                    # The Image.to_base64() helper handles path/url/base64
+                    # unified.
+
+                    b64: Union[str, Base64Payload]
+                    if part.data is not None:
+                        b64 = Base64Payload(part.data)
+                    else:
+                        b64 = part.to_base64()
+                    media_type = part.media_type
+
+                    block = {
+                        "type": "image",
+                        "source": {
+                            "type": "base64",
+                            "media_type": media_type,
+                            "data": b64,
+                        },
+                    }
+
+                # Apply cache_control to the LAST block if set on message level?
+                # Or should we support per-block caching in types?
+                # For now, let's apply to the LAST block if msg.cache_control is
+                # set, as Anthropic usually caches up to a point.
+                # However, for fine-grained control, we might need it on
+                # Text/Image types later.
+                # V0.4 MVP: Apply to last block of the message.
+                if msg.cache_control and i == len(msg.content) - 1:
+                    block["cache_control"] = {"type": msg.cache_control}
+
+                content_parts.append(block)
+            return "message", {"role": msg.role, "content": content_parts}
+
+        return "message", None
+
     def parse_response(self, response_data: Dict[str, Any]) -> ModelResponse:
         content_blocks = response_data.get("content", [])
         text_content = ""
@@ -211,8 +226,18 @@ class AnthropicProvider(Provider):
                         )
                     )
 
-        usage_data = response_data.get("usage", {})
-        usage = Usage(
+        usage = self._usage(response_data.get("usage", {}))
+        return ModelResponse(
+            text=text_content,
+            raw=response_data,
+            usage=usage,
+            provider=self.name,
+            tool_calls=tool_calls if tool_calls else None,
+        )
+
+    @staticmethod
+    def _usage(usage_data: Dict[str, Any]) -> Usage:
+        return Usage(
             input_tokens=usage_data.get("input_tokens", 0),
             output_tokens=usage_data.get("output_tokens", 0),
             total_tokens=usage_data.get("input_tokens", 0)
@@ -222,13 +247,6 @@ class AnthropicProvider(Provider):
             ),
             cache_read_input_tokens=usage_data.get("cache_read_input_tokens", 0),
         )
-        return ModelResponse(
-            text=text_content,
-            raw=response_data,
-            usage=usage,
-            provider="anthropic",
-            tool_calls=tool_calls if tool_calls else None,
-        )
 
     def parse_stream_chunk(self, chunk: Dict[str, Any]) -> Optional[StreamChunk]:
         raw_str = chunk.get("raw", "")
@@ -239,9 +257,37 @@ class AnthropicProvider(Provider):
         data_str = raw_str[6:].strip()
         try:
             data = json.loads(data_str)
-            if data["type"] == "content_block_delta":
-                delta = data["delta"]["text"]
-                return StreamChunk(text=delta, delta=delta)
+            if data["type"] == "message_start":
+                # Input tokens are known up front; output is counted in message_delta
+                usage: Optional[Usage] = self._usage(data["message"].get("usage", {}))
+                return StreamChunk(text="", delta="", usage=usage)
+            elif data["type"] == "content_block_start":
+                block = data["content_block"]
+                if block["type"] == "tool_use":
+                    start = ToolCallDelta(
+                        index=data["index"], id=block["id"], name=block["name"]
+                    )
+                    return StreamChunk(text="", delta="", tool_call_deltas=[start])
+            elif data["type"] == "content_block_delta":
+                delta = data["delta"]
+                if delta.get("type") == "input_json_delta":
+                    fragment = ToolCallDelta(
+                        index=data["index"], arguments=delta["partial_json"]
+                    )
+                    return StreamChunk(text="", delta="", tool_call_deltas=[fragment])
+                text = delta["text"]
+                return StreamChunk(text=text, delta=text)
+            elif data["type"] == "content_block_stop":
+                # Closes the block at this index (ignored unless it is a tool)
+                stop = ToolCallDelta(index=data["index"], done=True)
+                return StreamChunk(text="", delta="", tool_call_deltas=[stop])
+            elif data["type"] == "message_delta":
+                stop_reason = data["delta"].get("stop_reason")
+                usage = self._usage(data["usage"]) if data.get("usage") else None
+                if stop_reason or usage:
+                    return StreamChunk(
+                        text="", delta="", finish_reason=stop_reason, usage=usage
+                    )
         except (json.JSONDecodeError, KeyError):
             pass
         return None
@@ -1,6 +1,145 @@
-from typing import Any, Dict, List, Optional, Protocol, Tuple, Union
+import json
+import weakref
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    Union,
+)
 
-from ..data_types import BaseMessage, ModelResponse, StreamChunk
+from ..data_types import BaseMessage, ModelResponse, StreamChunk, ToolCall
+
+if TYPE_CHECKING:
+    from ..images import ImageOptimizer
+
+
+class MessageFormatCache:
+    """
+    Memoizes the provider-specific payload of each message.
+
+    Entries are keyed by message identity and dropped when the message is
+    garbage collected, so conversation history held in memory is formatted
+    once rather than on every request. Messages are treated as immutable once
+    they have been sent; mutate a copy instead of the original.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[
+            int, Tuple[weakref.ref[BaseMessage], Dict[Hashable, Any]]
+        ] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_format(
+        self,
+        message: BaseMessage,
+        formatter: Callable[[BaseMessage], Any],
+        variant: Hashable = None,
+    ) -> Any:
+        """
+        Return the cached payload for `message`, computing it on first use.
+        `variant` separates payloads that depend on request options (e.g. model).
+        """
+        key = id(message)
+        entry = self._entries.get(key)
+        if entry is None or entry[0]() is not message:
+            entries = self._entries
+
+            def _evict(ref: weakref.ref[BaseMessage], key: int = key) -> None:
+                current = entries.get(key)
+                if current is not None and current[0] is ref:
+                    del entries[key]
+
+            entry = (weakref.ref(message, _evict), {})
+            self._entries[key] = entry
+
+        formatted = entry[1]
+        if variant not in formatted:
+            formatted[variant] = formatter(message)
+        return formatted[variant]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class ToolCallAssembler:
+    """
+    Builds complete tool calls from the fragments of one stream.
+
+    Argument fragments are buffered per call and a `ToolCall` is emitted as
+    soon as that call is known to be complete: on its provider `done` marker,
+    when the next call starts (calls stream one after another) or when the
+    response finishes. Use one assembler per stream.
+    """
+
+    def __init__(self) -> None:
+        self._open: Dict[int, Dict[str, Any]] = {}
+
+    def feed(self, chunk: StreamChunk) -> List[ToolCall]:
+        """Consume a chunk; returns the tool calls it completed."""
+        completed: List[ToolCall] = []
+        for delta in chunk.tool_call_deltas or ():
+            call = self._open.get(delta.index)
+            if call is None:
+                if delta.id is None and delta.name is None:
+                    # End marker or fragment of a block that is not a tool call
+                    continue
+                completed.extend(self._close_all())
+                call = self._open[delta.index] = {
+                    "id": None,
+                    "name": None,
+                    "arguments": [],
+                }
+            if delta.id:
+                call["id"] = delta.id
+            if delta.name:
+                call["name"] = delta.name
+            if delta.arguments:
+                call["arguments"].append(delta.arguments)
+            if delta.done:
+                completed.append(self._close(delta.index))
+        if chunk.finish_reason:
+            completed.extend(self._close_all())
+        return completed
+
+    @property
+    def pending(self) -> bool:
+        """Whether a call has started streaming but is not complete yet."""
+        return bool(self._open)
+
+    def finish(self) -> List[ToolCall]:
+        """Emit calls still open when the stream ends."""
+        return self._close_all()
+
+    def _close(self, index: int) -> ToolCall:
+        call = self._open.pop(index)
+        raw = "".join(call["arguments"]) or "{}"
+        error = None
+        try:
+            arguments = json.loads(raw)
+        except ValueError as e:
+            arguments = {}
+            error = f"Invalid JSON arguments for tool {call['name']}: {e}. Raw: {raw}"
+        else:
+            if not isinstance(arguments, dict):
+                arguments = {}
+                error = f"Tool {call['name']} arguments are not an object. Raw: {raw}"
+        return ToolCall(
+            id=call["id"] or f"call_{index}",
+            name=call["name"],
+            arguments=arguments,
+            error=error,
+        )
+
+    def _close_all(self) -> List[ToolCall]:
+        return [self._close(index) for index in sorted(self._open)]
 
 
 class Provider(Protocol):
@@ -9,6 +148,9 @@ class Provider(Protocol):
     It handles standardizing the request payload and parsing the response.
     """
 
+    # Set by Client: shrinks images before they are encoded
+    image_optimizer: Optional["ImageOptimizer"] = None
+
     @property
     def base_url(self) -> str:
         """Return the base URL for this provider."""
@@ -1,19 +1,31 @@
 import json
+import uuid
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from ..data_types import (
+    AssistantMessage,
     BaseMessage,
     Image,
     ModelResponse,
     StreamChunk,
     Text,
+    ToolCallDelta,
     ToolMessage,
     Usage,
 )
-from .base import Provider
+from ..transport.encoding import Base64Payload
+from .base import MessageFormatCache, Provider
+
+
+def _call_id(function_call: Dict[str, Any]) -> str:
+    # Older Gemini versions send no call id; two calls to one function in a
+    # response must still get distinct ids
+    return function_call.get("id") or f"call_{uuid.uuid4().hex[:24]}"
 
 
 class GoogleProvider(Provider):
+    name = "google"
+
     def __init__(self, api_key: str, base_url: str = None, api_version: str = "v1beta"):
         self.api_key = api_key
         # Default to v1beta unless base_url is provided
@@ -22,6 +34,8 @@ class GoogleProvider(Provider):
         else:
             self._base_url = f"https://generativelanguage.googleapis.com/{api_version}"
         self._buffer = ""
+        self._message_cache = MessageFormatCache()
+        self.image_optimizer = None
 
     @property
     def base_url(self) -> str:
@@ -48,88 +62,23 @@ class GoogleProvider(Provider):
         stop: Union[str, List[str]] = None,
     ) -> Tuple[str, Dict[str, Any]]:
         self._buffer = ""
-        contents = []
-        contents = []
-        for msg in messages:
-            role = "model" if msg.role == "assistant" else "user"
-
-            parts = []
-            if isinstance(msg.content, str):
-                parts.append({"text": msg.content})
-            elif isinstance(msg.content, list):
-                for part in msg.content:
-                    if isinstance(part, str):
-                        parts.append({"text": part})
-                    elif isinstance(part, Text):
-                        parts.append({"text": part.text})
-                    elif isinstance(part, Image):
-                        # Gemini supports inlineData for base64.
-                        # We use to_base64() to handle URL/Path/Base64 unified.
-                        b64 = part.to_base64()
-                        if b64:
-                            parts.append(
-                                {
-                                    "inlineData": {
-                                        "mimeType": part.media_type,
-                                        "data": b64,
-                                    }
-                                }
-                            )
-
-            if msg.role == "system":
-                contents.append(
-                    {"role": "user", "parts": [{"text": f"System: {msg.content}"}]}
-                )
-            elif isinstance(msg, ToolMessage):
-                # Google expects: role="function",
-                # parts=[{functionResponse: {name: ..., response: {result: ...}}}]
-                # ... (already implemented)
-                fname = msg.name or "unknown_tool"
-                contents.append(
-                    {
-                        "role": "function",
-                        "parts": [
-                            {
-                                "functionResponse": {
-                                    "name": fname,
-                                    "response": {"name": fname, "content": msg.content},
-                                }
-                            }
-                        ],
-                    }
-                )
-            elif msg.role == "assistant" and getattr(msg, "tool_calls", None):
-                # Assistant with tool calls
-                parts = []
-                if msg.content:
-                    parts.append({"text": msg.content})
-
-                for tc in msg.tool_calls:
-                    parts.append(
-                        {"functionCall": {"name": tc.name, "args": tc.arguments}}
-                    )
-                contents.append({"role": "model", "parts": parts})
-            else:
-                contents.append({"role": role, "parts": parts})
+        contents = [
+            self._message_cache.get_or_format(msg, self._format_message)
+            for msg in messages
+        ]
 
         # Endpoint selection
         method = "streamGenerateContent" if stream else "generateContent"
         endpoint = f"{self.base_url}/models/{model}:{method}?key={self.api_key}"
 
-        payload = {"contents": contents}
+        payload: Dict[str, Any] = {"contents": contents}
 
         # Tool serialization
         if tools:
             funcs = []
             for tool in tools:
                 if hasattr(tool, "args_schema"):
-                    funcs.append(
-                        {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "parameters": tool.args_schema.model_json_schema(),
-                        }
-                    )
+                    funcs.append(tool.declaration("google"))
             if funcs:
                 payload["tools"] = [{"function_declarations": funcs}]
 
@@ -162,6 +111,66 @@ class GoogleProvider(Provider):
 
         return endpoint, payload
 
+    def _format_message(self, msg: BaseMessage) -> Dict[str, Any]:
+        """Format a single message into a Gemini content entry."""
+        role = "model" if msg.role == "assistant" else "user"
+
+        parts: List[Dict[str, Any]] = []
+        if isinstance(msg.content, str):
+            parts.append({"text": msg.content})
+        elif isinstance(msg.content, list):
+            for part in msg.content:
+                if isinstance(part, str):
+                    parts.append({"text": part})
+                elif isinstance(part, Text):
+                    parts.append({"text": part.text})
+                elif isinstance(part, Image):
+                    # Gemini supports inlineData for base64.
+                    # We use to_base64() to handle URL/Path/Base64 unified.
+                    b64: Union[str, Base64Payload]
+                    if part.data is not None:
+                        b64 = Base64Payload(part.data)
+                    else:
+                        b64 = part.to_base64()
+                    if b64:
+                        parts.append(
+                            {
+                                "inlineData": {
+                                    "mimeType": part.media_type,
+                                    "data": b64,
+                                }
+                            }
+                        )
+
+        if msg.role == "system":
+            return {"role": "user", "parts": [{"text": f"System: {msg.content}"}]}
+        elif isinstance(msg, ToolMessage):
+            # Google expects: role="function",
+            # parts=[{functionResponse: {name: ..., response: {result: ...}}}]
+            fname = msg.name or "unknown_tool"
+            return {
+                "role": "function",
+                "parts": [
+                    {
+                        "functionResponse": {
+                            "name": fname,
+                            "response": {"name": fname, "content": msg.content},
+                        }
+                    }
+                ],
+            }
+        elif isinstance(msg, AssistantMessage) and msg.tool_calls:
+            # Assistant with tool calls
+            parts = []
+            if msg.content:
+                parts.append({"text": msg.content})
+
+            for tc in msg.tool_calls:
+                parts.append({"functionCall": {"name": tc.name, "args": tc.arguments}})
+            return {"role": "model", "parts": parts}
+        else:
+            return {"role": role, "parts": parts}
+
     def parse_response(self, response_data: Dict[str, Any]) -> ModelResponse:
         content = ""
         tool_calls = []
@@ -178,7 +187,7 @@ class GoogleProvider(Provider):
 
                     tool_calls.append(
                         ToolCall(
-                            id="call_" + fc["name"],  # No ID in Gemini 1.5 usually?
+                            id=_call_id(fc),
                             name=fc["name"],
                             arguments=fc["args"],
                         )
@@ -186,21 +195,24 @@ class GoogleProvider(Provider):
         except (KeyError, IndexError, TypeError):
             pass
 
-        meta = response_data.get("usageMetadata", {})
-        usage = Usage(
-            input_tokens=meta.get("promptTokenCount", 0),
-            output_tokens=meta.get("candidatesTokenCount", 0),
-            total_tokens=meta.get("totalTokenCount", 0),
-        )
+        usage = self._usage(response_data.get("usageMetadata", {}))
 
         return ModelResponse(
             text=content,
             raw=response_data,
             usage=usage,
-            provider="google",
+            provider=self.name,
             tool_calls=tool_calls if tool_calls else None,
         )
 
+    @staticmethod
+    def _usage(meta: Dict[str, Any]) -> Usage:
+        return Usage(
+            input_tokens=meta.get("promptTokenCount", 0),
+            output_tokens=meta.get("candidatesTokenCount", 0),
+            total_tokens=meta.get("totalTokenCount", 0),
+        )
+
     def parse_stream_chunk(self, chunk: Dict[str, Any]) -> Optional[StreamChunk]:
         raw_obj = chunk.get("raw")
         if isinstance(raw_obj, bytes):
@@ -248,11 +260,39 @@ class GoogleProvider(Provider):
 
             self._buffer = ""  # Clear buffer on success
 
+            # Running totals; the last chunk carries the final counts
+            meta = data.get("usageMetadata")
+            usage = self._usage(meta) if meta else None
             try:
-                text = data["candidates"][0]["content"]["parts"][0]["text"]
-                return StreamChunk(text=text, delta=text)
+                parts = data["candidates"][0]["content"]["parts"]
             except (KeyError, IndexError):
+                parts = []
+
+            text = ""
+            tool_call_deltas: List[ToolCallDelta] = []
+            for part in parts:
+                if "text" in part:
+                    text += part["text"]
+                if "functionCall" in part:
+                    # Gemini sends each function call whole, in a single chunk
+                    fc = part["functionCall"]
+                    tool_call_deltas.append(
+                        ToolCallDelta(
+                            index=len(tool_call_deltas),
+                            id=_call_id(fc),
+                            name=fc["name"],
+                            arguments=json.dumps(fc.get("args", {})),
+                            done=True,
+                        )
+                    )
+            if not text and not tool_call_deltas and not usage:
                 return None
+            return StreamChunk(
+                text=text,
+                delta=text,
+                tool_call_deltas=tool_call_deltas or None,
+                usage=usage,
+            )
 
         except json.JSONDecodeError:
             # Continue buffering
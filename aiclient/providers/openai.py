@@ -2,21 +2,33 @@ import json
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from ..data_types import (
+    AssistantMessage,
     BaseMessage,
     Image,
     ModelResponse,
     StreamChunk,
     Text,
+    ToolCallDelta,
     ToolMessage,
     Usage,
 )
-from .base import Provider
+from ..transport.encoding import Base64Payload
+from .base import MessageFormatCache, Provider
 
 
 class OpenAIProvider(Provider):
+    name = "openai"
+    # Image URLs are passed through by reference, never downloaded client-side
+    fetches_image_urls = False
+
     def __init__(self, api_key: str, base_url: str = "https://api.openai.com/v1"):
         self.api_key = api_key
         self._base_url = base_url.rstrip("/")
+        self._message_cache = MessageFormatCache()
+        self._response_formats: Dict[
+            Tuple[int, bool], Tuple[Dict[str, Any], Dict[str, Any]]
+        ] = {}
+        self.image_optimizer = None
 
     @property
     def base_url(self) -> str:
@@ -49,71 +61,23 @@ class OpenAIProvider(Provider):
         if model.startswith("grok") and "x.ai" not in self.base_url:
             url = "https://api.x.ai/v1/chat/completions"
 
-        formatted_messages = []
-        for msg in messages:
-            if isinstance(msg, ToolMessage):
-                formatted_messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": msg.tool_call_id,
-                        "content": msg.content,
-                    }
-                )
-            elif msg.role == "assistant" and getattr(msg, "tool_calls", None):
-                tcs = []
-                for tc in msg.tool_calls:
-                    tcs.append(
-                        {
-                            "id": tc.id,
-                            "type": "function",
-                            "function": {
-                                "name": tc.name,
-                                "arguments": json.dumps(tc.arguments),
-                            },
-                        }
-                    )
-                formatted_messages.append(
-                    {"role": "assistant", "content": msg.content, "tool_calls": tcs}
-                )
-            elif isinstance(msg.content, str):
-                formatted_messages.append({"role": msg.role, "content": msg.content})
-            elif isinstance(msg.content, list):
-                content_parts = []
-                for part in msg.content:
-                    if isinstance(part, str):
-                        content_parts.append({"type": "text", "text": part})
-                    elif isinstance(part, Text):
-                        content_parts.append({"type": "text", "text": part.text})
-                    elif isinstance(part, Image):
-                        # OpenAI supports URL or Base64
-                        if part.url:
-                            image_url_val = part.url
-                        else:
-                            b64 = part.to_base64()
-                            image_url_val = f"data:{part.media_type};base64,{b64}"
-
-                        img_payload = {"url": image_url_val}
-                        # xAI does not support 'detail' param apparently?
-                        # Or strictly follows standard?
-                        # Let's keep detail for non-grok or default.
-                        if not model.startswith("grok"):
-                            img_payload["detail"] = "auto"
-
-                        content_parts.append(
-                            {"type": "image_url", "image_url": img_payload}
-                        )
-                formatted_messages.append({"role": msg.role, "content": content_parts})
-            else:
-                # Fallback for simple message
-                formatted_messages.append(
-                    {"role": msg.role, "content": str(msg.content)}
-                )
+        # Grok does not take the image 'detail' param, so payloads differ per family
+        variant = "grok" if model.startswith("grok") else None
+        formatted_messages = [
+            self._message_cache.get_or_format(
+                msg, lambda m: self._format_message(m, model), variant
+            )
+            for msg in messages
+        ]
 
         data = {
             "model": model,
             "messages": formatted_messages,
             "stream": stream,
         }
+        if stream:
+            # Ask for a final chunk with the request's token usage
+            data["stream_options"] = {"include_usage": True}
 
         if temperature is not None:
             data["temperature"] = temperature
@@ -133,14 +97,7 @@ class OpenAIProvider(Provider):
 
         # Structured Outputs (Native)
         if response_schema:
-            data["response_format"] = {
-                "type": "json_schema",
-                "json_schema": {
-                    "name": response_schema.get("title", "structured_response"),
-                    "strict": strict,
-                    "schema": response_schema,
-                },
-            }
+            data["response_format"] = self._response_format(response_schema, strict)
 
         # Tool serialization
         if tools:
@@ -149,21 +106,96 @@ class OpenAIProvider(Provider):
                 # Assuming tool is a Tool object from aiclient.tools
                 # We need to map it to OpenAI's expected format
                 if hasattr(tool, "fn") and hasattr(tool, "schema"):
-                    openai_tools.append(
-                        {
-                            "type": "function",
-                            "function": {
-                                "name": tool.name,
-                                "description": tool.fn.__doc__ or "",
-                                "parameters": tool.args_schema.model_json_schema(),
-                            },
-                        }
-                    )
+                    openai_tools.append(tool.declaration("openai"))
             if openai_tools:
                 data["tools"] = openai_tools
 
         return url, data
 
+    def _response_format(
+        self, response_schema: Dict[str, Any], strict: bool
+    ) -> Dict[str, Any]:
+        """
+        Build the json_schema response_format, memoized per schema object
+        (ChatModel passes the same cached schema dict for a given model class).
+        """
+        key = (id(response_schema), strict)
+        cached = self._response_formats.get(key)
+        if cached is not None and cached[0] is response_schema:
+            return cached[1]
+
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": response_schema.get("title", "structured_response"),
+                "strict": strict,
+                "schema": response_schema,
+            },
+        }
+        if len(self._response_formats) >= 128:
+            self._response_formats.clear()
+        self._response_formats[key] = (response_schema, response_format)
+        return response_format
+
+    def _format_message(self, msg: BaseMessage, model: str) -> Dict[str, Any]:
+        """Format a single message into OpenAI's chat format."""
+        if isinstance(msg, ToolMessage):
+            return {
+                "role": "tool",
+                "tool_call_id": msg.tool_call_id,
+                "content": msg.content,
+            }
+        elif isinstance(msg, AssistantMessage) and msg.tool_calls:
+            tcs = []
+            for tc in msg.tool_calls:
+                tcs.append(
+                    {
+                        "id": tc.id,
+                        "type": "function",
+                        "function": {
+                            "name": tc.name,
+                            "arguments": json.dumps(tc.arguments),
+                        },
+                    }
+                )
+            return {"role": "assistant", "content": msg.content, "tool_calls": tcs}
+        elif isinstance(msg.content, str):
+            return {"role": msg.role, "content": msg.content}
+        elif isinstance(msg.content, list):
+            content_parts: List[Dict[str, Any]] = []
+            for part in msg.content:
+                if isinstance(part, str):
+                    content_parts.append({"type": "text", "text": part})
+                elif isinstance(part, Text):
+                    content_parts.append({"type": "text", "text": part.text})
+                elif isinstance(part, Image):
+                    # OpenAI supports URL or Base64
+                    image_url_val: Union[str, Base64Payload]
+                    if part.url:
+                        image_url_val = part.url
+                    elif part.data is not None:
+                        image_url_val = Base64Payload(
+                            part.data, prefix=f"data:{part.media_type};base64,"
+                        )
+                    else:
+                        b64 = part.to_base64()
+                        image_url_val = f"data:{part.media_type};base64,{b64}"
+
+                    img_payload: Dict[str, Any] = {"url": image_url_val}
+                    # xAI does not support 'detail' param apparently?
+                    # Or strictly follows standard?
+                    # Let's keep detail for non-grok or default.
+                    if not model.startswith("grok"):
+                        img_payload["detail"] = part.detail or "auto"
+
+                    content_parts.append(
+                        {"type": "image_url", "image_url": img_payload}
+                    )
+            return {"role": msg.role, "content": content_parts}
+        else:
+            # Fallback for simple message
+            return {"role": msg.role, "content": str(msg.content)}
+
     def parse_response(self, response_data: Dict[str, Any]) -> ModelResponse:
         message = response_data["choices"][0]["message"]
         content = message.get("content") or ""
@@ -183,20 +215,23 @@ class OpenAIProvider(Provider):
                     )
                 )
 
-        usage_data = response_data.get("usage", {})
-        usage = Usage(
-            input_tokens=usage_data.get("prompt_tokens", 0),
-            output_tokens=usage_data.get("completion_tokens", 0),
-            total_tokens=usage_data.get("total_tokens", 0),
-        )
+        usage = self._usage(response_data.get("usage", {}))
         return ModelResponse(
             text=content,
             raw=response_data,
             usage=usage,
-            provider="openai",
+            provider=self.name,
             tool_calls=tool_calls if tool_calls else None,
         )
 
+    @staticmethod
+    def _usage(usage_data: Dict[str, Any]) -> Usage:
+        return Usage(
+            input_tokens=usage_data.get("prompt_tokens", 0),
+            output_tokens=usage_data.get("completion_tokens", 0),
+            total_tokens=usage_data.get("total_tokens", 0),
+        )
+
     def parse_stream_chunk(self, chunk: Dict[str, Any]) -> Optional[StreamChunk]:
         raw_obj = chunk.get("raw")
         if isinstance(raw_obj, bytes):
@@ -220,10 +255,32 @@ class OpenAIProvider(Provider):
             import json
 
             data = json.loads(data_str)
-            delta = data["choices"][0]["delta"].get("content", "")
-            if not delta:  # Might be empty or tool call
+            usage = self._usage(data["usage"]) if data.get("usage") else None
+            if not data.get("choices"):
+                # The include_usage chunk comes last, with no choices
+                return StreamChunk(text="", delta="", usage=usage) if usage else None
+            choice = data["choices"][0]
+            delta = choice.get("delta") or {}
+            text = delta.get("content") or ""
+            tool_call_deltas = [
+                ToolCallDelta(
+                    index=tc.get("index", 0),
+                    id=tc.get("id"),
+                    name=tc.get("function", {}).get("name"),
+                    arguments=tc.get("function", {}).get("arguments") or "",
+                )
+                for tc in delta.get("tool_calls") or []
+            ]
+            finish_reason = choice.get("finish_reason")
+            if not text and not tool_call_deltas and not finish_reason and not usage:
                 return None
-            return StreamChunk(text=delta, delta=delta)
+            return StreamChunk(
+                text=text,
+                delta=text,
+                tool_call_deltas=tool_call_deltas or None,
+                finish_reason=finish_reason,
+                usage=usage,
+            )
         except (json.JSONDecodeError, KeyError, IndexError):
             return None
 
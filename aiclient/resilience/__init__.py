@@ -1,9 +1,11 @@
+import asyncio
+import contextlib
 import threading
 import time
-from typing import List, Union
+from typing import Any, AsyncIterator, Iterator, List, Union
 
 from ..data_types import BaseMessage, ModelResponse
-from ..middleware import Middleware
+from ..middleware import Middleware, passthrough
 from .retries import RetryMiddleware
 
 
@@ -44,7 +46,7 @@ class CircuitBreaker(Middleware):
                 self._failures = 0
         return response
 
-    def on_error(self, error: Exception, model: str, **kwargs) -> None:
+    def on_error(self, error: Exception, model: str, **kwargs: Any) -> None:
         with self._lock:
             self._failures += 1
             self._last_failure_time = time.time()
@@ -56,49 +58,71 @@ class RateLimiter(Middleware):
     def __init__(self, requests_per_minute: int = 60):
         self.rpm = requests_per_minute
         self.window = 60.0
-        self._timestamps = []
+        self._timestamps: List[float] = []
         self._lock = threading.Lock()
 
-    def before_request(
-        self, model: str, prompt: Union[str, List[BaseMessage]]
-    ) -> Union[str, List[BaseMessage]]:
+    def _reserve(self) -> float:
+        """Claim the next free slot in the window; returns the wait until it."""
         with self._lock:
             now = time.time()
             # Remove old timestamps
             self._timestamps = [t for t in self._timestamps if now - t < self.window]
 
             if len(self._timestamps) >= self.rpm:
-                wait_time = self.window - (now - self._timestamps[0])
-                # Blocking sleep or raise? Usually sleep for rate limiter, or raise.
-                # Let's sleep to "shape" traffic.
-                if wait_time > 0:
-                    time.sleep(wait_time)
-                    # Re-check time? or just proceed.
-                    # If we sleep, we are now at 'now + wait_time'.
-                    self._timestamps.append(time.time())  # Approx
+                # Free once the request rpm places back leaves the window
+                slot = self._timestamps[-self.rpm] + self.window
             else:
-                self._timestamps.append(now)
+                slot = now
+            self._timestamps.append(slot)
+            return slot - now
 
+    def before_request(
+        self, model: str, prompt: Union[str, List[BaseMessage]]
+    ) -> Union[str, List[BaseMessage]]:
+        # Sleep to "shape" traffic, outside the lock so others can queue
+        wait_time = self._reserve()
+        if wait_time > 0:
+            time.sleep(wait_time)
         return prompt
 
+    async def before_request_async(
+        self, model: str, prompt: Union[str, List[BaseMessage]]
+    ) -> Union[str, List[BaseMessage]]:
+        """Async version of before_request: waits without blocking the loop."""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        return prompt
+
+    @passthrough
     def after_response(self, response: ModelResponse) -> ModelResponse:
         return response
 
-    def on_error(self, error: Exception, model: str, **kwargs) -> None:
+    @passthrough
+    def on_error(self, error: Exception, model: str, **kwargs: Any) -> None:
         pass
 
 
 class FallbackChain:
     """
     Executes a prompt across a list of models, falling back to the next on failure.
+
+    Streams that stall are not retried on the same model but failed over at
+    once; pass `retry_stalls=True` to retry them first.
     """
 
-    def __init__(self, client, models: List[str]):
+    def __init__(self, client: Any, models: List[str], retry_stalls: bool = False):
         self.client = client
         self.models = models
+        self.retry_stalls = retry_stalls
+
+    def _stream_model(self, model: str) -> Any:
+        chat = self.client.chat(model)
+        chat.retry_stalls = self.retry_stalls
+        return chat
 
     def generate(
-        self, prompt: Union[str, List[BaseMessage]], **kwargs
+        self, prompt: Union[str, List[BaseMessage]], **kwargs: Any
     ) -> ModelResponse:
         last_exception = None
         for model in self.models:
@@ -111,7 +135,7 @@ class FallbackChain:
         raise last_exception or Exception("All fallback models failed")
 
     async def generate_async(
-        self, prompt: Union[str, List[BaseMessage]], **kwargs
+        self, prompt: Union[str, List[BaseMessage]], **kwargs: Any
     ) -> ModelResponse:
         last_exception = None
         for model in self.models:
@@ -122,13 +146,58 @@ class FallbackChain:
                 continue
         raise last_exception or Exception("All fallback models failed")
 
+    def stream(
+        self, prompt: Union[str, List[BaseMessage]], **kwargs: Any
+    ) -> Iterator[str]:
+        """
+        Stream from the first model that works. A model that fails (or stalls,
+        see StreamTimeouts) before its first chunk is dropped for the next one;
+        once text has been streamed, errors are raised as is.
+        """
+        last_exception = None
+        for model in self.models:
+            started = False
+            try:
+                # Closed as soon as the consumer stops, dropping the upstream
+                stream = self._stream_model(model).stream(prompt, **kwargs)
+                with contextlib.closing(stream):
+                    for text in stream:
+                        started = True
+                        yield text
+                return
+            except Exception as e:
+                if started:
+                    raise
+                last_exception = e
+        raise last_exception or Exception("All fallback models failed")
+
+    async def stream_async(
+        self, prompt: Union[str, List[BaseMessage]], **kwargs: Any
+    ) -> AsyncIterator[str]:
+        """Async version of stream."""
+        last_exception = None
+        for model in self.models:
+            started = False
+            try:
+                stream = self._stream_model(model).stream_async(prompt, **kwargs)
+                async with contextlib.aclosing(stream):
+                    async for text in stream:
+                        started = True
+                        yield text
+                return
+            except Exception as e:
+                if started:
+                    raise
+                last_exception = e
+        raise last_exception or Exception("All fallback models failed")
+
 
 class LoadBalancer:
     """
     Distributes requests across multiple models/endpoints using Round Robin.
     """
 
-    def __init__(self, client, models: List[str]):
+    def __init__(self, client: Any, models: List[str]):
         self.client = client
         self.models = models
         self._index = 0
@@ -141,13 +210,13 @@ class LoadBalancer:
             return model
 
     def generate(
-        self, prompt: Union[str, List[BaseMessage]], **kwargs
+        self, prompt: Union[str, List[BaseMessage]], **kwargs: Any
     ) -> ModelResponse:
         model = self._get_next_model()
         return self.client.chat(model).generate(prompt, **kwargs)
 
     async def generate_async(
-        self, prompt: Union[str, List[BaseMessage]], **kwargs
+        self, prompt: Union[str, List[BaseMessage]], **kwargs: Any
     ) -> ModelResponse:
         model = self._get_next_model()
         return await self.client.chat(model).generate_async(prompt, **kwargs)
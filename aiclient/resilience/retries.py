@@ -6,6 +6,7 @@ from typing import Any, List, Union
 import httpx
 
 from ..data_types import BaseMessage, ModelResponse
+from ..middleware import passthrough
 
 
 class RetryMiddleware:
@@ -21,12 +22,14 @@ class RetryMiddleware:
         self.backoff_factor = backoff_factor
         self.max_delay = max_delay
 
+    @passthrough
     def before_request(
         self, model: str, prompt: Union[str, List[BaseMessage]]
     ) -> Union[str, List[BaseMessage]]:
         # No Modification
         return prompt
 
+    @passthrough
     def after_response(self, response: ModelResponse) -> ModelResponse:
         return response
 
@@ -4,8 +4,9 @@ Use these tools to verify your code without making real API calls.
 """
 
 import contextlib
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
 
+from .context import RequestContext
 from .data_types import BaseMessage, ModelResponse, StreamChunk, Usage
 from .providers.base import Provider
 from .transport.base import Transport
@@ -17,16 +18,36 @@ class MockTransport(Transport):
     Used in conjunction with MockProvider which handles the response queue.
     """
 
-    def send(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def send(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
+    ) -> Dict[str, Any]:
         return {}
 
-    async def send_async(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def send_async(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
+    ) -> Dict[str, Any]:
         return {}
 
-    def stream(self, endpoint: str, data: Dict[str, Any]):
+    def stream(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
+    ) -> Iterator[Dict[str, Any]]:
         yield {}
 
-    async def stream_async(self, endpoint: str, data: Dict[str, Any]):
+    async def stream_async(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
         yield {}
 
 
@@ -36,6 +57,8 @@ class MockProvider(Provider):
     Useful for unit testing your application logic.
     """
 
+    name = "mock"
+
     def __init__(self, base_url: str = "mock://test"):
         self._base_url = base_url
         self._responses: List[Union[ModelResponse, Exception]] = []
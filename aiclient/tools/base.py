@@ -1,4 +1,5 @@
-from typing import Any, Callable, Dict, Type
+from functools import cached_property
+from typing import Any, Callable, Dict, Optional, Type
 
 from pydantic import BaseModel
 
@@ -7,6 +8,17 @@ class Tool:
     """
     A definition for a tool that can be used by an AI model.
     wraps a function and its Pydantic schema.
+
+    The JSON schema and the per-provider declarations are generated once and
+    cached, so treat a Tool as immutable after it has been sent to a model.
+
+    `timeout` (seconds) bounds a single call when run by an Agent. Sync tools
+    run in a thread pool; set `cpu_bound=True` to use a process pool instead
+    (the function and its arguments must then be picklable).
+
+    Mark idempotent tools `cacheable` to let an Agent reuse results for
+    identical arguments (see `aiclient.cache.ToolResultCache`); `cache_ttl`
+    overrides the cache's default expiry.
     """
 
     def __init__(
@@ -15,39 +27,88 @@ class Tool:
         fn: Callable,
         schema: Type[BaseModel] = None,
         description: str = "",
-        raw_schema: Dict[str, Any] = None,
+        raw_schema: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        cpu_bound: bool = False,
+        cacheable: bool = False,
+        cache_ttl: Optional[float] = None,
     ):
         self.name = name
         self.fn = fn
         self.args_schema = schema
         self.description = description or fn.__doc__ or ""
         self.raw_schema = raw_schema
+        self.timeout = timeout
+        self.cpu_bound = cpu_bound
+        self.cacheable = cacheable
+        self.cache_ttl = cache_ttl
+        self._declarations: Dict[str, Dict[str, Any]] = {}
+
+    @cached_property
+    def parameters(self) -> Dict[str, Any]:
+        """JSON Schema for the tool arguments, generated on first use."""
+        if self.raw_schema:
+            return self.raw_schema
+
+        if self.args_schema:
+            return self.args_schema.model_json_schema()
+
+        return {"type": "object", "properties": {}}
 
     @property
     def schema(self) -> Dict[str, Any]:
         """JSON Schema for the tool arguments."""
-        if self.raw_schema:
-            return {
+        return {
+            "name": self.name,
+            "description": self.description,
+            "parameters": self.parameters,
+        }
+
+    def declaration(self, provider: str) -> Dict[str, Any]:
+        """
+        The tool as declared in a request to `provider`
+        ('openai', 'anthropic' or 'google'). Built once and cached.
+        """
+        decl = self._declarations.get(provider)
+        if decl is not None:
+            return decl
+
+        if provider == "openai":
+            decl = {
+                "type": "function",
+                "function": {
+                    "name": self.name,
+                    "description": self.description,
+                    "parameters": self.parameters,
+                },
+            }
+        elif provider == "anthropic":
+            decl = {
                 "name": self.name,
                 "description": self.description,
-                "parameters": self.raw_schema,
+                "input_schema": self.parameters,
             }
-
-        if self.args_schema:
-            return {
+        elif provider == "google":
+            decl = {
                 "name": self.name,
                 "description": self.description,
-                "parameters": self.args_schema.model_json_schema(),
+                "parameters": self.parameters,
             }
+        else:
+            raise ValueError(f"Unknown provider for tool declaration: {provider}")
 
-        return {
-            "name": self.name,
-            "description": self.description,
-            "parameters": {"type": "object", "properties": {}},
-        }
+        self._declarations[provider] = decl
+        return decl
 
     @classmethod
-    def from_fn(cls, fn: Callable) -> "Tool":
+    def from_fn(
+        cls,
+        fn: Callable[..., Any],
+        timeout: Optional[float] = None,
+        cpu_bound: bool = False,
+        cacheable: bool = False,
+        cache_ttl: Optional[float] = None,
+    ) -> "Tool":
         import inspect
 
         from pydantic import create_model
@@ -68,7 +129,15 @@ class Tool:
                 params[name] = (annotation, default)
 
         schema = create_model(f"{fn.__name__}Schema", **params)
-        return cls(name=fn.__name__, fn=fn, schema=schema)
+        return cls(
+            name=fn.__name__,
+            fn=fn,
+            schema=schema,
+            timeout=timeout,
+            cpu_bound=cpu_bound,
+            cacheable=cacheable,
+            cache_ttl=cache_ttl,
+        )
 
     def run(self, **kwargs) -> Any:
         # Validate arguments using schema if present
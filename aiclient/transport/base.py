@@ -1,25 +1,67 @@
-from typing import Any, AsyncIterator, Dict, Iterator, Protocol
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Protocol
+
+from pydantic import BaseModel
+
+from ..context import RequestContext
+
+
+class StreamTimeouts(BaseModel):
+    """
+    Timeouts for streamed responses, in seconds (None: no limit).
+
+    `connect` bounds establishing the connection, `first_byte` the wait for
+    the first chunk after sending the request, and `idle` the gap between
+    chunks, so a stalled stream fails fast instead of at the overall timeout.
+    `retry` controls whether a stall is retried on the same model (up to
+    `max_retries`); FallbackChain turns it off and moves to the next model.
+    """
+
+    connect: Optional[float] = None
+    first_byte: Optional[float] = None
+    idle: Optional[float] = None
+    retry: bool = True
 
 
 class Transport(Protocol):
     """
     Abstract interface for network transport.
+
+    `context` is the RequestContext of the call (request ID, timings);
+    ChatModel passes it only to transports whose methods accept it.
     """
 
-    def send(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def send(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
+    ) -> Dict[str, Any]:
         """Send a synchronous request."""
         ...
 
-    async def send_async(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def send_async(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
+    ) -> Dict[str, Any]:
         """Async version of send."""
         ...
 
-    def stream(self, endpoint: str, data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    def stream(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
+    ) -> Iterator[Dict[str, Any]]:
         """Stream a synchronous request."""
         ...
 
-    async def stream_async(
-        self, endpoint: str, data: Dict[str, Any]
+    def stream_async(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
     ) -> AsyncIterator[Dict[str, Any]]:
-        """Stream an asynchronous request."""
+        """Stream an asynchronous request (an async generator)."""
         ...
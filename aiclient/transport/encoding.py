@@ -0,0 +1,138 @@
+"""
+Request body encoding.
+
+Payloads may carry binary image data wrapped in `Base64Payload` instead of a
+pre-built base64 string. The encoder serializes everything else with the C
+`json` encoder and base64-encodes the binary parts in fixed-size chunks while
+the body is being sent, so a multi-megabyte image is never materialized as a
+base64 string (nor as a JSON string containing it).
+"""
+
+import base64
+import json
+import re
+import secrets
+from typing import Any, AsyncIterator, Iterator, List, Union
+
+# Multiple of 3 so each chunk encodes to base64 without padding
+_CHUNK_SIZE = 3 * 256 * 1024
+
+
+class Base64Payload:
+    """
+    Placeholder for a base64 string in a request payload.
+    Holds the raw bytes (bytes, bytearray, memoryview or mmap) without copying.
+    """
+
+    __slots__ = ("data", "prefix")
+
+    def __init__(self, data: Any, prefix: str = ""):
+        self.data = data
+        self.prefix = prefix
+
+    def __len__(self) -> int:
+        """Length of the encoded string, prefix included."""
+        return len(self.prefix) + 4 * ((memoryview(self.data).nbytes + 2) // 3)
+
+    def __str__(self) -> str:
+        return self.prefix + base64.b64encode(self.data).decode("ascii")
+
+    def __repr__(self) -> str:
+        return f"Base64Payload({memoryview(self.data).nbytes} bytes)"
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Base64Payload):
+            return self.prefix == other.prefix and bytes(self.data) == bytes(other.data)
+        if isinstance(other, str):
+            return str(self) == other
+        return NotImplemented
+
+    def iter_encoded(self, chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+        if self.prefix:
+            yield self.prefix.encode("ascii")
+        view = memoryview(self.data).cast("B")
+        for start in range(0, len(view), chunk_size):
+            yield base64.b64encode(view[start : start + chunk_size])
+
+
+class JSONBodyStream:
+    """
+    A JSON body split into literal byte segments and `Base64Payload`s.
+    Iterable (use `aiter()` for async clients) with a known total length.
+    """
+
+    def __init__(self, segments: List[Union[bytes, Base64Payload]]):
+        self.segments = segments
+
+    def __len__(self) -> int:
+        # Payload strings are quoted; the quotes are emitted with the payload
+        return sum(
+            len(s) + 2 if isinstance(s, Base64Payload) else len(s)
+            for s in self.segments
+        )
+
+    def __iter__(self) -> Iterator[bytes]:
+        for segment in self.segments:
+            if isinstance(segment, Base64Payload):
+                yield b'"'
+                yield from segment.iter_encoded()
+                yield b'"'
+            else:
+                yield segment
+
+    async def aiter(self) -> AsyncIterator[bytes]:
+        """Async iterator over the body, as required by httpx.AsyncClient."""
+        for chunk in self:
+            yield chunk
+
+
+def encode_json_body(data: Any) -> Union[bytes, JSONBodyStream]:
+    """
+    Serialize a request payload.
+    Returns plain bytes unless the payload contains `Base64Payload`s, in which
+    case a streamable `JSONBodyStream` is returned.
+    """
+    payloads: List[Base64Payload] = []
+    nonce = secrets.token_hex(8)
+
+    def default(obj: Any) -> str:
+        if isinstance(obj, Base64Payload):
+            payloads.append(obj)
+            return f"@@aiclient-b64:{nonce}:{len(payloads) - 1}@@"
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    text = json.dumps(data, default=default, ensure_ascii=False, separators=(",", ":"))
+    if not payloads:
+        return text.encode("utf-8")
+
+    segments: List[Union[bytes, Base64Payload]] = []
+    pattern = re.compile(f'"@@aiclient-b64:{nonce}:(\\d+)@@"')
+    last = 0
+    for match in pattern.finditer(text):
+        segments.append(text[last : match.start()].encode("utf-8"))
+        segments.append(payloads[int(match.group(1))])
+        last = match.end()
+    segments.append(text[last:].encode("utf-8"))
+    return JSONBodyStream(segments)
+
+
+def materialize_payload(data: Any) -> Any:
+    """
+    Replace `Base64Payload`s with plain strings, for transports that expect
+    ordinary JSON-compatible dicts. Containers are only copied when changed.
+    """
+    if isinstance(data, Base64Payload):
+        return str(data)
+    if isinstance(data, dict):
+        changed = {}
+        for key, value in data.items():
+            new = materialize_payload(value)
+            if new is not value:
+                changed[key] = new
+        return {**data, **changed} if changed else data
+    if isinstance(data, list):
+        items = [materialize_payload(v) for v in data]
+        if any(new is not old for new, old in zip(items, data)):
+            return items
+        return data
+    return data
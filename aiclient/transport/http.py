@@ -1,8 +1,10 @@
 import logging
-from typing import Any, AsyncIterator, Dict, Iterator
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, NoReturn, Optional
 
 import httpx
 
+from ..context import RequestContext
 from ..exceptions import (
     AIClientError,
     AuthenticationError,
@@ -10,8 +12,10 @@ from ..exceptions import (
     NetworkError,
     ProviderError,
     RateLimitError,
+    StreamTimeoutError,
 )
-from .base import Transport
+from .base import StreamTimeouts, Transport
+from .encoding import encode_json_body
 
 logger = logging.getLogger("aiclient.transport")
 
@@ -19,20 +23,72 @@ logger = logging.getLogger("aiclient.transport")
 class HTTPTransport(Transport):
     """
     Production-grade HTTP transport using httpx.
+
+    Request bodies are encoded by `encode_json_body`, so binary image data in
+    the payload is base64-encoded in chunks while it is sent.
     """
 
+    # Accepts payloads containing Base64Payload placeholders
+    supports_binary_payloads = True
+
     def __init__(
-        self, base_url: str = "", headers: Dict[str, str] = None, timeout: float = 60.0
+        self,
+        base_url: str = "",
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 60.0,
+        stream_timeouts: Optional[StreamTimeouts] = None,
+        media_client: Optional[httpx.AsyncClient] = None,
     ):
         self.base_url = base_url
         self.headers = headers
         self.timeout = timeout
+        self.stream_timeouts = stream_timeouts
+        self._stream_timeout = self._build_stream_timeout()
         self.client = httpx.Client(base_url=base_url, headers=headers, timeout=timeout)
         self.aclient = httpx.AsyncClient(
             base_url=base_url, headers=headers, timeout=timeout
         )
+        # Given by Client, shared by all its models and closed by it
+        self._media_client = media_client
+
+    def _build_stream_timeout(self) -> Optional[httpx.Timeout]:
+        """
+        httpx timeout for streams. httpx's read timeout bounds every wait for
+        data, the first byte included, so it is the larger of first_byte and
+        idle; ChatModel's async streams enforce each one exactly.
+        """
+        timeouts = self.stream_timeouts
+        if timeouts is None:
+            return None
+        reads = [t for t in (timeouts.first_byte, timeouts.idle) if t is not None]
+        return httpx.Timeout(
+            self.timeout,
+            connect=self.timeout if timeouts.connect is None else timeouts.connect,
+            read=max(reads) if reads else self.timeout,
+        )
 
-    def _handle_error(self, e: Exception, context: str = ""):
+    def _stream_kwargs(
+        self, data: Dict[str, Any], is_async: bool = False
+    ) -> Dict[str, Any]:
+        kwargs = self._body(data, is_async=is_async)
+        if self._stream_timeout is not None:
+            kwargs["timeout"] = self._stream_timeout
+        return kwargs
+
+    @property
+    def media_client(self) -> httpx.AsyncClient:
+        """
+        Pooled client for downloading image URLs (the one passed in, or a
+        lazily created one). Kept separate from `aclient` so provider
+        credentials never reach third-party hosts.
+        """
+        if self._media_client is None:
+            self._media_client = httpx.AsyncClient(
+                timeout=self.timeout, follow_redirects=True
+            )
+        return self._media_client
+
+    def _handle_error(self, e: Exception, context: str = "") -> NoReturn:
         """Map httpx errors to AIClient exceptions."""
         if isinstance(e, httpx.HTTPStatusError):
             status = e.response.status_code
@@ -84,44 +140,108 @@ class HTTPTransport(Transport):
             logger.error(f"Unexpected Error: {e}")
             raise AIClientError(f"Unexpected error: {e}") from e
 
-    def send(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        logger.debug(f"SEND {endpoint} payload={data}")
+    def _body(self, data: Dict[str, Any], is_async: bool = False) -> Dict[str, Any]:
+        """Keyword arguments carrying the encoded JSON body for an httpx request."""
+        body = encode_json_body(data)
+        headers = {"Content-Type": "application/json"}
+        if isinstance(body, bytes):
+            return {"content": body, "headers": headers}
+        headers["Content-Length"] = str(len(body))
+        return {"content": body.aiter() if is_async else body, "headers": headers}
+
+    @staticmethod
+    def _request_id(context: Optional[RequestContext]) -> Optional[str]:
+        return context.request_id if context else None
+
+    @staticmethod
+    def _first_byte(context: Optional[RequestContext]) -> float:
+        """Note when the response headers arrived (connect-time metrics)."""
+        now = time.perf_counter()
+        if context is not None:
+            context.first_byte = now
+        return now
+
+    def send(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
+    ) -> Dict[str, Any]:
+        logger.debug(
+            "SEND %s id=%s payload=%s", endpoint, self._request_id(context), data
+        )
         try:
-            response = self.client.post(endpoint, json=data)
+            response = self.client.post(endpoint, **self._body(data))
+            self._first_byte(context)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             self._handle_error(e, "Sync send failed")
 
-    async def send_async(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        logger.debug(f"ASYNC SEND {endpoint} payload={data}")
+    async def send_async(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
+    ) -> Dict[str, Any]:
+        logger.debug(
+            "ASYNC SEND %s id=%s payload=%s", endpoint, self._request_id(context), data
+        )
         try:
-            response = await self.aclient.post(endpoint, json=data)
+            response = await self.aclient.post(
+                endpoint, **self._body(data, is_async=True)
+            )
+            self._first_byte(context)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             self._handle_error(e, "Async send failed")
 
-    def stream(self, endpoint: str, data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
-        logger.debug(f"STREAM {endpoint} payload={data}")
+    def stream(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        logger.debug(
+            "STREAM %s id=%s payload=%s", endpoint, self._request_id(context), data
+        )
         try:
-            with self.client.stream("POST", endpoint, json=data) as response:
+            with self.client.stream(
+                "POST", endpoint, **self._stream_kwargs(data)
+            ) as response:
                 response.raise_for_status()
+                connected_at = self._first_byte(context)
                 for line in response.iter_lines():
                     if line:
-                        yield {"raw": line}
+                        yield {"raw": line, "connected_at": connected_at}
+        except httpx.ReadTimeout as e:
+            raise StreamTimeoutError(f"Stream stalled: {e}") from e
         except Exception as e:
             self._handle_error(e, "Stream failed")
 
     async def stream_async(
-        self, endpoint: str, data: Dict[str, Any]
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        context: Optional[RequestContext] = None,
     ) -> AsyncIterator[Dict[str, Any]]:
-        logger.debug(f"ASYNC STREAM {endpoint} payload={data}")
+        logger.debug(
+            "ASYNC STREAM %s id=%s payload=%s",
+            endpoint,
+            self._request_id(context),
+            data,
+        )
         try:
-            async with self.aclient.stream("POST", endpoint, json=data) as response:
+            async with self.aclient.stream(
+                "POST", endpoint, **self._stream_kwargs(data, is_async=True)
+            ) as response:
                 response.raise_for_status()
+                connected_at = self._first_byte(context)
                 async for line in response.aiter_lines():
                     if line:
-                        yield {"raw": line}
+                        yield {"raw": line, "connected_at": connected_at}
+        except httpx.ReadTimeout as e:
+            raise StreamTimeoutError(f"Stream stalled: {e}") from e
         except Exception as e:
             self._handle_error(e, "Async stream failed")
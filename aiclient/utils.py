@@ -4,6 +4,7 @@ import os
 from typing import Tuple
 
 from .data_types import Image
+from .exceptions import NetworkError, ProviderError, RateLimitError
 
 
 def encode_image(image: Image) -> Tuple[str, str]:
@@ -36,7 +37,12 @@ def encode_image(image: Image) -> Tuple[str, str]:
 
 
 def should_retry(exception: Exception) -> bool:
-    """Check if the exception is a retryable HTTP error (429, 5xx)."""
+    """
+    Check if the exception is a retryable HTTP error (429, 5xx) or a dropped
+    connection, raw or as mapped by HTTPTransport.
+    """
+    if isinstance(exception, (RateLimitError, ProviderError, NetworkError)):
+        return True
     if hasattr(exception, "response"):
         code = exception.response.status_code
         # 429: Too Many Requests
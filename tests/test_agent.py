@@ -2,6 +2,8 @@
 Tests for Agent functionality with tool use.
 """
 
+import asyncio
+import time
 from unittest.mock import MagicMock
 
 from aiclient.agent import Agent
@@ -180,3 +182,269 @@ def test_agent_no_tool_calls():
 #
 #     assert result == "Weather checked!"
 #     assert mock_model.generate_async.call_count == 2
+
+
+def slow_square(x: int) -> int:
+    """Module-level so it can be sent to a process pool."""
+    time.sleep(0.2)
+    return x * x
+
+
+def _multi_call_model(calls):
+    mock_model = MagicMock(spec=ChatModel)
+    mock_model.generate_async.side_effect = [
+        ModelResponse(text="", raw={}, tool_calls=calls),
+        ModelResponse(text="Done", raw={}, tool_calls=None),
+    ]
+    return mock_model
+
+
+def _tool_messages(agent):
+    return [m for m in agent.memory.get_messages() if m.role == "tool"]
+
+
+def test_agent_runs_tool_calls_concurrently_in_order():
+    """A multi-tool step takes as long as the slowest tool, not the sum."""
+
+    def blocking(delay: float) -> str:
+        time.sleep(delay)
+        return f"slept {delay}"
+
+    async def waiting(delay: float) -> str:
+        await asyncio.sleep(delay)
+        return f"waited {delay}"
+
+    calls = [
+        ToolCall(id="a", name="blocking", arguments={"delay": 0.3}),
+        ToolCall(id="b", name="waiting", arguments={"delay": 0.1}),
+        ToolCall(id="c", name="blocking", arguments={"delay": 0.2}),
+    ]
+    agent = Agent(model=_multi_call_model(calls), tools=[blocking, waiting])
+
+    start = time.perf_counter()
+    assert agent.run("Go") == "Done"
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    results = _tool_messages(agent)
+    assert [m.tool_call_id for m in results] == ["a", "b", "c"]
+    assert [m.content for m in results] == ["slept 0.3", "waited 0.1", "slept 0.2"]
+
+
+def test_agent_tool_timeout_and_cpu_bound_tools():
+    async def hang() -> str:
+        await asyncio.sleep(10)
+
+    calls = [
+        ToolCall(id="a", name="hang", arguments={}),
+        ToolCall(id="b", name="slow_square", arguments={"x": 3}),
+    ]
+    agent = Agent(
+        model=_multi_call_model(calls),
+        tools=[
+            Tool.from_fn(hang, timeout=0.1),
+            Tool.from_fn(slow_square, cpu_bound=True),
+        ],
+        max_concurrent_tools=1,
+    )
+
+    assert agent.run("Go") == "Done"
+
+    results = _tool_messages(agent)
+    assert results[0].content == "Error: Tool hang timed out after 0.1s"
+    assert results[1].content == "9"
+
+
+def test_cpu_bound_tools_share_one_process_pool():
+    """run_async alone (no run()/async with) reuses one pool, not one per agent."""
+    from aiclient import agent as agent_module
+
+    pools = []
+    for _ in range(2):
+        calls = [ToolCall(id="a", name="slow_square", arguments={"x": 2})]
+        agent = Agent(
+            model=_multi_call_model(calls),
+            tools=[Tool.from_fn(slow_square, cpu_bound=True)],
+        )
+        assert asyncio.run(agent.run_async("Go")) == "Done"
+        assert _tool_messages(agent)[0].content == "4"
+        pools.append(agent_module._process_pool)
+
+    assert pools[0] is not None
+    assert pools[0] is pools[1]
+
+
+def test_agent_reuses_cacheable_tool_results_across_agents():
+    from aiclient.cache import ToolResultCache
+
+    calls = []
+
+    def lookup(city: str, units: str = "C") -> str:
+        calls.append(city)
+        return f"{city}: 20{units}"
+
+    def flaky(city: str) -> str:
+        raise RuntimeError("down")
+
+    cache = ToolResultCache()
+    tools = [Tool.from_fn(lookup, cacheable=True), Tool.from_fn(flaky, cacheable=True)]
+    for _ in range(2):
+        step = [
+            ToolCall(id="a", name="lookup", arguments={"city": "Oslo", "units": "C"}),
+            ToolCall(id="b", name="flaky", arguments={"city": "Oslo"}),
+        ]
+        agent = Agent(model=_multi_call_model(step), tools=tools, tool_cache=cache)
+        agent.run("Go")
+        assert _tool_messages(agent)[0].content == "Oslo: 20C"
+
+    # Second agent hit the cache; errors are never cached
+    assert calls == ["Oslo"]
+    assert cache.stats() == {"hits": 1, "misses": 3, "size": 1}
+
+
+def test_tool_result_cache_key_ttl_and_eviction():
+    from aiclient.cache import ToolResultCache
+
+    cache = ToolResultCache(max_entries=2)
+    cache.set("t", {"a": 1, "b": 2}, "x")
+    assert cache.get("t", {"b": 2, "a": 1}) == "x"
+
+    cache.set("t", {"a": 2}, "y", ttl=0)
+    assert cache.get("t", {"a": 2}) is None
+
+    cache.set("t", {"a": 3}, "z")
+    cache.set("t", {"a": 4}, "w")
+    assert cache.get("t", {"a": 1, "b": 2}) is None
+    assert len(cache) == 2
+
+
+def test_agent_stream_async_yields_tokens_tool_events_and_answer():
+    from aiclient.data_types import StreamChunk, ToolCallDelta
+    from aiclient.providers.base import ToolCallAssembler
+
+    turns = [
+        [
+            StreamChunk(text="Let me ", delta="Let me "),
+            StreamChunk(text="check.", delta="check."),
+            StreamChunk(
+                text="",
+                delta="",
+                tool_call_deltas=[
+                    ToolCallDelta(index=0, id="call_1", name="get_weather"),
+                    ToolCallDelta(index=0, arguments='{"location": '),
+                ],
+            ),
+            StreamChunk(
+                text="",
+                delta="",
+                tool_call_deltas=[ToolCallDelta(index=0, arguments='"Oslo"}')],
+            ),
+        ],
+        [StreamChunk(text="Sunny!", delta="Sunny!")],
+    ]
+
+    class StreamingModel:
+        async def stream_chunks_async(self, messages, tools=None):
+            assembler = ToolCallAssembler()
+            for chunk in turns.pop(0):
+                chunk.tool_calls = assembler.feed(chunk) or None
+                yield chunk
+            remaining = assembler.finish()
+            if remaining:
+                yield StreamChunk(text="", delta="", tool_calls=remaining)
+
+    agent = Agent(model=StreamingModel(), tools=[get_weather])
+
+    async def collect():
+        return [event async for event in agent.stream_async("Weather?")]
+
+    events = asyncio.run(collect())
+
+    assert [e.type for e in events] == [
+        "token",
+        "token",
+        "tool_start",
+        "tool_end",
+        "token",
+        "answer",
+    ]
+    assert events[2].tool_call.arguments == {"location": "Oslo"}
+    assert events[3].result == "Sunny in Oslo"
+    assert events[-1].text == "Sunny!"
+    assert _tool_messages(agent)[0].tool_call_id == "call_1"
+
+
+def test_agent_stream_async_closes_model_stream_when_consumer_stops():
+    import contextlib
+
+    from aiclient.data_types import StreamChunk
+
+    closed = []
+
+    class StreamingModel:
+        async def stream_chunks_async(self, messages, tools=None):
+            try:
+                while True:
+                    yield StreamChunk(text="tick", delta="tick")
+                    await asyncio.sleep(0)
+            finally:
+                closed.append(True)
+
+    agent = Agent(model=StreamingModel())
+
+    async def first_event():
+        stream = agent.stream_async("Go")
+        async with contextlib.aclosing(stream):
+            async for event in stream:
+                break
+        # Closed right away, not when the event loop shuts down
+        assert closed == [True]
+        return event
+
+    assert asyncio.run(first_event()).text == "tick"
+
+
+def test_agent_stream_async_starts_tools_before_the_stream_ends():
+    from aiclient.data_types import StreamChunk, ToolCall
+
+    started = []
+
+    async def record(label: str) -> str:
+        started.append(label)
+        return label
+
+    turns = [["a", "b"], []]
+
+    class StreamingModel:
+        async def stream_chunks_async(self, messages, tools=None):
+            for label in turns.pop(0):
+                yield StreamChunk(
+                    text="",
+                    delta="",
+                    tool_calls=[
+                        ToolCall(id=label, name="record", arguments={"label": label})
+                    ],
+                )
+                # Give the started tool a chance to run
+                await asyncio.sleep(0.01)
+                # The model is still streaming; the earlier call already ran
+                assert label in started
+            yield StreamChunk(text="done", delta="done")
+
+    agent = Agent(model=StreamingModel(), tools=[record])
+
+    async def collect():
+        return [event async for event in agent.stream_async("Go")]
+
+    events = asyncio.run(collect())
+
+    assert [e.type for e in events] == [
+        "tool_start",
+        "tool_start",
+        "tool_end",
+        "token",
+        "tool_end",
+        "token",
+        "answer",
+    ]
+    assert [m.content for m in _tool_messages(agent)] == ["a", "b"]
@@ -0,0 +1,144 @@
+"""
+Tests for fanning one stream out to several consumers.
+"""
+
+import asyncio
+
+import pytest
+
+from aiclient import MockProvider
+from aiclient.broadcast import StreamBroadcaster
+from aiclient.exceptions import ProviderError, SlowConsumerError
+from aiclient.models.chat import ChatModel
+
+
+class TextStreamTransport:
+    """Streams fixed texts and counts upstream calls."""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.calls = 0
+
+    async def stream_async(self, endpoint, data):
+        self.calls += 1
+        for text in self.texts:
+            yield {"text": text}
+
+
+async def numbers(n, delay=0.0, fail=False):
+    for i in range(n):
+        await asyncio.sleep(delay)
+        yield i
+    if fail:
+        raise ProviderError("upstream dropped")
+
+
+async def collect(subscription, delay=0.0):
+    items = []
+    async for item in subscription:
+        items.append(item)
+        await asyncio.sleep(delay)
+    return items
+
+
+@pytest.mark.asyncio
+async def test_broadcast_single_upstream_call():
+    """All subscribers see the same chunks from one model request."""
+    transport = TextStreamTransport(["Hello", " ", "world"])
+    model = ChatModel("mock", MockProvider(), transport)
+
+    broadcaster = StreamBroadcaster(model.stream_async("Hi"))
+    results = await asyncio.gather(
+        *(collect(broadcaster.subscribe()) for _ in range(3))
+    )
+
+    assert results == [["Hello", " ", "world"]] * 3
+    assert transport.calls == 1
+    assert broadcaster.done
+    assert broadcaster.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_broadcast_late_joiner_replay():
+    broadcaster = StreamBroadcaster(numbers(6, delay=0.01))
+    first = broadcaster.subscribe()
+    seen = [await first.__anext__(), await first.__anext__(), await first.__anext__()]
+
+    late = broadcaster.subscribe()
+    assert await collect(late) == list(range(6))
+    assert seen + await collect(first) == list(range(6))
+
+
+@pytest.mark.asyncio
+async def test_broadcast_without_replay():
+    broadcaster = StreamBroadcaster(numbers(4, delay=0.01), replay=False)
+    first = broadcaster.subscribe()
+    await first.__anext__()
+    await first.__anext__()
+
+    late = await collect(broadcaster.subscribe())
+    assert late and late[0] > 0
+    assert late[-1] == 3
+
+
+@pytest.mark.asyncio
+async def test_broadcast_drop_policy():
+    """A slow subscriber loses items; a fast one is not held back."""
+    broadcaster = StreamBroadcaster(numbers(20), buffer_size=2, policy="drop")
+    fast = collect(broadcaster.subscribe())
+    slow = collect(broadcaster.subscribe(), delay=0.01)
+    fast_items, slow_items = await asyncio.gather(fast, slow)
+
+    assert fast_items == list(range(20))
+    assert len(slow_items) < 20
+    assert broadcaster.dropped == 20 - len(slow_items)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_block_policy():
+    """Blocking delivers everything, pacing the upstream to the slowest."""
+    broadcaster = StreamBroadcaster(numbers(10), buffer_size=1, policy="block")
+    results = await asyncio.gather(
+        collect(broadcaster.subscribe()),
+        collect(broadcaster.subscribe(), delay=0.005),
+    )
+
+    assert results == [list(range(10))] * 2
+    assert broadcaster.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_broadcast_disconnect_policy():
+    broadcaster = StreamBroadcaster(numbers(20), buffer_size=2, policy="block")
+    fast = collect(broadcaster.subscribe())
+    slow = collect(broadcaster.subscribe(policy="disconnect"), delay=0.01)
+    fast_items, slow_result = await asyncio.gather(fast, slow, return_exceptions=True)
+
+    assert fast_items == list(range(20))
+    assert isinstance(slow_result, SlowConsumerError)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_abandoned_subscriber_releases_upstream():
+    broadcaster = StreamBroadcaster(numbers(10), buffer_size=1, policy="block")
+    quitter = broadcaster.subscribe()
+    stayer = collect(broadcaster.subscribe())
+
+    await quitter.__anext__()
+    await quitter.aclose()
+
+    assert await asyncio.wait_for(stayer, 1) == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_broadcast_upstream_error():
+    """Each subscriber gets the items before the error, then the error."""
+    broadcaster = StreamBroadcaster(numbers(3, fail=True))
+    subscriptions = [broadcaster.subscribe() for _ in range(2)]
+
+    for subscription in subscriptions:
+        items = []
+        with pytest.raises(ProviderError):
+            async for item in subscription:
+                items.append(item)
+        assert items == [0, 1, 2]
@@ -197,3 +197,89 @@ def test_client_mock_streaming():
     assert len(chunks) == 2
     assert chunks[0] == "Hello"  # stream yield strings, not objects
     assert chunks[1] == " World"
+
+
+class CountingStreamTransport:
+    """OpenAI-style text stream that records how much was read and closing."""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.sent = 0
+        self.closed = False
+
+    def stream(self, endpoint, data):
+        import json
+
+        try:
+            for text in self.texts:
+                self.sent += 1
+                event = {"choices": [{"delta": {"content": text}}]}
+                yield {"raw": f"data: {json.dumps(event)}"}
+        finally:
+            self.closed = True
+
+    async def stream_async(self, endpoint, data):
+        gen = self.stream(endpoint, data)
+        try:
+            for chunk in gen:
+                yield chunk
+        finally:
+            gen.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_async_closes_upstream_when_consumer_stops():
+    import contextlib
+
+    client = Client(openai_api_key="sk-test")
+    model = client.chat("gpt-4o")
+    model.transport = CountingStreamTransport(["a", "b", "c", "d"])
+
+    async with contextlib.aclosing(model.stream_async("prompt")) as stream:
+        async for text in stream:
+            break
+
+    assert text == "a"
+    assert model.transport.closed
+    assert model.transport.sent == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_stop_when_regex_cancels_upstream():
+    client = Client(openai_api_key="sk-test")
+    model = client.chat("gpt-4o")
+    model.transport = CountingStreamTransport(
+        ["Answer: 4", "2\n", "Explanation", "..."]
+    )
+
+    texts = [t async for t in model.stream_async("prompt", stop_when=r"\d+\n")]
+
+    # The match spans two chunks; the one completing it is the last
+    assert texts == ["Answer: 4", "2\n"]
+    assert model.transport.closed
+    assert model.transport.sent == 2
+
+
+def test_stream_stop_when_callable():
+    client = Client(openai_api_key="sk-test")
+    model = client.chat("gpt-4o")
+    model.transport = CountingStreamTransport(["one ", "two ", "three ", "four"])
+
+    texts = list(model.stream("prompt", stop_when=lambda text: len(text) > 6))
+
+    assert texts == ["one ", "two "]
+    assert model.transport.closed
+
+
+def test_stop_condition_regex_keeps_bounded_tail():
+    from aiclient.models.streaming import StopCondition
+
+    stop = StopCondition(r"^x|\bEND\b", lookback=8)
+    for _ in range(1000):
+        assert not stop.feed("filler ")
+    # Only the searched window plus one character is kept
+    assert len(stop._text) == 9
+    # `^` still only matches at the real start, `\b` sees the kept character
+    assert not stop.feed("x")
+    assert not stop.feed("xEND")
+    assert stop.feed(" END")
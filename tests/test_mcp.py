@@ -1,3 +1,5 @@
+import asyncio
+import time
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -43,3 +45,289 @@ async def test_server_manager():
     client = await manager.get_client("test")
     assert isinstance(client, MCPClient)
     assert client.params.command == "echo"
+
+
+class FakeTool:
+    def __init__(self, name):
+        self.name = name
+        self.description = name
+        self.inputSchema = {"type": "object", "properties": {}}
+
+
+def _manager_with_fake_server(tools, **kwargs):
+    manager = MCPServerManager(**kwargs)
+    manager.add_server("fake", "echo", [])
+    client = manager._clients["fake"]
+    client.list_tools = AsyncMock(return_value=tools)
+    return manager, client
+
+
+@pytest.mark.asyncio
+async def test_manager_caches_tool_discovery():
+    manager, client = _manager_with_fake_server([FakeTool("a")])
+
+    first = await manager.list_global_tools()
+    second = await manager.list_global_tools()
+
+    assert second is first
+    assert client.list_tools.await_count == 1
+    assert manager._tool_server_map == {"a": "fake"}
+
+    # list_changed notification invalidates the server's cached tools
+    from mcp.types import ToolListChangedNotification
+
+    client.list_tools.return_value = [FakeTool("a"), FakeTool("b")]
+    await client._handle_message(ToolListChangedNotification())
+    tools = await manager.list_global_tools()
+
+    assert [t.name for t in tools] == ["a", "b"]
+    assert client.list_tools.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_manager_tools_ttl_expires():
+    manager, client = _manager_with_fake_server([FakeTool("a")], tools_ttl=0)
+
+    await manager.list_global_tools()
+    await manager.list_global_tools()
+
+    assert client.list_tools.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_agent_builds_mcp_tools_once():
+    from aiclient import Agent
+    from aiclient.data_types import ModelResponse
+
+    model = AsyncMock()
+    model.generate_async.return_value = ModelResponse(text="Done", raw={})
+    agent = Agent(model=model, mcp_servers={"fake": {"command": "echo"}})
+    manager = agent.mcp_manager
+    manager._clients["fake"].list_tools = AsyncMock(return_value=[FakeTool("a")])
+    manager._is_active = True
+
+    await agent.run_async("one")
+    tool = agent._tool_map["a"]
+    await agent.run_async("two")
+
+    assert agent._tool_map["a"] is tool
+    assert [t.name for t in agent.tools] == ["a"]
+
+
+class SlowClient:
+    """Stands in for an MCPClient whose server takes `delay` seconds to boot."""
+
+    def __init__(self, delay, tools=(), fail=False):
+        self.delay = delay
+        self.tools = list(tools)
+        self.fail = fail
+        self.started = False
+        self.calls = 0
+
+    async def __aenter__(self):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise OSError("boom")
+        self.started = True
+        return self
+
+    async def __aexit__(self, *exc):
+        self.started = False
+
+    async def list_tools(self):
+        return self.tools
+
+    async def call_tool(self, name, arguments):
+        self.calls += 1
+        await asyncio.sleep(arguments.get("delay", 0))
+        return f"{name} ran"
+
+
+def _install(manager, name, *clients):
+    manager._pools[name] = list(clients)
+    manager._clients[name] = clients[0]
+    return clients[0]
+
+
+@pytest.mark.asyncio
+async def test_manager_starts_servers_concurrently_and_tolerates_failures():
+    manager = MCPServerManager(startup_timeout=0.5)
+    for name in ("a", "b", "broken", "hung"):
+        manager.add_server(name, "echo", [])
+    _install(manager, "a", SlowClient(0.2, [FakeTool("ta")]))
+    _install(manager, "b", SlowClient(0.2, [FakeTool("tb")]))
+    _install(manager, "broken", SlowClient(0.1, fail=True))
+    _install(manager, "hung", SlowClient(10))
+
+    start = time.perf_counter()
+    async with manager:
+        assert time.perf_counter() - start < 0.9
+        assert set(manager.failed_servers) == {"broken", "hung"}
+
+        tools = await manager.list_global_tools()
+        assert [t.name for t in tools] == ["ta", "tb"]
+        assert await manager.call_tool("tb", {}) == "tb ran"
+
+    assert not manager._clients["a"].started
+
+
+@pytest.mark.asyncio
+async def test_startup_timeout_fails_all_waiters_together():
+    manager = MCPServerManager()
+    manager.add_server("hung", "echo", [], lazy=True, timeout=0.3)
+    _install(manager, "hung", SlowClient(10))
+
+    async def late_connect():
+        await asyncio.sleep(0.2)
+        await manager.connect("hung")
+
+    async with manager:
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            manager.connect("hung"), late_connect(), return_exceptions=True
+        )
+        # The late caller fails with the first, not after its own timeout
+        assert time.perf_counter() - start < 0.45
+        assert all(isinstance(r, TimeoutError) for r in results)
+        assert "hung" in manager.failed_servers
+
+
+@pytest.mark.asyncio
+async def test_lazy_server_starts_on_first_tool_call():
+    manager = MCPServerManager()
+    manager.add_server(
+        "lazy",
+        "echo",
+        [],
+        lazy=True,
+        tools=[{"name": "search", "inputSchema": {"type": "object"}}],
+    )
+    client = _install(manager, "lazy", SlowClient(0))
+
+    async with manager:
+        tools = await manager.list_global_tools()
+        assert [t.name for t in tools] == ["search"]
+        assert not client.started
+
+        assert await manager.call_tool("search", {}) == "search ran"
+        assert client.started
+
+
+@pytest.mark.asyncio
+async def test_manager_routes_by_index_and_balances_pool():
+    manager = MCPServerManager()
+    manager.add_server("search", "echo", [], pool_size=3)
+    manager.add_server("other", "echo", [])
+    pool = [SlowClient(0, [FakeTool("find")]) for _ in range(3)]
+    _install(manager, "search", *pool)
+    other = _install(manager, "other", SlowClient(0, [FakeTool("noop")]))
+    other.list_tools = AsyncMock(return_value=other.tools)
+
+    async with manager:
+        # First call builds the index; later misses don't re-list servers
+        await asyncio.gather(
+            *(manager.call_tool("find", {"delay": 0.1}) for _ in range(3))
+        )
+        with pytest.raises(ValueError, match="not found"):
+            await manager.call_tool("missing", {})
+
+    assert [c.calls for c in pool] == [1, 1, 1]
+    assert other.list_tools.await_count == 1
+
+
+@pytest.fixture(scope="module")
+def http_mcp_server():
+    """A real MCP server on a local port, served from a background thread."""
+    import socket
+    import threading
+
+    uvicorn = pytest.importorskip("uvicorn")
+    try:
+        from mcp.server import MCPServer
+    except ImportError:
+        from mcp.server.fastmcp import FastMCP as MCPServer
+
+    server = MCPServer("demo")
+
+    @server.tool()
+    def add(a: int, b: int) -> int:
+        """Add two numbers."""
+        return a + b
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(
+        server.streamable_http_app(), host="127.0.0.1", port=port, log_level="error"
+    )
+    http_server = uvicorn.Server(config)
+    thread = threading.Thread(target=http_server.run, daemon=True)
+    thread.start()
+    while not http_server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/mcp"
+    http_server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_agent_uses_remote_mcp_server_over_http(http_mcp_server, monkeypatch):
+    from aiclient import Agent
+    from aiclient.data_types import ModelResponse, ToolCall
+    from aiclient.mcp import client as mcp_client
+
+    created = []
+    factory = mcp_client._create_http_client
+    monkeypatch.setattr(
+        mcp_client,
+        "_create_http_client",
+        lambda headers: created.append(factory(headers)) or created[-1],
+    )
+
+    model = AsyncMock()
+    model.generate_async.side_effect = [
+        ModelResponse(
+            text="",
+            raw={},
+            tool_calls=[ToolCall(id="1", name="add", arguments={"a": 2, "b": 3})],
+        ),
+        ModelResponse(text="5", raw={}),
+    ]
+    config = {"remote": {"url": http_mcp_server}}
+    first = Agent(model=model, mcp_servers=config)
+    second = Agent(model=model, mcp_servers=config)
+
+    async with first, second:
+        assert first.mcp_manager._clients["remote"].transport == "streamable_http"
+        assert await first.run_async("2 + 3?") == "5"
+        tools = await second.mcp_manager.list_global_tools()
+        assert [t.name for t in tools] == ["add"]
+
+    tool_messages = [m for m in first.memory.get_messages() if m.role == "tool"]
+    assert "5" in tool_messages[0].content
+    # Both agents' sessions went through one pooled HTTP client, closed after
+    assert len(created) == 1
+    assert created[0].is_closed
+
+
+@pytest.mark.asyncio
+async def test_shared_http_client_closes_after_last_session(monkeypatch):
+    from aiclient.mcp import client as mcp_client
+
+    class FakeHTTPClient:
+        is_closed = False
+
+        async def aclose(self):
+            self.is_closed = True
+
+    monkeypatch.setattr(mcp_client, "_create_http_client", lambda h: FakeHTTPClient())
+
+    async with mcp_client.shared_http_client({"a": "1"}) as first:
+        async with mcp_client.shared_http_client({"a": "1"}) as second:
+            assert second is first
+        assert not first.is_closed
+    assert first.is_closed
+
+    async with mcp_client.shared_http_client({"a": "1"}) as third:
+        assert third is not first
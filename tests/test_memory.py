@@ -63,3 +63,66 @@ def test_memory_serialization():
     mem2.load(data)
     assert len(mem2.get_messages()) == 1
     assert mem2.get_messages()[0].content == "Save me"
+
+
+def test_memory_view_is_stable_snapshot():
+    """Views share storage but keep their length as new messages arrive."""
+    mem = ConversationMemory()
+    mem.add_message(UserMessage(content="1"))
+    view = mem.get_view()
+
+    mem.add_message(AssistantMessage(content="2"))
+
+    assert len(view) == 1
+    assert [m.content for m in view] == ["1"]
+    assert len(mem.get_view()) == 2
+    assert mem.get_view()[-1].content == "2"
+
+
+def test_memory_messages_since():
+    """Only messages added after a view's version are returned."""
+    mem = ConversationMemory()
+    mem.add_message(UserMessage(content="1"))
+    version = mem.get_view().version
+
+    mem.add_message(AssistantMessage(content="2"))
+    mem.add_message(UserMessage(content="3"))
+
+    assert [m.content for m in mem.messages_since(version)] == ["2", "3"]
+    assert mem.messages_since(mem.version) == []
+
+
+def test_sliding_window_view_survives_truncation():
+    """Truncation replaces the list, leaving old views untouched."""
+    mem = SlidingWindowMemory(max_messages=2)
+    mem.add_message(UserMessage(content="1"))
+    mem.add_message(AssistantMessage(content="2"))
+    view = mem.get_view()
+
+    mem.add_message(UserMessage(content="3"))
+
+    assert [m.content for m in view] == ["1", "2"]
+    assert [m.content for m in mem.get_view()] == ["2", "3"]
+
+
+def test_sliding_window_messages_since_skips_preserved_system():
+    """Preserved system messages are not reported as new."""
+    mem = SlidingWindowMemory(max_messages=3)
+    mem.add_message(SystemMessage(content="sys"))
+    mem.add_message(UserMessage(content="1"))
+    version = mem.version
+
+    mem.add_message(AssistantMessage(content="2"))
+    mem.add_message(UserMessage(content="3"))
+
+    assert [m.content for m in mem.get_view()] == ["sys", "2", "3"]
+    assert [m.content for m in mem.messages_since(version)] == ["2", "3"]
+
+
+def test_memory_view_concatenates_to_list():
+    mem = ConversationMemory()
+    mem.add_message(UserMessage(content="1"))
+    extended = mem.get_view() + [UserMessage(content="2")]
+
+    assert isinstance(extended, list)
+    assert [m.content for m in extended] == ["1", "2"]
@@ -3,14 +3,16 @@ Integration tests for middleware functionality.
 Tests error hooks, cost tracking, and middleware chain.
 """
 
+import asyncio
+import time
 from unittest.mock import MagicMock
 
 import pytest
 
 from aiclient.data_types import ModelResponse, Usage
-from aiclient.middleware import CostTrackingMiddleware
+from aiclient.middleware import CostTrackingMiddleware, Middleware
 from aiclient.models.chat import ChatModel
-from aiclient.resilience import CircuitBreaker, RateLimiter
+from aiclient.resilience import CircuitBreaker, RateLimiter, RetryMiddleware
 from aiclient.transport.base import Transport
 
 
@@ -272,3 +274,413 @@ def test_multiple_middleware_cooperation():
 #     # Should have called on_error for async failures too
 #     assert len(error_tracker.errors) == 2
 #     assert response.text == "Success"
+
+
+class SSETransport(Transport):
+    """Streams fixed server-sent events."""
+
+    def __init__(self, events):
+        self.events = events
+        self.sent = []
+
+    def send(self, endpoint, data):
+        raise NotImplementedError
+
+    async def send_async(self, endpoint, data):
+        raise NotImplementedError
+
+    def stream(self, endpoint, data):
+        import json
+
+        self.sent.append(data)
+        for event in self.events:
+            yield {"raw": "data: " + json.dumps(event)}
+
+    async def stream_async(self, endpoint, data):
+        for chunk in self.stream(endpoint, data):
+            yield chunk
+
+
+class StreamRecorder:
+    def __init__(self):
+        self.chunks = []
+        self.ended = []
+
+    def before_request(self, model, prompt):
+        return prompt
+
+    def on_chunk(self, chunk):
+        self.chunks.append(chunk.text)
+
+    def on_stream_end(self, response, usage):
+        self.ended.append((response, usage))
+
+
+def test_stream_middleware_hooks_and_openai_usage():
+    """Streams run on_chunk per chunk, then on_stream_end / after_response."""
+    from aiclient.providers.openai import OpenAIProvider
+
+    transport = SSETransport(
+        [
+            {"choices": [{"delta": {"content": "Hello"}}]},
+            {"choices": [{"delta": {"content": " world"}, "finish_reason": "stop"}]},
+            {
+                "choices": [],
+                "usage": {
+                    "prompt_tokens": 1000,
+                    "completion_tokens": 500,
+                    "total_tokens": 1500,
+                },
+            },
+        ]
+    )
+    recorder = StreamRecorder()
+    cost = CostTrackingMiddleware()
+    model = ChatModel(
+        "gpt-4o",
+        OpenAIProvider(api_key="test"),
+        transport,
+        middlewares=[recorder, cost],
+    )
+
+    assert "".join(model.stream("Hi")) == "Hello world"
+
+    assert transport.sent[0]["stream_options"] == {"include_usage": True}
+    assert recorder.chunks == ["Hello", " world", ""]
+    [(response, usage)] = recorder.ended
+    assert response.text == "Hello world"
+    assert response.provider == "openai"
+    assert (usage.input_tokens, usage.output_tokens) == (1000, 500)
+    # Middleware without stream hooks sees the aggregated response
+    assert cost.total_input_tokens == 1000
+    assert cost.total_cost_usd == pytest.approx(0.0075)
+
+
+@pytest.mark.asyncio
+async def test_stream_async_merges_anthropic_usage_events():
+    from aiclient.providers.anthropic import AnthropicProvider
+
+    transport = SSETransport(
+        [
+            {
+                "type": "message_start",
+                "message": {"usage": {"input_tokens": 12, "output_tokens": 1}},
+            },
+            {
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": "Hi"},
+            },
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn"},
+                "usage": {"output_tokens": 7},
+            },
+        ]
+    )
+    recorder = StreamRecorder()
+    model = ChatModel(
+        "claude-3-5-haiku",
+        AnthropicProvider(api_key="test"),
+        transport,
+        middlewares=[recorder],
+    )
+
+    assert [text async for text in model.stream_async("Hi")] == ["Hi"]
+
+    [(response, usage)] = recorder.ended
+    assert response.raw["finish_reason"] == "end_turn"
+    assert (usage.input_tokens, usage.output_tokens, usage.total_tokens) == (12, 7, 19)
+
+
+@pytest.mark.asyncio
+async def test_async_on_chunk_is_awaited():
+    from aiclient.providers.openai import OpenAIProvider
+
+    class AsyncRecorder:
+        def __init__(self):
+            self.chunks = []
+
+        async def on_chunk(self, chunk):
+            await asyncio.sleep(0)
+            self.chunks.append(chunk.text)
+
+    def make_model(recorder):
+        transport = SSETransport(
+            [
+                {"choices": [{"delta": {"content": "Hello"}}]},
+                {"choices": [{"delta": {"content": " world"}}]},
+            ]
+        )
+        return ChatModel(
+            "gpt-4o",
+            OpenAIProvider(api_key="test"),
+            transport,
+            middlewares=[recorder],
+        )
+
+    recorder = AsyncRecorder()
+    text = [t async for t in make_model(recorder).stream_async("Hi")]
+
+    assert text == ["Hello", " world"]
+    assert recorder.chunks == ["Hello", " world"]
+    # An async-only hook cannot run on the sync path
+    with pytest.raises(TypeError, match="async"):
+        list(make_model(AsyncRecorder()).stream("Hi"))
+
+
+def test_stream_metrics_reach_sink_and_aggregated_response():
+    import time
+
+    from aiclient.providers.openai import OpenAIProvider
+
+    class SlowSSETransport(SSETransport):
+        def stream(self, endpoint, data):
+            connected_at = time.perf_counter()
+            time.sleep(0.05)  # server "thinking" before the first token
+            for chunk in super().stream(endpoint, data):
+                time.sleep(0.01)
+                yield {**chunk, "connected_at": connected_at}
+
+    transport = SlowSSETransport(
+        [{"choices": [{"delta": {"content": word}}]} for word in "abcd"]
+        + [
+            {
+                "choices": [],
+                "usage": {
+                    "prompt_tokens": 3,
+                    "completion_tokens": 8,
+                    "total_tokens": 11,
+                },
+            }
+        ]
+    )
+    recorder = StreamRecorder()
+    sink = []
+    model = ChatModel(
+        "gpt-4o",
+        OpenAIProvider(api_key="test"),
+        transport,
+        middlewares=[recorder],
+        metrics_sink=sink.append,
+    )
+
+    assert "".join(model.stream("Hi")) == "abcd"
+
+    [metrics] = sink
+    assert recorder.ended[0][0].metrics is metrics
+    assert metrics.model == "gpt-4o"
+    assert metrics.connect_time < metrics.time_to_first_token
+    assert metrics.time_to_first_token >= 0.05
+    assert metrics.chunks == 4
+    assert 0.005 < metrics.inter_chunk_p50 <= metrics.inter_chunk_max
+    assert metrics.output_tokens == 8
+    assert metrics.tokens_per_second > 0
+    assert metrics.total_time >= metrics.time_to_first_token
+
+
+def _mock_model(middlewares):
+    provider = MagicMock()
+    provider.prepare_request.return_value = ("url", {})
+    provider.parse_response.return_value = ModelResponse(text="OK", raw={})
+    return ChatModel(
+        "test-model",
+        provider,
+        MockFailingTransport(fail_count=0),
+        middlewares=middlewares,
+        max_retries=0,
+    )
+
+
+def test_pipeline_compiled_once_and_skips_noop_hooks():
+    class OnlyBefore(Middleware):
+        """Overrides one hook; the others are protocol stubs."""
+
+        def before_request(self, model, prompt):
+            return prompt
+
+    middlewares = [OnlyBefore(), RetryMiddleware(), RateLimiter(1000)]
+    model = _mock_model(middlewares)
+
+    pipeline = model.pipeline
+    assert model.pipeline is pipeline
+    # Protocol stubs and passthrough hooks are left out
+    assert len(pipeline._before_request.sync) == 2
+    assert pipeline._after_response.sync == []
+    assert len(pipeline._on_error.sync) == 1
+    assert model.generate("hi").text == "OK"
+
+    # Middleware added to the shared list afterwards is picked up
+    tracker = ErrorTrackingMiddleware()
+    middlewares.append(tracker)
+    assert model.pipeline is not pipeline
+    assert len(model.pipeline._after_response.sync) == 1
+
+    # So is middleware replaced in place, with the length unchanged
+    pipeline = model.pipeline
+    middlewares[-1] = OnlyBefore()
+    assert model.pipeline is not pipeline
+    assert model.pipeline._after_response.sync == []
+    assert len(model.pipeline._before_request.sync) == 3
+
+
+@pytest.mark.asyncio
+async def test_async_before_request_and_after_response():
+    class AsyncMiddleware:
+        async def before_request(self, model, prompt):
+            await asyncio.sleep(0)
+            prompt[-1].content += "!"
+            return prompt
+
+        async def after_response(self, response):
+            await asyncio.sleep(0)
+            response.text += " (checked)"
+            return response
+
+    model = _mock_model([AsyncMiddleware()])
+
+    response = await model.generate_async("hi")
+
+    assert response.text == "OK (checked)"
+    messages = model.provider.prepare_request.call_args.args[1]
+    assert messages[-1].content == "hi!"
+    # An async-only hook cannot run on the sync path
+    with pytest.raises(TypeError, match="async"):
+        model.generate("hi")
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_waits_without_blocking_loop():
+    limiter = RateLimiter(requests_per_minute=1)
+    limiter.window = 0.1
+    model = _mock_model([limiter])
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    start = time.monotonic()
+    await asyncio.gather(model.generate_async("a"), model.generate_async("b"), ticker())
+
+    assert time.monotonic() - start >= 0.09
+    # The loop kept running while the second request waited
+    assert len(ticks) == 5 and ticks[-1] - start < 0.09
+
+
+class ContextTransport(MockFailingTransport):
+    """Fails once, then succeeds; records the contexts it was given."""
+
+    def __init__(self):
+        super().__init__(fail_count=1)
+        self.contexts = []
+
+    def send(self, endpoint, data, context=None):
+        self.contexts.append(context)
+        return super().send(endpoint, data)
+
+
+def test_request_context_reaches_hooks_and_transport():
+    class ContextRecorder:
+        def __init__(self):
+            self.seen = []
+
+        def before_request(self, model, prompt, context):
+            context.scratch["started"] = True
+            self.seen.append(("before", context))
+            return prompt
+
+        def after_response(self, response, context):
+            assert context.scratch["started"]
+            self.seen.append(("after", context))
+            return response
+
+        def on_error(self, error, model, context=None, **kwargs):
+            self.seen.append(("error", context.attempt))
+
+    recorder = ContextRecorder()
+    legacy = ErrorTrackingMiddleware()
+    transport = ContextTransport()
+    provider = MagicMock()
+    provider.prepare_request.return_value = ("url", {})
+    provider.parse_response.return_value = ModelResponse(text="OK", raw={})
+    model = ChatModel(
+        "test-model",
+        provider,
+        transport,
+        middlewares=[recorder, legacy],
+        max_retries=1,
+        retry_delay=0,
+    )
+
+    model.generate("Hello there, how are you?", max_tokens=64)
+
+    (_, context), error, (_, after) = recorder.seen
+    assert error == ("error", 0)
+    assert after is context
+    assert context.model == "test-model"
+    assert len(context.request_id) == 32
+    assert context.attempt == 1
+    assert context.input_tokens_estimate > 0
+    assert context.max_output_tokens == 64
+    assert context.finished is not None and context.elapsed >= 0
+    assert transport.contexts == [context, context]
+    # Hooks without a context parameter are called as before
+    assert len(legacy.errors) == 1
+
+
+@pytest.mark.asyncio
+async def test_request_context_isolates_concurrent_requests():
+    class Timed:
+        def __init__(self):
+            self.ids = []
+
+        async def before_request(self, model, prompt, context):
+            context.scratch["prompt"] = prompt[-1].content
+            await asyncio.sleep(0.02 if context.scratch["prompt"] == "slow" else 0)
+            return prompt
+
+        def after_response(self, response, context):
+            self.ids.append((context.scratch["prompt"], context.request_id))
+            return response
+
+    timed = Timed()
+    model = _mock_model([timed, CostTrackingMiddleware()])
+
+    await asyncio.gather(model.generate_async("slow"), model.generate_async("fast"))
+
+    assert [prompt for prompt, _ in timed.ids] == ["fast", "slow"]
+    assert len({request_id for _, request_id in timed.ids}) == 2
+
+
+def test_stream_hooks_get_request_context():
+    from aiclient.providers.openai import OpenAIProvider
+
+    class StreamContext:
+        def __init__(self):
+            self.chunk_contexts = []
+            self.end_context = None
+
+        def on_chunk(self, chunk, context):
+            self.chunk_contexts.append(context)
+
+        def on_stream_end(self, response, usage, context):
+            self.end_context = context
+
+    recorder = StreamContext()
+    transport = SSETransport(
+        [
+            {"choices": [{"delta": {"content": "Hel"}}]},
+            {"choices": [{"delta": {"content": "lo"}}]},
+        ]
+    )
+    model = ChatModel(
+        "gpt-4o", OpenAIProvider(api_key="test"), transport, middlewares=[recorder]
+    )
+
+    assert "".join(model.stream("Hi")) == "Hello"
+    context = recorder.end_context
+    assert context.stream and context.provider == "openai"
+    assert recorder.chunk_contexts == [context, context]
+    assert context.first_byte is not None
@@ -1,5 +1,6 @@
 import logging
 
+from aiclient.context import RequestContext
 from aiclient.data_types import ModelResponse, Usage, UserMessage
 from aiclient.observability import TracingMiddleware
 
@@ -25,3 +26,18 @@ def test_tracing_middleware(caplog):
 
     assert "Response from test" in caplog.text
     assert "Tokens: 10" in caplog.text
+
+
+def test_tracing_middleware_logs_request_id(caplog):
+    caplog.set_level(logging.INFO)
+
+    middleware = TracingMiddleware()
+    context = RequestContext(model="model")
+
+    middleware.before_request("model", "Hello", context=context)
+    middleware.on_error(ValueError("boom"), "model", attempt=0, context=context)
+    middleware.after_response(ModelResponse(text="Hi", raw={}), context=context)
+
+    lines = [r.getMessage() for r in caplog.records]
+    assert len(lines) == 3
+    assert all(line.startswith(f"Trace[{context.request_id}]") for line in lines)
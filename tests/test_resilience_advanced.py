@@ -1,5 +1,7 @@
 from unittest.mock import MagicMock
 
+import pytest
+
 from aiclient.data_types import ModelResponse
 from aiclient.resilience import FallbackChain, LoadBalancer
 
@@ -82,3 +84,146 @@ def test_load_balancer_round_robin():
     # 3rd call -> m1
     lb.generate("test")
     assert client.chat_mock.call_args[0][0] == "m1"
+
+
+class StallingTransport:
+    """Streams the given OpenAI text chunks, then hangs until cancelled."""
+
+    def __init__(self, texts, stall=True):
+        self.texts = texts
+        self.stall = stall
+        self.closed = False
+        self.calls = 0
+
+    async def stream_async(self, endpoint, data):
+        self.calls += 1
+        import asyncio
+        import json
+
+        try:
+            for text in self.texts:
+                event = {"choices": [{"delta": {"content": text}}]}
+                yield {"raw": "data: " + json.dumps(event)}
+            if self.stall:
+                await asyncio.sleep(3600)
+        finally:
+            self.closed = True
+
+
+def _streaming_model(transport, max_retries=0, **timeouts):
+    from aiclient.models.chat import ChatModel
+    from aiclient.providers.openai import OpenAIProvider
+    from aiclient.transport.base import StreamTimeouts
+
+    return ChatModel(
+        "gpt-4o",
+        OpenAIProvider(api_key="k"),
+        transport,
+        max_retries=max_retries,
+        stream_timeouts=StreamTimeouts(**timeouts),
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_idle_timeout_cancels_stalled_stream():
+    from aiclient.exceptions import StreamTimeoutError
+
+    transport = StallingTransport(["Hel", "lo"])
+    model = _streaming_model(transport, first_byte=1.0, idle=0.05)
+
+    received = []
+    with pytest.raises(StreamTimeoutError, match="no chunk within 0.05s"):
+        async for text in model.stream_async("hi"):
+            received.append(text)
+
+    assert received == ["Hel", "lo"]
+    assert transport.closed
+
+
+@pytest.mark.asyncio
+async def test_fallback_chain_fails_over_when_first_byte_times_out():
+    stalled = StallingTransport([])
+    healthy = StallingTransport(["from m2"], stall=False)
+    models = {
+        "m1": _streaming_model(stalled, first_byte=0.05),
+        "m2": _streaming_model(healthy, first_byte=0.05),
+    }
+    client = MockClient()
+    client.chat_mock.side_effect = models.get
+
+    chain = FallbackChain(client, ["m1", "m2"])
+    received = [text async for text in chain.stream_async("test")]
+
+    assert received == ["from m2"]
+    assert stalled.closed
+
+
+@pytest.mark.asyncio
+async def test_fallback_chain_does_not_retry_stalled_model_with_default_retries():
+    import time
+
+    stalled = StallingTransport([])
+    healthy = StallingTransport(["from m2"], stall=False)
+    # Default max_retries=3 / retry_delay=1: retrying the stall would take 7s+
+    models = {
+        "m1": _streaming_model(stalled, max_retries=3, first_byte=0.05),
+        "m2": _streaming_model(healthy, max_retries=3, first_byte=0.05),
+    }
+    client = MockClient()
+    client.chat_mock.side_effect = models.get
+
+    start = time.monotonic()
+    received = [
+        text async for text in FallbackChain(client, ["m1", "m2"]).stream_async("test")
+    ]
+
+    assert received == ["from m2"]
+    assert stalled.calls == 1
+    assert time.monotonic() - start < 1.0
+
+
+@pytest.mark.asyncio
+async def test_fallback_chain_closes_model_stream_when_consumer_stops():
+    import contextlib
+
+    transport = StallingTransport(["Hel", "lo"])
+    client = MockClient()
+    client.chat_mock.return_value = _streaming_model(transport)
+
+    stream = FallbackChain(client, ["m1"]).stream_async("test")
+    async with contextlib.aclosing(stream):
+        async for text in stream:
+            break
+
+    assert text == "Hel"
+    assert transport.closed
+
+
+@pytest.mark.asyncio
+async def test_stalled_stream_is_retried_on_same_model_by_default():
+    from aiclient.exceptions import StreamTimeoutError
+
+    stalled = StallingTransport([])
+    model = _streaming_model(stalled, max_retries=1, first_byte=0.05)
+    model.retry_delay = 0
+
+    with pytest.raises(StreamTimeoutError):
+        async for _ in model.stream_async("hi"):
+            pass
+
+    assert stalled.calls == 2
+
+
+def test_http_transport_applies_stream_timeouts():
+    from aiclient.transport.base import StreamTimeouts
+    from aiclient.transport.http import HTTPTransport
+
+    transport = HTTPTransport(
+        timeout=60.0, stream_timeouts=StreamTimeouts(connect=2, first_byte=10, idle=5)
+    )
+    kwargs = transport._stream_kwargs({"model": "m"})
+
+    assert kwargs["timeout"].connect == 2
+    # httpx has one read timeout, so it must allow the first byte to arrive
+    assert kwargs["timeout"].read == 10
+    assert "timeout" not in HTTPTransport()._stream_kwargs({"model": "m"})
@@ -93,3 +93,188 @@ def test_retry_fail_max():
         model.generate("hello")
 
     assert transport.call_count == 3  # Initial + 2 retries
+
+
+class FlakyStreamTransport(Transport):
+    """Streams one scripted attempt per request; an Exception item is raised."""
+
+    def __init__(self, attempts):
+        self.attempts = attempts
+        self.requests = []
+
+    def send(self, endpoint, data):
+        raise NotImplementedError
+
+    async def send_async(self, endpoint, data):
+        raise NotImplementedError
+
+    def stream(self, endpoint, data):
+        import json
+
+        self.requests.append(data)
+        for item in self.attempts.pop(0):
+            if isinstance(item, Exception):
+                raise item
+            yield {"raw": "data: " + json.dumps(item)}
+
+    async def stream_async(self, endpoint, data):
+        for chunk in self.stream(endpoint, data):
+            yield chunk
+
+
+def _anthropic_text(text):
+    return {
+        "type": "content_block_delta",
+        "index": 0,
+        "delta": {"type": "text_delta", "text": text},
+    }
+
+
+def test_stream_retries_until_first_chunk():
+    from aiclient.exceptions import ProviderError, RateLimitError
+    from aiclient.providers.openai import OpenAIProvider
+
+    transport = FlakyStreamTransport(
+        [
+            [RateLimitError("slow down")],
+            [ProviderError("503")],
+            [{"choices": [{"delta": {"content": "ok"}}]}],
+        ]
+    )
+    model = ChatModel(
+        "gpt-4o", OpenAIProvider(api_key="k"), transport, retry_delay=0.001
+    )
+
+    assert list(model.stream("hi")) == ["ok"]
+    assert len(transport.requests) == 3
+
+
+def test_stream_error_after_first_chunk_is_raised_without_resume():
+    from aiclient.exceptions import NetworkError
+    from aiclient.providers.anthropic import AnthropicProvider
+
+    transport = FlakyStreamTransport(
+        [[_anthropic_text("Hello "), NetworkError("connection dropped")]]
+    )
+    model = ChatModel(
+        "claude-3-5-haiku", AnthropicProvider(api_key="k"), transport, retry_delay=0
+    )
+
+    received = []
+    with pytest.raises(NetworkError):
+        for text in model.stream("hi"):
+            received.append(text)
+    assert received == ["Hello "]
+
+
+@pytest.mark.asyncio
+async def test_stream_resumes_mid_stream_from_prefill():
+    from aiclient.exceptions import NetworkError
+    from aiclient.providers.anthropic import AnthropicProvider
+
+    transport = FlakyStreamTransport(
+        [
+            [_anthropic_text("Once upon "), NetworkError("connection dropped")],
+            # The model repeats the whitespace trimmed off the prefill
+            [_anthropic_text(" a time.")],
+        ]
+    )
+    model = ChatModel(
+        "claude-3-5-haiku",
+        AnthropicProvider(api_key="k"),
+        transport,
+        retry_delay=0.001,
+        resume_streams=True,
+    )
+
+    text = "".join([chunk async for chunk in model.stream_async("Tell a story")])
+
+    assert text == "Once upon a time."
+    resumed = transport.requests[1]["messages"]
+    assert resumed[-1]["role"] == "assistant"
+    assert resumed[-1]["content"][0]["text"] == "Once upon"
+
+
+def test_stream_retries_after_usage_only_chunk():
+    """Anthropic's message_start carries only usage: no content was yielded yet."""
+    from aiclient.exceptions import NetworkError
+    from aiclient.providers.anthropic import AnthropicProvider
+
+    message_start = {
+        "type": "message_start",
+        "message": {"usage": {"input_tokens": 12, "output_tokens": 1}},
+    }
+    transport = FlakyStreamTransport(
+        [
+            [message_start, NetworkError("connection dropped")],
+            [message_start, _anthropic_text("Hello")],
+        ]
+    )
+    model = ChatModel(
+        "claude-3-5-haiku", AnthropicProvider(api_key="k"), transport, retry_delay=0
+    )
+
+    assert list(model.stream("hi")) == ["Hello"]
+    assert len(transport.requests) == 2
+
+
+class ErrorTransport(Transport):
+    """Raises the scripted errors in turn, then succeeds."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.call_count = 0
+
+    def send(self, endpoint, data):
+        self.call_count += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"choices": [{"message": {"content": "Success"}}]}
+
+    async def send_async(self, endpoint, data):
+        return self.send(endpoint, data)
+
+    def stream(self, endpoint, data):
+        raise NotImplementedError
+
+    async def stream_async(self, endpoint, data):
+        raise NotImplementedError
+
+
+def _generate_model(transport):
+    provider = MagicMock()
+    provider.prepare_request.return_value = ("url", {})
+    provider.parse_response.return_value = ModelResponse(text="Success", raw={})
+    return ChatModel("gpt-test", provider, transport, max_retries=3, retry_delay=0)
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_generate_retries_mapped_transient_errors(mode):
+    """generate retries the errors HTTPTransport maps 429, 5xx and drops to."""
+    from aiclient.exceptions import NetworkError, ProviderError, RateLimitError
+
+    transport = ErrorTransport(
+        [RateLimitError("429"), ProviderError("503"), NetworkError("reset")]
+    )
+    model = _generate_model(transport)
+
+    if mode == "sync":
+        response = model.generate("hello")
+    else:
+        response = asyncio.run(model.generate_async("hello"))
+
+    assert response.text == "Success"
+    assert transport.call_count == 4
+
+
+@pytest.mark.parametrize("error_name", ["InvalidRequestError", "AuthenticationError"])
+def test_generate_async_does_not_retry_client_errors(error_name):
+    from aiclient import exceptions
+
+    error = getattr(exceptions, error_name)("bad")
+    transport = ErrorTransport([error])
+    model = _generate_model(transport)
+
+    with pytest.raises(type(error)):
+        asyncio.run(model.generate_async("hello"))
+    assert transport.call_count == 1
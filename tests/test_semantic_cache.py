@@ -1,6 +1,8 @@
+import threading
 from typing import List
 
 import numpy as np
+import pytest
 
 from aiclient.cache.semantic import InMemoryVectorStore, SemanticCacheMiddleware
 from aiclient.data_types import ModelResponse, Usage
@@ -68,3 +70,52 @@ def test_semantic_middleware_miss():
     # Now verify it's in store (MockEmbedder returns [0.0, 1.0] for "bye")
     assert len(mw.store.vectors) == 1
     assert np.array_equal(mw.store.vectors[0], np.array([0.0, 1.0]))
+
+
+@pytest.mark.asyncio
+async def test_semantic_middleware_async_embeds_off_loop():
+    class ThreadRecordingEmbedder(MockEmbedder):
+        def __init__(self):
+            self.threads = []
+
+        def embed(self, text: str) -> List[float]:
+            self.threads.append(threading.get_ident())
+            return super().embed(text)
+
+    embedder = ThreadRecordingEmbedder()
+    mw = SemanticCacheMiddleware(embedder, threshold=0.9)
+
+    assert await mw.before_request_async("model", "bye") == "bye"
+    await mw.after_response_async(ModelResponse(text="Bye Response", raw={}))
+    result = await mw.before_request_async("model", "bye")
+
+    assert isinstance(result, ModelResponse)
+    assert result.text == "Bye Response"
+    assert threading.get_ident() not in embedder.threads
+
+
+def test_semantic_cache_through_agent():
+    """Agent history (a memory view) reaches the cache as a message list."""
+    from aiclient.agent import Agent
+    from aiclient.models.chat import ChatModel
+    from aiclient.testing import MockProvider, MockTransport
+
+    class AppendingMiddleware:
+        def before_request(self, model, prompt):
+            assert isinstance(prompt, list)
+            return prompt + []
+
+    provider = MockProvider()
+    provider.add_response("Hi there")
+    cache = SemanticCacheMiddleware(MockEmbedder(), threshold=0.9)
+    model = ChatModel(
+        "mock-model",
+        provider,
+        MockTransport(),
+        middlewares=[AppendingMiddleware(), cache],
+    )
+    agent = Agent(model=model)
+
+    assert agent.run("hello") == "Hi there"
+    assert agent.run("hello again") == "Hi there"
+    assert len(provider.requests) == 1
@@ -0,0 +1,206 @@
+"""
+Tests for coalescing identical concurrent requests.
+"""
+
+import asyncio
+
+import pytest
+
+from aiclient import Client, MockProvider
+from aiclient.exceptions import InvalidRequestError
+from aiclient.models.chat import ChatModel
+from aiclient.models.singleflight import SingleFlight, request_key
+from aiclient.transport.encoding import Base64Payload
+
+
+class SlowTransport:
+    """Answers after a delay and counts upstream calls."""
+
+    def __init__(self, delay=0.05, texts=("Hello", " world")):
+        self.delay = delay
+        self.texts = texts
+        self.sends = 0
+        self.streams = 0
+
+    async def send_async(self, endpoint, data):
+        self.sends += 1
+        await asyncio.sleep(self.delay)
+        return {}
+
+    async def stream_async(self, endpoint, data):
+        self.streams += 1
+        for text in self.texts:
+            await asyncio.sleep(self.delay)
+            yield {"text": text}
+
+
+def _model(transport, provider=None):
+    return ChatModel(
+        "mock",
+        provider or MockProvider(),
+        transport,
+        retry_delay=0,
+        single_flight=SingleFlight(),
+    )
+
+
+def test_request_key_is_canonical():
+    a = request_key("/chat", {"model": "m", "messages": [{"role": "user"}]})
+    b = request_key("/chat", {"messages": [{"role": "user"}], "model": "m"})
+    assert a == b
+    assert a != request_key("/chat", {"model": "other", "messages": []})
+    image = {"data": Base64Payload(b"\x00\x01", "data:image/png;base64,")}
+    same = {"data": Base64Payload(bytearray(b"\x00\x01"), "data:image/png;base64,")}
+    assert request_key("/chat", image) == request_key("/chat", same)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_share_one_call():
+    transport = SlowTransport()
+    model = _model(transport)
+
+    responses = await asyncio.gather(*(model.generate_async("Hi") for _ in range(5)))
+
+    assert transport.sends == 1
+    assert model.single_flight.coalesced == 4
+    assert all(r.text == "Mock Response" for r in responses)
+    # Each caller has its own copy
+    assert len({id(r) for r in responses}) == 5
+    assert model.single_flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_different_or_sequential_requests_are_not_coalesced():
+    transport = SlowTransport()
+    model = _model(transport)
+
+    await asyncio.gather(model.generate_async("Hi"), model.generate_async("Bye"))
+    await model.generate_async("Hi")
+
+    assert transport.sends == 3
+    assert model.single_flight.coalesced == 0
+
+
+@pytest.mark.asyncio
+async def test_error_reaches_every_waiter():
+    provider = MockProvider()
+    provider.add_error(InvalidRequestError("bad request"))
+    model = _model(SlowTransport(), provider)
+
+    results = await asyncio.gather(
+        *(model.generate_async("Hi") for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(r, InvalidRequestError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_others():
+    transport = SlowTransport()
+    model = _model(transport)
+
+    leader = asyncio.ensure_future(model.generate_async("Hi"))
+    follower = asyncio.ensure_future(model.generate_async("Hi"))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert (await follower).text == "Mock Response"
+    assert transport.sends == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_streams_share_one_upstream():
+    transport = SlowTransport()
+    model = _model(transport)
+
+    async def read(delay):
+        await asyncio.sleep(delay)
+        return "".join([text async for text in model.stream_async("Hi")])
+
+    # The last caller joins mid-stream and gets the start replayed
+    results = await asyncio.gather(read(0), read(0), read(0.07))
+
+    assert results == ["Hello world"] * 3
+    assert transport.streams == 1
+    assert model.single_flight.coalesced == 2
+
+
+class SpanMiddleware:
+    """Opens a span per request in before_request, closes it after."""
+
+    def __init__(self):
+        self.opened = []
+        self.closed = []
+        self.failed = []
+        self.chunks = {}
+
+    def before_request(self, model, messages, context):
+        context.scratch["span"] = context.request_id
+        self.opened.append(context.request_id)
+        return messages
+
+    def on_chunk(self, chunk, context):
+        self.chunks[context.request_id] = self.chunks.get(context.request_id, 0) + 1
+
+    def after_response(self, response, context):
+        assert context.finished is not None and context.usage is response.usage
+        self.closed.append(context.scratch.pop("span"))
+        return response
+
+    def on_error(self, error, model, attempt, context):
+        self.failed.append(context.scratch.pop("span"))
+
+
+@pytest.mark.asyncio
+async def test_coalesced_generate_runs_after_response_per_caller():
+    model = _model(SlowTransport())
+    spans = SpanMiddleware()
+    model.middlewares = [spans]
+
+    await asyncio.gather(*(model.generate_async("Hi") for _ in range(3)))
+
+    assert model.single_flight.coalesced == 2
+    assert len(set(spans.opened)) == 3
+    assert sorted(spans.closed) == sorted(spans.opened)
+
+
+@pytest.mark.asyncio
+async def test_coalesced_stream_runs_hooks_per_caller():
+    transport = SlowTransport()
+    model = _model(transport)
+    spans = SpanMiddleware()
+    model.middlewares = [spans]
+
+    async def read():
+        return "".join([text async for text in model.stream_async("Hi")])
+
+    assert await asyncio.gather(read(), read()) == ["Hello world"] * 2
+
+    assert transport.streams == 1
+    assert sorted(spans.closed) == sorted(spans.opened)
+    assert spans.chunks == {request_id: 2 for request_id in spans.opened}
+
+
+@pytest.mark.asyncio
+async def test_coalesced_error_runs_on_error_per_caller():
+    class FailingTransport(SlowTransport):
+        async def send_async(self, endpoint, data):
+            await asyncio.sleep(self.delay)
+            raise InvalidRequestError("bad request")
+
+    model = _model(FailingTransport())
+    spans = SpanMiddleware()
+    model.middlewares = [spans]
+
+    results = await asyncio.gather(
+        *(model.generate_async("Hi") for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(r, InvalidRequestError) for r in results)
+    assert sorted(spans.failed) == sorted(spans.opened)
+
+
+def test_client_shares_single_flight_across_models():
+    client = Client(openai_api_key="sk-test", single_flight=True)
+    assert client.chat("gpt-4o").single_flight is client.chat("gpt-4o").single_flight
+    assert Client(openai_api_key="sk-test").chat("gpt-4o").single_flight is None
@@ -1,3 +1,4 @@
+import pytest
 from pydantic import BaseModel
 
 from aiclient.data_types import UserMessage
@@ -42,3 +43,190 @@ def test_openai_structured_output_payload_no_strict():
 
     assert "response_format" in data
     assert data["response_format"]["json_schema"]["strict"] is False
+
+
+def test_structured_output_spec_is_cached_per_model():
+    from aiclient.models.structured import StructuredOutput
+
+    spec = StructuredOutput.for_model(UserInfo)
+
+    assert StructuredOutput.for_model(UserInfo) is spec
+    assert spec.schema == UserInfo.model_json_schema()
+    assert "Schema:" in spec.instruction
+
+
+def test_structured_output_parse_strips_code_fence():
+    import pytest
+
+    from aiclient.models.structured import StructuredOutput
+
+    spec = StructuredOutput.for_model(UserInfo)
+
+    user = spec.parse('```json\n{"name": "Ada", "age": 36}\n```')
+    assert user == UserInfo(name="Ada", age=36)
+
+    with pytest.raises(ValueError, match="Failed to parse structured output"):
+        spec.parse('{"name": "Ada"}')
+
+
+def test_generate_with_response_model_reuses_schema():
+    from aiclient.models.chat import ChatModel
+    from aiclient.testing import MockProvider, MockTransport
+
+    provider = MockProvider()
+    provider.add_response('{"name": "Ada", "age": 36}')
+    provider.add_response('{"name": "Bob", "age": 7}')
+    model = ChatModel("mock", provider, MockTransport())
+    messages = [UserMessage(content="Who?")]
+
+    first = model.generate(messages, response_model=UserInfo, strict=True)
+    second = model.generate(messages, response_model=UserInfo)
+
+    assert first == UserInfo(name="Ada", age=36)
+    assert second == UserInfo(name="Bob", age=7)
+    assert provider.requests[0]["response_schema"] is not None
+    # Non-strict mode appends the instruction without mutating the caller's list
+    assert "Restricted Output Mode" in provider.requests[1]["messages"][-1]["content"]
+    assert messages[0].content == "Who?"
+
+
+class ChunkTransport:
+    """Streams fixed text chunks and records how many were consumed."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+        self.closed = False
+
+    def stream(self, endpoint, data):
+        try:
+            for text in self.chunks:
+                self.sent += 1
+                yield {"text": text}
+        finally:
+            self.closed = True
+
+    async def stream_async(self, endpoint, data):
+        for chunk in self.stream(endpoint, data):
+            yield chunk
+
+
+def test_partial_json_parser_completes_open_document():
+    from aiclient.models.structured import PartialJSONParser
+
+    parser = PartialJSONParser()
+    assert parser.feed("```json\n") is None
+    assert parser.feed('{"name": "A') == {"name": "A"}
+    assert parser.feed('da", "a') == {"name": "Ada"}  # key still arriving
+    assert parser.take_settled() == [("name", "Ada")]
+    assert parser.take_settled() == []
+    assert parser.feed('ge": 3') == {"name": "Ada", "age": 3}
+    parser.feed("6}\n```")
+    assert parser.done
+    assert parser.json_text == '{"name": "Ada", "age": 36}'
+
+
+def test_partial_json_parser_rejects_malformed_values():
+    from aiclient.models.structured import PartialJSONParser
+
+    parser = PartialJSONParser()
+    assert parser.feed('{"ok": tr') == {}  # still a prefix of true
+    with pytest.raises(ValueError, match="Invalid JSON value 'trux'"):
+        parser.feed("ux")
+
+    # A complete token that is not a value fails when it ends
+    with pytest.raises(ValueError, match="Invalid JSON value '1.'"):
+        PartialJSONParser().feed('{"age": 1., "name": "Ada"}')
+    with pytest.raises(ValueError, match="expected a key"):
+        PartialJSONParser().feed("{name: 1}")
+
+
+def test_stream_structured_stops_on_malformed_json():
+    from aiclient.models.chat import ChatModel
+    from aiclient.testing import MockProvider
+
+    transport = ChunkTransport(['{"name": "Ada", "age": 3', "6x", "}", "never"])
+    model = ChatModel("mock", MockProvider(), transport)
+
+    with pytest.raises(ValueError, match="Invalid JSON value '36x'"):
+        list(model.stream_structured("Who?", response_model=UserInfo))
+
+    assert transport.sent == 2
+    assert transport.closed
+
+
+@pytest.mark.asyncio
+async def test_stream_structured_async_yields_partials():
+    from aiclient.models.chat import ChatModel
+    from aiclient.testing import MockProvider
+
+    chunks = ['{"na', 'me": "Ad', 'a", ', '"age": 3', "6}"]
+    model = ChatModel("mock", MockProvider(), ChunkTransport(chunks))
+
+    results = [
+        item
+        async for item in model.stream_structured_async("Who?", response_model=UserInfo)
+    ]
+
+    assert [(r.name, r.age) for r in results[:-1]] == [
+        (None, None),
+        ("Ad", None),
+        ("Ada", None),
+        ("Ada", 3),
+    ]
+    assert results[-1] == UserInfo(name="Ada", age=36)
+
+
+def test_stream_structured_stops_on_schema_violation():
+    from aiclient.models.chat import ChatModel
+    from aiclient.testing import MockProvider
+
+    transport = ChunkTransport(['{"age": "old",', ' "name": "Ada"', "}", "never"])
+    model = ChatModel("mock", MockProvider(), transport)
+
+    with pytest.raises(ValueError, match="does not match schema at age"):
+        list(model.stream_structured("Who?", response_model=UserInfo, strict=True))
+
+    assert transport.sent == 1
+    assert transport.closed
+
+
+def test_stream_structured_rejects_settled_short_string():
+    from pydantic import Field
+
+    from aiclient.models.chat import ChatModel
+    from aiclient.testing import MockProvider
+
+    class Code(BaseModel):
+        code: str = Field(min_length=3)
+        note: str
+
+    transport = ChunkTransport(['{"code": "ab", ', '"note": "x"}', "never"])
+    model = ChatModel("mock", MockProvider(), transport)
+
+    with pytest.raises(ValueError, match="does not match schema at code"):
+        list(model.stream_structured("Code?", response_model=Code))
+
+    assert transport.sent == 1
+
+
+def test_structured_checks_each_settled_value_once():
+    from typing import List
+
+    from aiclient.models.structured import PartialJSONParser, StructuredOutput
+
+    structured = StructuredOutput(List[UserInfo])
+    parser = PartialJSONParser()
+    checked = []
+    check_partial = structured.check_partial
+    structured.check_partial = lambda settled: (
+        checked.extend(settled),
+        check_partial(settled),
+    )
+
+    for chunk in ['[{"name": "Ada", "age": 36}', ", ", '{"name": "Bo', '", "age": 1}']:
+        structured.feed_partial(parser, chunk)
+    assert [index for index, _ in checked] == [0, 1]
+
+    with pytest.raises(ValueError, match="at 2.age"):
+        structured.feed_partial(parser, ', {"name": "Cy", "age": "old"}, ')
@@ -166,3 +166,251 @@ def test_tool_multiple_tools_from_functions():
     assert tools[0].name == "tool1"
     assert tools[1].name == "tool2"
     assert tools[0].fn != tools[1].fn
+
+
+def test_tool_declarations_are_cached():
+    """Schema generation runs once, however many requests include the tool."""
+    from unittest.mock import patch
+
+    from aiclient.data_types import UserMessage
+    from aiclient.providers.anthropic import AnthropicProvider
+    from aiclient.providers.google import GoogleProvider
+    from aiclient.providers.openai import OpenAIProvider
+
+    tool = Tool.from_fn(simple_function)
+    messages = [UserMessage(content="hi")]
+
+    with patch.object(
+        tool.args_schema,
+        "model_json_schema",
+        wraps=tool.args_schema.model_json_schema,
+    ) as mock_schema:
+        for _ in range(3):
+            _, openai = OpenAIProvider(api_key="k").prepare_request(
+                "gpt-4o", messages, tools=[tool]
+            )
+            _, anthropic = AnthropicProvider(api_key="k").prepare_request(
+                "claude-3-opus", messages, tools=[tool]
+            )
+            _, google = GoogleProvider(api_key="k").prepare_request(
+                "gemini-1.5-pro", messages, tools=[tool]
+            )
+
+    assert mock_schema.call_count == 1
+    assert openai["tools"][0]["function"]["name"] == "simple_function"
+    assert "text" in anthropic["tools"][0]["input_schema"]["properties"]
+    assert google["tools"][0]["function_declarations"][0]["parameters"] == (
+        tool.parameters
+    )
+
+
+def test_tool_declaration_uses_raw_schema():
+    """Tools without a Pydantic schema (e.g. MCP tools) declare their raw schema."""
+    raw = {"type": "object", "properties": {"q": {"type": "string"}}}
+    tool = Tool(name="search", fn=lambda q: q, description="Search", raw_schema=raw)
+
+    assert tool.declaration("openai")["function"]["parameters"] == raw
+    assert tool.declaration("anthropic")["input_schema"] == raw
+
+
+def _sse(event):
+    import json
+
+    return {"raw": "data: " + json.dumps(event)}
+
+
+def test_openai_stream_chunk_tool_call_deltas():
+    from aiclient.providers.openai import OpenAIProvider
+
+    provider = OpenAIProvider(api_key="test")
+    first = provider.parse_stream_chunk(
+        _sse(
+            {
+                "choices": [
+                    {
+                        "delta": {
+                            "tool_calls": [
+                                {
+                                    "index": 0,
+                                    "id": "call_1",
+                                    "function": {"name": "add", "arguments": '{"a"'},
+                                }
+                            ]
+                        }
+                    }
+                ]
+            }
+        )
+    )
+    second = provider.parse_stream_chunk(
+        _sse(
+            {
+                "choices": [
+                    {
+                        "delta": {
+                            "tool_calls": [
+                                {"index": 0, "function": {"arguments": ": 1}"}}
+                            ]
+                        }
+                    }
+                ]
+            }
+        )
+    )
+
+    assert first.text == ""
+    assert first.tool_call_deltas[0].name == "add"
+    assert second.tool_call_deltas[0].arguments == ": 1}"
+
+
+def test_anthropic_stream_chunk_tool_use():
+    from aiclient.providers.anthropic import AnthropicProvider
+
+    provider = AnthropicProvider(api_key="test")
+    start = provider.parse_stream_chunk(
+        _sse(
+            {
+                "type": "content_block_start",
+                "index": 1,
+                "content_block": {"type": "tool_use", "id": "toolu_1", "name": "add"},
+            }
+        )
+    )
+    fragment = provider.parse_stream_chunk(
+        _sse(
+            {
+                "type": "content_block_delta",
+                "index": 1,
+                "delta": {"type": "input_json_delta", "partial_json": '{"a": 1}'},
+            }
+        )
+    )
+
+    assert (start.tool_call_deltas[0].id, start.tool_call_deltas[0].index) == (
+        "toolu_1",
+        1,
+    )
+    assert fragment.tool_call_deltas[0].arguments == '{"a": 1}'
+
+
+def test_google_stream_chunk_function_call():
+    import json
+
+    from aiclient.providers.google import GoogleProvider
+
+    provider = GoogleProvider(api_key="test")
+    body = {
+        "candidates": [
+            {
+                "content": {
+                    "parts": [
+                        {"text": "Adding. "},
+                        {"functionCall": {"name": "add", "args": {"a": 1}}},
+                    ]
+                }
+            }
+        ]
+    }
+    chunk = provider.parse_stream_chunk({"raw": "[" + json.dumps(body)})
+
+    assert chunk.text == "Adding. "
+    assert chunk.tool_call_deltas[0].name == "add"
+    assert json.loads(chunk.tool_call_deltas[0].arguments) == {"a": 1}
+
+
+def test_tool_call_assembler_emits_each_call_when_it_closes():
+    from aiclient.data_types import StreamChunk, ToolCallDelta
+    from aiclient.providers.base import ToolCallAssembler
+
+    def chunk(*deltas, finish_reason=None):
+        return StreamChunk(
+            text="",
+            delta="",
+            tool_call_deltas=list(deltas),
+            finish_reason=finish_reason,
+        )
+
+    # OpenAI: a call closes when the next index starts or the response finishes
+    assembler = ToolCallAssembler()
+    assert assembler.feed(chunk(ToolCallDelta(index=0, id="a", name="add"))) == []
+    assert assembler.feed(chunk(ToolCallDelta(index=0, arguments='{"x": 1}'))) == []
+    [first] = assembler.feed(chunk(ToolCallDelta(index=1, id="b", name="add")))
+    assert (first.id, first.arguments) == ("a", {"x": 1})
+    [second] = assembler.feed(chunk(finish_reason="tool_calls"))
+    assert (second.id, second.arguments) == ("b", {})
+    assert assembler.finish() == []
+
+    # Anthropic: content_block_stop closes the block; text blocks are ignored
+    assembler = ToolCallAssembler()
+    assembler.feed(chunk(ToolCallDelta(index=1, id="t", name="add")))
+    assembler.feed(chunk(ToolCallDelta(index=1, arguments='{"x": 2}')))
+    assert assembler.feed(chunk(ToolCallDelta(index=0, done=True))) == []
+    [call] = assembler.feed(chunk(ToolCallDelta(index=1, done=True)))
+    assert (call.name, call.arguments) == ("add", {"x": 2})
+
+
+def test_tool_call_assembler_flags_malformed_arguments():
+    from aiclient.data_types import StreamChunk, ToolCallDelta
+    from aiclient.providers.base import ToolCallAssembler
+
+    assembler = ToolCallAssembler()
+    assembler.feed(
+        StreamChunk(
+            text="",
+            delta="",
+            tool_call_deltas=[ToolCallDelta(index=0, id="a", name="add")],
+        )
+    )
+    assembler.feed(
+        StreamChunk(
+            text="",
+            delta="",
+            tool_call_deltas=[ToolCallDelta(index=0, arguments='{"x": 1')],
+        )
+    )
+    [call] = assembler.finish()
+
+    assert call.arguments == {}
+    assert "Invalid JSON arguments for tool add" in call.error
+    assert '{"x": 1' in call.error
+
+
+def test_agent_reports_malformed_arguments_without_running_tool():
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    from aiclient.agent import Agent
+    from aiclient.data_types import ToolCall
+
+    ran = []
+
+    def add(x: int) -> int:
+        ran.append(x)
+        return x
+
+    agent = Agent(model=AsyncMock(), tools=[add])
+    call = ToolCall(id="a", name="add", arguments={}, error="Invalid JSON")
+
+    result = asyncio.run(agent._execute_tool_call(call))
+
+    assert result == "Error: Invalid JSON"
+    assert ran == []
+
+
+def test_google_function_calls_get_distinct_ids():
+    import json
+
+    from aiclient.providers.google import GoogleProvider
+
+    provider = GoogleProvider(api_key="test")
+    calls = [
+        {"functionCall": {"name": "add", "args": {"a": 1}}},
+        {"functionCall": {"name": "add", "args": {"a": 2}}},
+    ]
+    body = {"candidates": [{"content": {"parts": calls}}]}
+
+    response = provider.parse_response(body)
+    chunk = provider.parse_stream_chunk({"raw": "[" + json.dumps(body)})
+
+    assert len({tc.id for tc in response.tool_calls}) == 2
+    assert len({d.id for d in chunk.tool_call_deltas}) == 2
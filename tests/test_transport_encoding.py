@@ -0,0 +1,79 @@
+"""
+Tests for streamed request body encoding of binary image data.
+"""
+
+import base64
+import json
+
+import httpx
+import pytest
+
+from aiclient.data_types import Image, Text, UserMessage
+from aiclient.providers.anthropic import AnthropicProvider
+from aiclient.providers.openai import OpenAIProvider
+from aiclient.transport.encoding import (
+    Base64Payload,
+    JSONBodyStream,
+    encode_json_body,
+    materialize_payload,
+)
+from aiclient.transport.http import HTTPTransport
+
+RAW = bytes(range(256)) * 4000  # ~1MB, spans several chunks
+
+
+def test_encode_plain_payload_returns_bytes():
+    body = encode_json_body({"a": 1, "b": "é"})
+    assert body == '{"a":1,"b":"é"}'.encode("utf-8")
+
+
+def test_encode_binary_payload_streams_base64():
+    payload = {
+        "messages": [{"data": Base64Payload(memoryview(RAW), prefix="data:x;base64,")}]
+    }
+
+    body = encode_json_body(payload)
+
+    assert isinstance(body, JSONBodyStream)
+    encoded = b"".join(body)
+    assert len(encoded) == len(body)
+    decoded = json.loads(encoded)
+    expected = "data:x;base64," + base64.b64encode(RAW).decode()
+    assert decoded["messages"][0]["data"] == expected
+    assert json.loads(encoded) == materialize_payload(payload)
+
+
+def test_image_from_file_uses_binary_payload(tmp_path):
+    img_file = tmp_path / "photo.png"
+    img_file.write_bytes(RAW)
+    img = Image.from_file(str(img_file))
+
+    assert img.media_type == "image/png"
+    assert img.to_base64() == base64.b64encode(RAW).decode()
+
+    _, data = AnthropicProvider(api_key="k").prepare_request(
+        "claude-3-opus", [UserMessage(content=[Text(text="Look"), img])]
+    )
+    source = data["messages"][0]["content"][1]["source"]
+    assert isinstance(source["data"], Base64Payload)
+
+
+@pytest.mark.asyncio
+async def test_http_transport_sends_streamed_body():
+    captured = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        captured["length"] = request.headers["Content-Length"]
+        captured["body"] = json.loads(request.read())
+        return httpx.Response(200, json={"ok": True})
+
+    transport = HTTPTransport()
+    transport.aclient = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    _, data = OpenAIProvider(api_key="k").prepare_request(
+        "gpt-4o", [UserMessage(content=[Image(data=RAW, media_type="image/png")])]
+    )
+
+    assert await transport.send_async("http://test/chat", data) == {"ok": True}
+    url = captured["body"]["messages"][0]["content"][0]["image_url"]["url"]
+    assert url == "data:image/png;base64," + base64.b64encode(RAW).decode()
+    assert int(captured["length"]) == len(encode_json_body(data))
@@ -1,6 +1,16 @@
-from unittest.mock import MagicMock, mock_open, patch
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, mock_open, patch
+
+import pytest
 
 from aiclient.data_types import Image, Text, UserMessage
+from aiclient.images import (
+    ImageOptimizer,
+    estimate_image_tokens,
+    image_cache,
+    resolve_images,
+)
 from aiclient.providers.anthropic import AnthropicProvider
 from aiclient.providers.google import GoogleProvider
 from aiclient.providers.openai import OpenAIProvider
@@ -78,3 +88,240 @@ def test_google_vision_format():
     assert parts[0] == {"text": "Look"}
     assert parts[1]["inlineData"]["mimeType"] == "image/jpeg"
     assert parts[1]["inlineData"]["data"] == "abc"
+
+
+def test_image_payload_formatted_once_across_requests():
+    p = AnthropicProvider(api_key="sk-test")
+    msg = UserMessage(content=[Text(text="Look"), Image(path="photo.jpg")])
+
+    with patch.object(Image, "to_base64", return_value="abc") as mock_b64:
+        _, first = p.prepare_request("claude-3-opus", [msg])
+        _, second = p.prepare_request(
+            "claude-3-opus", [msg, UserMessage(content="And now?")]
+        )
+
+    assert mock_b64.call_count == 1
+    assert first["messages"][0] == second["messages"][0]
+    assert second["messages"][1]["content"][0]["text"] == "And now?"
+
+
+def test_openai_message_cache_separates_grok_variant():
+    p = OpenAIProvider(api_key="sk-test")
+    msg = UserMessage(content=[Image(base64_data="abc", media_type="image/png")])
+
+    _, gpt = p.prepare_request("gpt-4o", [msg])
+    _, grok = p.prepare_request("grok-2-vision", [msg])
+
+    assert gpt["messages"][0]["content"][0]["image_url"]["detail"] == "auto"
+    assert "detail" not in grok["messages"][0]["content"][0]["image_url"]
+
+
+# --- Image Loading Tests ---
+
+
+def test_image_path_cached_across_calls(tmp_path):
+    image_cache.clear()
+    img_file = tmp_path / "photo.jpg"
+    img_file.write_bytes(b"fake_image_data")
+
+    assert Image(path=str(img_file)).to_base64() == "ZmFrZV9pbWFnZV9kYXRh"
+    assert Image(path=str(img_file)).to_base64() == "ZmFrZV9pbWFnZV9kYXRh"
+    assert image_cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_resolve_images_fetches_concurrently():
+    image_cache.clear()
+
+    async def slow_get(url):
+        await asyncio.sleep(0.1)
+        resp = MagicMock()
+        resp.content = url.encode()
+        return resp
+
+    client = AsyncMock()
+    client.get.side_effect = slow_get
+    messages = [
+        UserMessage(content=[Image(url=f"http://example.com/{i}.jpg")])
+        for i in range(5)
+    ]
+
+    start = time.monotonic()
+    await resolve_images(messages, client=client)
+    elapsed = time.monotonic() - start
+
+    assert client.get.await_count == 5
+    assert elapsed < 0.3
+    # Served from cache afterwards, no sync download
+    with patch("httpx.get") as mock_get:
+        assert messages[0].content[0].to_base64()
+        mock_get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_resolve_images_skips_urls_when_disabled():
+    image_cache.clear()
+    client = AsyncMock()
+    messages = [UserMessage(content=[Image(url="http://example.com/skip.jpg")])]
+
+    await resolve_images(messages, client=client, include_urls=False)
+
+    client.get.assert_not_called()
+
+
+# --- Image Optimization Tests ---
+
+
+def _photo(width, height):
+    import base64
+    import io
+    import os
+
+    pil = pytest.importorskip("PIL.Image")
+    buf = io.BytesIO()
+    noise = pil.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    noise.save(buf, format="PNG", compress_level=1)
+    return Image(
+        base64_data=base64.b64encode(buf.getvalue()).decode(), media_type="image/png"
+    )
+
+
+def test_estimate_image_tokens():
+    assert estimate_image_tokens("openai", 4000, 3000, detail="low") == 85
+    # 2048x1536 -> 1024x768 -> 2x2 tiles
+    assert estimate_image_tokens("openai", 4000, 3000) == 85 + 170 * 4
+    assert estimate_image_tokens("anthropic", 1000, 750) == 1000
+    assert estimate_image_tokens("google", 300, 300) == 258
+
+
+def test_optimizer_downscales_for_provider_limits():
+    img = _photo(1600, 1200)
+
+    optimized, report = ImageOptimizer().optimize(img, "anthropic")
+
+    assert (report.width, report.height) == (1568, 1176)
+    assert optimized.media_type == "image/jpeg"
+    assert report.bytes_saved > 0
+
+
+def test_optimizer_picks_low_detail_over_budget():
+    img = _photo(1200, 900)
+    optimizer = ImageOptimizer(token_budget=200)
+
+    optimized, report = optimizer.optimize(img, "openai")
+
+    assert optimized.detail == "low"
+    assert report.optimized_tokens == 85
+    assert report.tokens_saved > 0
+    assert optimizer.total_tokens_saved == report.tokens_saved
+
+
+def _recording_transport():
+    transport = MagicMock()
+    transport.sent = []
+
+    def send(endpoint, data):
+        transport.sent.append(data)
+        return {"choices": [{"message": {"content": "ok"}}]}
+
+    async def send_async(endpoint, data):
+        return send(endpoint, data)
+
+    transport.send = send
+    transport.send_async = send_async
+    transport.supports_binary_payloads = False
+    transport.media_client = None
+    return transport
+
+
+def test_chat_model_applies_image_optimizer():
+    from aiclient.models.chat import ChatModel
+
+    img = _photo(800, 600)
+    p = OpenAIProvider(api_key="sk-test")
+    p.image_optimizer = ImageOptimizer(token_budget=200)
+    transport = _recording_transport()
+    model = ChatModel("gpt-4o", p, transport)
+
+    message = UserMessage(content=[img])
+    model.generate([message])
+    model.generate([message])
+
+    image_url = transport.sent[0]["messages"][0]["content"][0]["image_url"]
+    assert image_url["detail"] == "low"
+    assert image_url["url"].startswith("data:image/jpeg;base64,")
+    # History is optimized once, not on every request
+    assert p.image_optimizer.images_processed == 1
+    # prepare_request itself leaves images alone
+    _, data = p.prepare_request("gpt-4o", [UserMessage(content=[img])])
+    assert data["messages"][0]["content"][0]["image_url"]["url"].startswith(
+        "data:image/png;base64,"
+    )
+
+
+@pytest.mark.asyncio
+async def test_image_optimizer_runs_off_event_loop():
+    import threading
+
+    from aiclient.models.chat import ChatModel
+
+    class ThreadRecordingOptimizer(ImageOptimizer):
+        threads = []
+
+        def optimize(self, image, provider="openai"):
+            self.threads.append(threading.get_ident())
+            return super().optimize(image, provider)
+
+    p = AnthropicProvider(api_key="sk-test")
+    p.image_optimizer = ThreadRecordingOptimizer()
+    transport = _recording_transport()
+    transport.send_async = AsyncMock(
+        return_value={"content": [{"type": "text", "text": "ok"}]}
+    )
+    model = ChatModel("claude-3-5-sonnet", p, transport)
+
+    await model.generate_async([UserMessage(content=[_photo(1600, 1200)])])
+
+    assert p.image_optimizer.threads
+    assert threading.get_ident() not in p.image_optimizer.threads
+    data = transport.send_async.call_args.args[1]
+    assert data["messages"][0]["content"][0]["source"]["media_type"] == "image/jpeg"
+
+
+@pytest.mark.asyncio
+async def test_client_shares_and_closes_one_media_client():
+    from aiclient import Client
+
+    client = Client(openai_api_key="sk-test", anthropic_api_key="sk-test")
+    media = client.chat("gpt-4o").transport.media_client
+
+    assert client.chat("claude-3-5-sonnet").transport.media_client is media
+
+    await client.close()
+
+    assert media.is_closed
+    # A model created afterwards gets a fresh client
+    assert client.chat("gpt-4o").transport.media_client is not media
+    await client.close()
+
+
+def test_image_optimizer_handles_unlisted_provider():
+    from aiclient.models.chat import ChatModel
+    from aiclient.testing import MockProvider
+
+    img = _photo(800, 600)
+    optimizer = ImageOptimizer(max_edge=400)
+
+    optimized, report = optimizer.optimize(img, provider="my-gateway")
+
+    assert (report.width, report.height) == (400, 300)
+    assert report.original_tokens == report.optimized_tokens == 0
+
+    # ChatModel passes the provider's own name, here "mock"
+    provider = MockProvider()
+    provider.image_optimizer = optimizer
+    model = ChatModel("mock", provider, _recording_transport())
+    model.generate([UserMessage(content=[Text(text="hi"), img])])
+
+    sent = provider.requests[-1]["messages"][0]["content"][1]
+    assert sent["base64_data"] != img.base64_data